@@ -0,0 +1,162 @@
+"""Batch curve calculation benchmark and consistency check.
+
+Evaluates a sweep of outdoor temperatures, room temperatures and parameter
+sets (all curve types and calculation modes) with the NumPy path and the
+pure-Python path of calculate_flow_temperatures and reports:
+
+- time of both paths and the speedup of NumPy
+- points where the two paths differ, which must be none: the calculate
+  service uses NumPy, the sensor the scalar formula
+- whether support point curves follow the room target: they match their
+  points at the reference target and shift with any other
+
+Exits with status 1 if any point differs or a check fails. Run from the repository root:
+
+    python benchmarks/bench_curve_batch.py
+    python benchmarks/bench_curve_batch.py --points 2000 --seed 3
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from custom_components.heating_curve.const import (  # noqa: E402
+    CALCULATION_MODES,
+    CURVE_TYPE_POINTS,
+    CURVE_TYPES,
+    DEFAULT_ROOM_TEMP_TARGET,
+)
+from custom_components.heating_curve.curve import (  # noqa: E402
+    CurveParameters,
+    calculate_flow_temperatures,
+)
+
+CURVE_POINTS = ((-15.0, 60.0), (0.0, 45.0), (15.0, 30.0))
+
+
+def parameter_grid() -> list[CurveParameters]:
+    """Return parameter sets covering every curve type and mode."""
+    return [
+        CurveParameters(
+            curve_slope=slope,
+            curve_level=level,
+            room_temp_target=target,
+            min_flow_temp=20.0,
+            max_flow_temp=75.0,
+            calculation_mode=mode,
+            curve_type=curve_type,
+            radiator_exponent=exponent,
+            curve_points=CURVE_POINTS,
+        )
+        for slope, level, target, mode, curve_type, exponent in itertools.product(
+            (0.8, 1.2, 1.37, 1.6),
+            (-2.5, 0.0, 1.3),
+            (19.5, 21.0),
+            CALCULATION_MODES,
+            CURVE_TYPES,
+            (1.1, 1.3),
+        )
+    ]
+
+
+def points_follow_target() -> bool:
+    """Return True if a support point curve moves with the room target.
+
+    At the reference target the curve must pass through its points, every
+    other target must give other flows, in both paths.
+    """
+    outdoor = [point[0] for point in CURVE_POINTS]
+    flows = {}
+    for target in (
+        DEFAULT_ROOM_TEMP_TARGET - 3,
+        DEFAULT_ROOM_TEMP_TARGET,
+        DEFAULT_ROOM_TEMP_TARGET + 3,
+    ):
+        params = CurveParameters(
+            room_temp_target=target,
+            min_flow_temp=15.0,
+            max_flow_temp=90.0,
+            curve_type=CURVE_TYPE_POINTS,
+            curve_points=CURVE_POINTS,
+        )
+        rows = [
+            calculate_flow_temperatures(outdoor, None, [params], use_numpy=numpy)
+            for numpy in (True, False)
+        ]
+        if list(rows[0][0]) != rows[1][0]:
+            return False
+        flows[target] = tuple(rows[1][0])
+    return flows[DEFAULT_ROOM_TEMP_TARGET] == tuple(
+        point[1] for point in CURVE_POINTS
+    ) and len(set(flows.values())) == len(flows)
+
+
+def main() -> None:
+    """Parse arguments, run both paths and compare them."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Two decimals like real sensors, plus values on rounding boundaries
+    outdoor = [round(rng.uniform(-25, 20), 2) for _ in range(args.points)]
+    outdoor += [x / 20 for x in range(-500, 400)]
+    rooms = [
+        None if rng.random() < 0.05 else round(rng.uniform(17, 23), 2)
+        for _ in outdoor
+    ]
+    grid = parameter_grid()
+
+    start = time.perf_counter()
+    batch = calculate_flow_temperatures(outdoor, rooms, grid, use_numpy=True)
+    numpy_s = time.perf_counter() - start
+    start = time.perf_counter()
+    scalar = calculate_flow_temperatures(outdoor, rooms, grid, use_numpy=False)
+    python_s = time.perf_counter() - start
+
+    mismatches = sum(
+        a != b
+        for row_a, row_b in zip(batch.tolist(), scalar)
+        for a, b in zip(row_a, row_b)
+    )
+    points = len(grid) * len(outdoor)
+    follows_target = points_follow_target()
+    passed = mismatches == 0 and follows_target
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "points": points,
+                    "numpy_s": numpy_s,
+                    "python_s": python_s,
+                    "mismatches": mismatches,
+                    "points_follow_target": follows_target,
+                    "passed": passed,
+                },
+                indent=2,
+            )
+        )
+    else:
+        print(f"points:      {points}")
+        print(f"numpy:       {numpy_s * 1000:.1f} ms")
+        print(f"python:      {python_s * 1000:.1f} ms ({python_s / numpy_s:.0f}x)")
+        print(f"mismatches:  {mismatches}")
+        print(f"points follow target: {follows_target}")
+        print("PASS" if passed else "FAIL")
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Import time budget for the heating_curve package.
+
+Runs `python -X importtime` in fresh interpreters, with the Home Assistant
+modules that are already loaded when HA imports an integration preloaded,
+and reports the median cumulative import time of the package. Exits with
+status 1 if it exceeds the budget or if a module that must be imported
+lazily (NumPy, the history analytics, optional features) is loaded at
+import time.
+
+Run from the repository root:
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget-ms 40 --runs 9
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PACKAGE = "custom_components.heating_curve"
+
+# Loaded by Home Assistant before any custom integration is imported, or
+# a dependency set up before it
+HA_PRELOAD = (
+    "homeassistant.components.websocket_api",
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.debounce",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.dispatcher",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.restore_state",
+    "homeassistant.helpers.storage",
+)
+
+# Must only be imported on first use
+LAZY_MODULES = (
+    "numpy",
+    f"{PACKAGE}.autotune",
+    f"{PACKAGE}.backtest",
+    f"{PACKAGE}.cache",
+    f"{PACKAGE}.filters",
+    f"{PACKAGE}.forecast",
+    f"{PACKAGE}.history",
+    f"{PACKAGE}.setback",
+    f"{PACKAGE}.writer",
+    "homeassistant.components.recorder",
+)
+
+DEFAULT_BUDGET_MS = 50.0
+
+
+def measure_once() -> tuple[float, dict[str, float], list[str]]:
+    """Import the package once in a fresh interpreter.
+
+    Returns the package's cumulative import time, the cumulative time of
+    every module it imported and the lazy modules that got loaded.
+    """
+    code = (
+        f"import json, sys, {', '.join(HA_PRELOAD)}\n"
+        f"import {PACKAGE}\n"
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines are "import time: self [us] | cumulative | name" in completion
+    # order, with nested imports indented and listed before their importer
+    lines = [
+        line[len("import time:") :].split("|")
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "[us]" not in line
+    ]
+    index = next(
+        i for i, (_, _, name) in enumerate(lines) if name.strip() == PACKAGE
+    )
+    package_indent = len(lines[index][2]) - len(lines[index][2].lstrip())
+    modules = {PACKAGE: int(lines[index][1]) / 1000}
+    for _, cumulative, name in reversed(lines[:index]):
+        if len(name) - len(name.lstrip()) <= package_indent:
+            break
+        modules[name.strip()] = int(cumulative) / 1000
+    return modules[PACKAGE], modules, json.loads(result.stdout)
+
+
+def main() -> None:
+    """Parse arguments, run the measurement and check the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    times = []
+    modules: dict[str, float] = {}
+    eager: list[str] = []
+    for _ in range(max(1, args.runs)):
+        package_ms, modules, eager = measure_once()
+        times.append(package_ms)
+    median_ms = statistics.median(times)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]
+    passed = median_ms <= args.budget_ms and not eager
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "median_ms": median_ms,
+                    "budget_ms": args.budget_ms,
+                    "eager_lazy_modules": eager,
+                    "passed": passed,
+                },
+                indent=2,
+            )
+        )
+    else:
+        print(f"import time:    {median_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        print(f"eager imports:  {', '.join(eager) or 'none'}")
+        print("slowest modules (cumulative):")
+        for name, cumulative_ms in slowest:
+            print(f"  {cumulative_ms:7.1f} ms  {name}")
+        print("PASS" if passed else "FAIL")
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Event-storm replay benchmark for the flow temperature sensor.
+
+Drives the outdoor and room sensor listeners of HeatingCurveSensor with a
+synthetic or recorded stream of state changes inside an in-process Home
+Assistant test instance and reports:
+
+- input events per second
+- p50/p99 latency from the input state_changed event to the written flow
+  temperature state
+- flow temperature state writes per 1000 input events
+
+Requires the Home Assistant test harness:
+
+    pip install pytest-homeassistant-custom-component
+
+Run from the repository root:
+
+    python benchmarks/bench_sensor_events.py --events 20000 --burst 5
+    python benchmarks/bench_sensor_events.py --burst 5 --debounce 0.01
+    python benchmarks/bench_sensor_events.py --replay recorded.csv
+
+A replay file is a CSV with the columns "source" ("outdoor" or "room") and
+"state" (the raw sensor state, e.g. "4.3" or "unavailable").
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+from collections.abc import Iterator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from homeassistant.core import Event, HomeAssistant, callback  # noqa: E402
+from homeassistant import loader  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+DOMAIN = "heating_curve"
+OUTDOOR_SENSOR = "sensor.bench_outdoor"
+ROOM_SENSOR = "sensor.bench_room"
+TEMPERATURE_ATTRIBUTES = {"device_class": "temperature", "unit_of_measurement": "°C"}
+
+
+def synthetic_stream(
+    events: int, room_ratio: float, seed: int
+) -> Iterator[tuple[str, str]]:
+    """Yield a random walk of outdoor readings mixed with room readings."""
+    rng = random.Random(seed)
+    outdoor = 5.0
+    room = 20.5
+    for _ in range(events):
+        if rng.random() < room_ratio:
+            room = min(23.0, max(18.0, room + rng.gauss(0, 0.05)))
+            yield "room", f"{room:.1f}"
+        else:
+            outdoor = min(15.0, max(-15.0, outdoor + rng.gauss(0, 0.2)))
+            yield "outdoor", f"{outdoor:.1f}"
+
+
+def replay_stream(path: str) -> Iterator[tuple[str, str]]:
+    """Yield (source, state) pairs from a recorded CSV file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            yield row["source"], row["state"]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the pct percentile of values (nearest rank)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def settle(hass: HomeAssistant, debounce: float) -> None:
+    """Wait until the debounced recompute has run and written its state."""
+    # The recompute fires from a loop timer, which async_block_till_done
+    # does not wait for
+    await asyncio.sleep(debounce)
+    await asyncio.sleep(0)
+    await hass.async_block_till_done()
+
+
+async def run_benchmark(
+    stream: Iterator[tuple[str, str]],
+    burst: int,
+    calculation_mode: str,
+    debounce: float,
+) -> dict[str, float]:
+    """Replay the stream against a fresh Home Assistant instance."""
+    async with async_test_home_assistant() as hass:
+        # Load integrations from this repository's custom_components. The
+        # harness puts its own custom_components package first on the path.
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+        import custom_components  # pylint: disable=import-outside-toplevel
+
+        repo_components = os.path.join(REPO_ROOT, "custom_components")
+        if repo_components not in custom_components.__path__:
+            custom_components.__path__.insert(0, repo_components)
+
+        hass.states.async_set(OUTDOOR_SENSOR, "5.0", TEMPERATURE_ATTRIBUTES)
+        hass.states.async_set(ROOM_SENSOR, "20.5", TEMPERATURE_ATTRIBUTES)
+
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title="Bench",
+            data={
+                "name": "Bench",
+                "outdoor_sensor": OUTDOOR_SENSOR,
+                "room_sensor": ROOM_SENSOR,
+                "update_debounce": debounce,
+            },
+        )
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        registry = er.async_get(hass)
+        flow_entity = registry.async_get_entity_id(
+            "sensor", DOMAIN, f"{entry.entry_id}_flow_temperature"
+        )
+        mode_entity = registry.async_get_entity_id(
+            "select", DOMAIN, f"{entry.entry_id}_calculation_mode"
+        )
+        await hass.services.async_call(
+            "select",
+            "select_option",
+            {"entity_id": mode_entity, "option": calculation_mode},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+
+        pending: deque[float] = deque()
+        latencies: list[float] = []
+        writes = 0
+
+        @callback
+        def flow_written(event: Event) -> None:
+            """Attribute a flow temperature write to all pending inputs."""
+            nonlocal writes
+            if event.data["entity_id"] != flow_entity:
+                return
+            writes += 1
+            now = time.perf_counter()
+            while pending:
+                latencies.append(now - pending.popleft())
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, flow_written)
+
+        sensors = {"outdoor": OUTDOOR_SENSOR, "room": ROOM_SENSOR}
+        events = 0
+        start = time.perf_counter()
+        batch = 0
+        for source, state in stream:
+            pending.append(time.perf_counter())
+            hass.states.async_set(sensors[source], state, TEMPERATURE_ATTRIBUTES)
+            events += 1
+            batch += 1
+            if batch >= burst:
+                await settle(hass, debounce)
+                # Inputs that did not lead to a write are not latency samples
+                pending.clear()
+                batch = 0
+        await settle(hass, debounce)
+        elapsed = time.perf_counter() - start
+
+        unsub()
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "events_per_second": events / elapsed if elapsed else float("inf"),
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "latency_mean_ms": (
+            statistics.fmean(latencies) * 1000 if latencies else float("nan")
+        ),
+        "writes": writes,
+        "writes_per_1000_events": writes * 1000 / events if events else 0.0,
+    }
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=1,
+        help="input events fired back to back before yielding to the loop",
+    )
+    parser.add_argument(
+        "--room-ratio",
+        type=float,
+        default=0.2,
+        help="share of synthetic events coming from the room sensor",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.0,
+        help="update debounce window of the config entry in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--mode",
+        choices=["classic", "with_room_temp"],
+        default="with_room_temp",
+    )
+    parser.add_argument("--replay", help="CSV file with recorded state changes")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    if args.replay:
+        stream = replay_stream(args.replay)
+    else:
+        stream = synthetic_stream(args.events, args.room_ratio, args.seed)
+
+    result = asyncio.run(
+        run_benchmark(stream, max(1, args.burst), args.mode, args.debounce)
+    )
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"events:            {result['events']}")
+    print(f"events/s:          {result['events_per_second']:.0f}")
+    print(f"latency p50:       {result['latency_p50_ms']:.3f} ms")
+    print(f"latency p99:       {result['latency_p99_ms']:.3f} ms")
+    print(f"writes/1000 events: {result['writes_per_1000_events']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Startup benchmark for many Heating Curve config entries.
+
+Sets up a number of config entries whose number and select entities have
+stored states (as after a restart) inside an in-process Home Assistant test
+instance and reports:
+
+- total and per entry setup time
+- flow temperature state writes during startup (ideally one per circuit)
+- whether every restored parameter reached the sensor
+- modules of optional features loaded although no entry uses them
+
+Exits with status 1 if a parameter was lost or an optional module loaded.
+
+Requires the Home Assistant test harness:
+
+    pip install pytest-homeassistant-custom-component
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --entries 200
+    python benchmarks/bench_startup.py --entries 50 --circuits 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from homeassistant.core import Event, State, callback  # noqa: E402
+from homeassistant import loader  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+    mock_restore_cache,
+)
+
+from bench_sensor_events import (  # noqa: E402
+    DOMAIN,
+    OUTDOOR_SENSOR,
+    TEMPERATURE_ATTRIBUTES,
+    settle,
+)
+
+# Stored parameter states of every circuit, chosen to differ from the
+# defaults so a missed restore shows in the flow temperature
+RESTORED = {
+    ("number", "curve_slope"): "1.8",
+    ("number", "curve_level"): "2.0",
+    ("number", "room_temp_target"): "21.0",
+    ("number", "min_flow_temp"): "25.0",
+    ("number", "max_flow_temp"): "70.0",
+    ("number", "hysteresis"): "0.5",
+    ("number", "radiator_exponent"): "1.3",
+    ("select", "calculation_mode"): "classic",
+    ("select", "curve_type"): "linear",
+}
+# 21 + 1.8 * (21 - 0) + 2
+EXPECTED_FLOW = "60.8"
+
+# Features the benchmark entries do not configure, imported on first use
+OPTIONAL_MODULES = tuple(
+    f"custom_components.{DOMAIN}.{name}"
+    for name in (
+        "autotune",
+        "backtest",
+        "cache",
+        "filters",
+        "forecast",
+        "history",
+        "setback",
+        "writer",
+    )
+)
+
+
+def circuit_prefix(entry_id: str, circuit_id: str) -> str:
+    """Return the unique id prefix of a circuit's entities."""
+    if circuit_id == "main":
+        return entry_id
+    return f"{entry_id}_{circuit_id}"
+
+
+async def run_benchmark(entries: int, circuits: int) -> dict[str, float]:
+    """Set up all entries against a fresh Home Assistant instance."""
+    async with async_test_home_assistant() as hass:
+        # Load integrations from this repository's custom_components
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+        import custom_components  # pylint: disable=import-outside-toplevel
+
+        repo_components = os.path.join(REPO_ROOT, "custom_components")
+        if repo_components not in custom_components.__path__:
+            custom_components.__path__.insert(0, repo_components)
+
+        hass.states.async_set(OUTDOOR_SENSOR, "0.0", TEMPERATURE_ATTRIBUTES)
+
+        registry = er.async_get(hass)
+        config_entries = []
+        stored_states = []
+        for index in range(entries):
+            extra = [
+                {"circuit_id": f"c{number}", "name": f"Kreis {index}.{number}"}
+                for number in range(1, circuits)
+            ]
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                title=f"Bench {index}",
+                data={
+                    "name": f"Bench {index}",
+                    "outdoor_sensor": OUTDOOR_SENSOR,
+                    "circuits": extra,
+                },
+            )
+            entry.add_to_hass(hass)
+            config_entries.append(entry)
+
+            # Entities of a previous run, with their last states
+            for circuit_id in ["main", *(c["circuit_id"] for c in extra)]:
+                prefix = circuit_prefix(entry.entry_id, circuit_id)
+                for (domain, key), value in RESTORED.items():
+                    registry_entry = registry.async_get_or_create(
+                        domain, DOMAIN, f"{prefix}_{key}", config_entry=entry
+                    )
+                    stored_states.append(State(registry_entry.entity_id, value))
+        mock_restore_cache(hass, stored_states)
+
+        flow_writes = 0
+
+        @callback
+        def flow_written(event: Event) -> None:
+            """Count flow temperature writes."""
+            nonlocal flow_writes
+            if event.data["entity_id"].endswith("_vorlauftemperatur"):
+                flow_writes += 1
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, flow_written)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                hass.config_entries.async_setup(entry.entry_id)
+                for entry in config_entries
+            )
+        )
+        await settle(hass, 0)
+        elapsed = time.perf_counter() - start
+        unsub()
+
+        flows = [
+            hass.states.get(entity_id).state
+            for entity_id in hass.states.async_entity_ids("sensor")
+            if entity_id.endswith("_vorlauftemperatur")
+        ]
+        await hass.async_stop(force=True)
+
+    total_circuits = entries * circuits
+    return {
+        "entries": entries,
+        "circuits": total_circuits,
+        "seconds": elapsed,
+        "ms_per_entry": elapsed * 1000 / entries,
+        "flow_writes": flow_writes,
+        "flow_writes_per_circuit": flow_writes / total_circuits,
+        "restored_ok": len(flows) == total_circuits
+        and all(flow == EXPECTED_FLOW for flow in flows),
+        "optional_modules": [
+            module for module in OPTIONAL_MODULES if module in sys.modules
+        ],
+    }
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument(
+        "--circuits", type=int, default=1, help="heating circuits per entry"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args.entries, max(1, args.circuits)))
+
+    passed = result["restored_ok"] and not result["optional_modules"]
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if passed else 1)
+
+    print(f"entries:           {result['entries']}")
+    print(f"circuits:          {result['circuits']}")
+    print(f"setup time:        {result['seconds'] * 1000:.0f} ms")
+    print(f"per entry:         {result['ms_per_entry']:.2f} ms")
+    print(f"flow writes/circuit: {result['flow_writes_per_circuit']:.2f}")
+    print(f"restored correctly: {result['restored_ok']}")
+    print(f"optional modules:  {', '.join(result['optional_modules']) or 'none'}")
+    print("PASS" if passed else "FAIL")
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,229 @@
 """The Heating Curve Calculator integration."""
+from collections.abc import Mapping
 import logging
+import time
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.const import Platform
+from homeassistant.const import Platform, CONF_NAME
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+    restore_state,
+)
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    DOMAIN,
+    CONF_ROOM_SENSOR,
+    CONF_ROOM_SENSORS,
+    CONF_OUTPUT_ENTITY,
+    CONF_CURVE_POINTS,
+    CONF_CIRCUITS,
+    CONF_CIRCUIT_ID,
+    PRIMARY_CIRCUIT,
+)
+from .coordinator import (
+    HeatingCurveCoordinator,
+    filter_store,
+    history_cache_path,
+)
+from .curve import parse_curve_points
+from .models import HeatingCurveCircuit, HeatingCurveData
+from .rooms import parse_room_sensors
+from .number import NUMBER_DESCRIPTIONS, restore_number
+from .select import SELECT_DESCRIPTIONS, restore_select
+from .services import async_setup_services
+from .websocket import async_setup_websocket
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "heating_curve"
 PLATFORMS = [Platform.SENSOR, Platform.NUMBER, Platform.SELECT]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Heating Curve Calculator services and websocket API."""
+    async_setup_services(hass)
+    async_setup_websocket(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Heating Curve Calculator from a config entry."""
-    hass.data.setdefault(DOMAIN, {})
-    
-    # Initialize state with defaults.
-    # The actual persisted values will be restored by the Number/Select
-    # entities via RestoreEntity in their async_added_to_hass() methods.
-    hass.data[DOMAIN][entry.entry_id] = {
-        "config": entry.data,
-        "state": {
-            "curve_slope": 1.4,
-            "curve_level": 0.0,
-            "room_temp_target": 20.0,
-            "min_flow_temp": 20.0,
-            "max_flow_temp": 75.0,
-            "calculation_mode": "classic",
-            "hysteresis": 1.0,
-        }
+    start = time.perf_counter()
+
+    # Restore the parameters of all circuits before any entity is added, so
+    # every sensor computes once with the final values
+    circuits = {
+        circuit.circuit_id: circuit for circuit in _build_circuits(entry.data)
     }
+    _async_restore_parameters(hass, entry, circuits)
+    coordinator = HeatingCurveCoordinator(hass, entry, circuits)
+    entry.runtime_data = HeatingCurveData(
+        config=entry.data, circuits=circuits, coordinator=coordinator
+    )
+    _async_remove_stale_devices(hass, entry, circuits)
+
+    await coordinator.async_load()
+    coordinator.async_start()
+    entry.async_on_unload(coordinator.async_stop)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # The sensors computed their first values when they were added
+    coordinator.async_push_outputs()
 
     # Register update listener for options flow
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+
+    _LOGGER.debug(
+        "Set up %s with %d circuits in %.1f ms",
+        entry.title,
+        len(circuits),
+        (time.perf_counter() - start) * 1000,
+    )
 
     return True
 
 
+def _build_circuits(data: Mapping[str, Any]) -> list[HeatingCurveCircuit]:
+    """Create the primary circuit and the additional circuits of an entry."""
+    configs = [
+        {
+            CONF_CIRCUIT_ID: PRIMARY_CIRCUIT,
+            CONF_NAME: data.get(CONF_NAME, "Heating Curve"),
+            CONF_ROOM_SENSOR: data.get(CONF_ROOM_SENSOR),
+            CONF_CURVE_POINTS: data.get(CONF_CURVE_POINTS),
+            CONF_ROOM_SENSORS: data.get(CONF_ROOM_SENSORS),
+            CONF_OUTPUT_ENTITY: data.get(CONF_OUTPUT_ENTITY),
+        },
+        *data.get(CONF_CIRCUITS, []),
+    ]
+
+    circuits = []
+    for config in configs:
+        circuit = HeatingCurveCircuit(
+            circuit_id=config[CONF_CIRCUIT_ID],
+            name=config[CONF_NAME],
+            room_sensor=config.get(CONF_ROOM_SENSOR),
+            output_entity=config.get(CONF_OUTPUT_ENTITY),
+        )
+        if curve_points := config.get(CONF_CURVE_POINTS):
+            try:
+                circuit.curve_points = parse_curve_points(curve_points)
+            except ValueError:
+                _LOGGER.warning(
+                    "Ignoring invalid curve support points of %s: %s",
+                    circuit.name,
+                    curve_points,
+                )
+        if rooms := config.get(CONF_ROOM_SENSORS):
+            try:
+                circuit.rooms = parse_room_sensors(rooms)
+            except ValueError:
+                _LOGGER.warning(
+                    "Ignoring invalid room sensors of %s: %s", circuit.name, rooms
+                )
+        circuits.append(circuit)
+    return circuits
+
+
+def _async_restore_parameters(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    circuits: dict[str, HeatingCurveCircuit],
+) -> None:
+    """Apply the stored number and select states of all circuits in one pass.
+
+    Parameters without a stored state keep their defaults. The number and
+    select entities still derive from RestoreEntity so their states are
+    stored on shutdown.
+    """
+    last_states = restore_state.async_get(hass).last_states
+    if not last_states:
+        return
+
+    entity_ids = {
+        registry_entry.unique_id: registry_entry.entity_id
+        for registry_entry in er.async_entries_for_config_entry(
+            er.async_get(hass), entry.entry_id
+        )
+    }
+    restorers = [
+        *((description, restore_number) for description in NUMBER_DESCRIPTIONS),
+        *((description, restore_select) for description in SELECT_DESCRIPTIONS),
+    ]
+    for circuit in circuits.values():
+        for description, restore in restorers:
+            entity_id = entity_ids.get(
+                circuit.unique_id(entry.entry_id, description.key)
+            )
+            if entity_id is None or (stored := last_states.get(entity_id)) is None:
+                continue
+            if stored.state.state in ("unknown", "unavailable"):
+                continue
+            if (value := restore(description, stored.state.state)) is not None:
+                circuit.state.set_parameter(description.key, value)
+
+
+def _async_remove_stale_devices(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    circuits: dict[str, HeatingCurveCircuit],
+) -> None:
+    """Remove the devices of circuits that were deleted in the options."""
+    identifiers = {
+        (DOMAIN, circuit.device_identifier(entry.entry_id))
+        for circuit in circuits.values()
+    }
+    device_registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(
+        device_registry, entry.entry_id
+    ):
+        if not device.identifiers & identifiers:
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=entry.entry_id
+            )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
-    
-    if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
-
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        await entry.runtime_data.coordinator.async_save()
     return unload_ok
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry when options change."""
-    await hass.config_entries.async_reload(entry.entry_id)
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored data of a deleted config entry."""
+    await filter_store(hass, entry.entry_id).async_remove()
+
+    # pylint: disable-next=import-outside-toplevel
+    from .cache import remove_history_cache
+
+    await hass.async_add_executor_job(
+        remove_history_cache, history_cache_path(hass, entry.entry_id)
+    )
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running entry.
+
+    Sensor, curve point, filter and debounce changes are applied in place,
+    so the entities keep their state. Only adding or removing circuits
+    reloads the entry, as entities have to be created or removed.
+    """
+    data = entry.runtime_data
+    circuits = _build_circuits(entry.data)
+    if [circuit.circuit_id for circuit in circuits] != list(data.circuits):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    for circuit in circuits:
+        current = data.circuits[circuit.circuit_id]
+        current.reconfigure(circuit.room_sensor, circuit.curve_points, circuit.rooms)
+        current.output_entity = circuit.output_entity
+    data.config = entry.data
+    data.coordinator.async_reconfigure(entry.data)
@@ -0,0 +1,208 @@
+"""Automatic fitting of curve slope and level from recorded history.
+
+The fit uses the steady state heat balance of the building: the heat the
+radiators deliver, proportional to (flow - room), equals the heat lost
+through the envelope, proportional to (room - outdoor). Over the recorded
+history this gives the linear model
+
+    room - outdoor = r * (flow - room) + c
+
+which is solved by weighted least squares. Holding room at the target then
+requires flow = target + (target - outdoor - c) / r, i.e. a slope of 1 / r
+and a level of -c / r. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+import itertools
+from typing import Any
+
+from .const import CONF_CURVE_LEVEL, CONF_CURVE_SLOPE, PARAMETER_RANGES
+from .curve import load_numpy
+from .history import DEFAULT_CHUNK_SIZE, iter_samples
+
+# Range of the curve_slope and curve_level number entities
+SLOPE_BOUNDS = PARAMETER_RANGES[CONF_CURVE_SLOPE]
+LEVEL_BOUNDS = PARAMETER_RANGES[CONF_CURVE_LEVEL]
+
+# Samples are only used while the circuit is actually heating
+MIN_HEATING_DIFFERENCE = 2.0
+
+# Samples older than this are not carried forward to the next change
+MAX_SAMPLE_SECONDS = 3600.0
+
+
+class AutoTuneError(ValueError):
+    """Raised when the history does not allow a fit."""
+
+
+@dataclass(slots=True)
+class AutoTuneResult:
+    """Fitted curve parameters."""
+
+    curve_slope: float
+    curve_level: float
+    samples: int
+    heating_seconds: float
+    r_squared: float
+    clamped: bool
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the result as service response data."""
+        return {
+            "curve_slope": self.curve_slope,
+            "curve_level": self.curve_level,
+            "samples": self.samples,
+            "heating_seconds": round(self.heating_seconds),
+            "r_squared": round(self.r_squared, 3),
+            "clamped": self.clamped,
+        }
+
+
+class _WeightedSums:
+    """Running sums of the weighted least squares normal equations."""
+
+    __slots__ = ("count", "w", "x", "y", "xx", "xy", "yy")
+
+    def __init__(self) -> None:
+        """Initialize empty sums."""
+        self.count = 0
+        self.w = self.x = self.y = self.xx = self.xy = self.yy = 0.0
+
+    def add(
+        self, xs: Sequence[float], ys: Sequence[float], ws: Sequence[float]
+    ) -> None:
+        """Add a chunk of weighted points."""
+        if not xs:
+            return
+        self.count += len(xs)
+        if (np := load_numpy()) is not None:
+            x = np.asarray(xs, dtype=float)
+            y = np.asarray(ys, dtype=float)
+            w = np.asarray(ws, dtype=float)
+            wx = w * x
+            wy = w * y
+            self.w += float(w.sum())
+            self.x += float(wx.sum())
+            self.y += float(wy.sum())
+            self.xx += float(wx @ x)
+            self.xy += float(wx @ y)
+            self.yy += float(wy @ y)
+            return
+        for x, y, w in zip(xs, ys, ws):
+            self.w += w
+            self.x += w * x
+            self.y += w * y
+            self.xx += w * x * x
+            self.xy += w * x * y
+            self.yy += w * y * y
+
+    def solve(self) -> tuple[float, float, float]:
+        """Return (r, c, r_squared) of the fit y = r * x + c."""
+        if self.w <= 0:
+            raise AutoTuneError("No heating periods found in the history")
+        mean_x = self.x / self.w
+        mean_y = self.y / self.w
+        var_x = self.xx / self.w - mean_x * mean_x
+        var_y = self.yy / self.w - mean_y * mean_y
+        cov = self.xy / self.w - mean_x * mean_y
+        if var_x <= 1e-9:
+            raise AutoTuneError(
+                "The flow temperature did not vary enough for a fit"
+            )
+        r = cov / var_x
+        c = mean_y - r * mean_x
+        r_squared = cov * cov / (var_x * var_y) if var_y > 1e-9 else 0.0
+        return r, c, r_squared
+
+
+def fit_curve(
+    samples: Iterable[tuple[float, Sequence[float | None]]],
+    end_ts: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    slope_bounds: tuple[float, float] = SLOPE_BOUNDS,
+    level_bounds: tuple[float, float] = LEVEL_BOUNDS,
+) -> AutoTuneResult:
+    """Fit slope and level from (timestamp, (outdoor, room, flow)) samples.
+
+    Every sample is weighted with the time until the next sample, so bursts
+    of state changes do not dominate the fit. Points are collected in
+    chunks and folded into running sums, memory use does not grow with the
+    length of the history.
+    """
+    sums = _WeightedSums()
+    xs: list[float] = []
+    ys: list[float] = []
+    ws: list[float] = []
+    heating_seconds = 0.0
+
+    last_ts: float | None = None
+    last_values: Sequence[float | None] = ()
+    # The end marker closes the period of the last sample
+    for ts, values in itertools.chain(samples, ((end_ts, ()),)):
+        if last_ts is not None and len(last_values) == 3:
+            outdoor, room, flow = last_values
+            weight = min(ts - last_ts, MAX_SAMPLE_SECONDS)
+            if (
+                weight > 0
+                and outdoor is not None
+                and room is not None
+                and flow is not None
+                and flow - room >= MIN_HEATING_DIFFERENCE
+                and room - outdoor >= MIN_HEATING_DIFFERENCE
+            ):
+                xs.append(flow - room)
+                ys.append(room - outdoor)
+                ws.append(weight)
+                heating_seconds += weight
+                if len(xs) >= chunk_size:
+                    sums.add(xs, ys, ws)
+                    xs, ys, ws = [], [], []
+        last_ts, last_values = ts, values
+    sums.add(xs, ys, ws)
+
+    r, c, r_squared = sums.solve()
+    if r <= 0:
+        raise AutoTuneError(
+            "Room temperature does not follow the flow temperature in the history"
+        )
+
+    slope = 1 / r
+    level = -c / r
+    clamped_slope = min(max(slope, slope_bounds[0]), slope_bounds[1])
+    clamped_level = min(max(level, level_bounds[0]), level_bounds[1])
+
+    return AutoTuneResult(
+        curve_slope=round(clamped_slope, 1),
+        # Match the 0.5 step of the curve_level number entity
+        curve_level=round(clamped_level * 2) / 2,
+        samples=sums.count,
+        heating_seconds=heating_seconds,
+        r_squared=r_squared,
+        clamped=(clamped_slope, clamped_level) != (slope, level),
+    )
+
+
+def run_auto_tune(
+    source: str,
+    outdoor_entity: str,
+    room_entity: str,
+    flow_entity: str,
+    start_ts: float,
+    end_ts: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AutoTuneResult:
+    """Stream the recorded history and fit slope and level.
+
+    source is the recorder database or a history cache directory. This
+    call blocks and must not run in the event loop.
+    """
+    samples = iter_samples(
+        source,
+        (outdoor_entity, room_entity, flow_entity),
+        start_ts,
+        end_ts,
+        chunk_size,
+    )
+    return fit_curve(samples, end_ts, chunk_size)
@@ -0,0 +1,205 @@
+"""Backtesting of heating curve parameters over recorded history.
+
+Replays recorded outdoor and room temperatures through the same curve and
+hysteresis logic as the sensor for a grid of parameter sets.
+
+The module itself imports nothing from Home Assistant, but imported as
+custom_components.heating_curve.backtest it goes through the package
+__init__, which does. Every spawned worker of run_backtest therefore loads
+Home Assistant before its first task, about a second of start-up, and the
+candidates are split into one group per worker rather than many small
+tasks.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import multiprocessing
+import os
+from typing import Any
+
+from .curve import (
+    CurveParameters,
+    CurveTable,
+    apply_hysteresis,
+    calculate_flow_temperature,
+)
+from .history import DEFAULT_CHUNK_SIZE, iter_samples
+
+
+@dataclass(slots=True)
+class BacktestSummary:
+    """Result of replaying the history for one parameter set."""
+
+    parameters: CurveParameters
+    samples: int = 0
+    switch_count: int = 0
+    active_seconds: float = 0.0
+    flow_integral: float = 0.0
+    time_at_min_flow: float = 0.0
+    time_at_max_flow: float = 0.0
+
+    @property
+    def mean_flow_temp(self) -> float | None:
+        """Return the time weighted mean flow temperature."""
+        if not self.active_seconds:
+            return None
+        return round(self.flow_integral / self.active_seconds, 2)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary as service response data."""
+        return {
+            **asdict(self.parameters),
+            "samples": self.samples,
+            "switch_count": self.switch_count,
+            "mean_flow_temperature": self.mean_flow_temp,
+            "active_seconds": round(self.active_seconds),
+            "time_at_min_flow_seconds": round(self.time_at_min_flow),
+            "time_at_max_flow_seconds": round(self.time_at_max_flow),
+        }
+
+
+class _Simulation:
+    """Output state of one candidate while replaying the history."""
+
+    __slots__ = ("params", "table", "output", "summary")
+
+    def __init__(self, params: CurveParameters) -> None:
+        """Initialize the simulation."""
+        self.params = params
+        self.table: CurveTable | None = params.build_table()
+        self.output: float | None = None
+        self.summary = BacktestSummary(params)
+
+    def advance(self, seconds: float) -> None:
+        """Account the current output for the given time span."""
+        output = self.output
+        if output is None or seconds <= 0:
+            return
+        summary = self.summary
+        summary.active_seconds += seconds
+        summary.flow_integral += output * seconds
+        if output <= self.params.min_flow_temp:
+            summary.time_at_min_flow += seconds
+        if output >= self.params.max_flow_temp:
+            summary.time_at_max_flow += seconds
+
+    def update(self, outdoor_temp: float | None, room_temp: float | None) -> None:
+        """Recompute the output like HeatingCurveSensor does."""
+        self.summary.samples += 1
+        if outdoor_temp is None:
+            self.output = None
+            return
+        params = self.params
+        new_value = calculate_flow_temperature(
+            outdoor_temp,
+            room_temp,
+            params.curve_slope,
+            params.curve_level,
+            params.room_temp_target,
+            params.min_flow_temp,
+            params.max_flow_temp,
+            params.calculation_mode,
+            self.table,
+        )
+        output = apply_hysteresis(new_value, self.output, params.hysteresis)
+        if self.output is not None and output != self.output:
+            self.summary.switch_count += 1
+        self.output = output
+
+
+def simulate(
+    samples: Iterable[tuple[float, Sequence[float | None]]],
+    candidates: Sequence[CurveParameters],
+    end_ts: float,
+) -> list[BacktestSummary]:
+    """Replay (timestamp, (outdoor, room)) samples for all candidates."""
+    simulations = [_Simulation(params) for params in candidates]
+    last_ts: float | None = None
+    for ts, (outdoor_temp, room_temp) in samples:
+        if last_ts is not None:
+            elapsed = ts - last_ts
+            for simulation in simulations:
+                simulation.advance(elapsed)
+        for simulation in simulations:
+            simulation.update(outdoor_temp, room_temp)
+        last_ts = ts
+
+    if last_ts is not None:
+        for simulation in simulations:
+            simulation.advance(end_ts - last_ts)
+
+    return [simulation.summary for simulation in simulations]
+
+
+def _backtest_group(
+    source: str,
+    outdoor_entity: str,
+    room_entity: str | None,
+    start_ts: float,
+    end_ts: float,
+    candidates: Sequence[CurveParameters],
+    chunk_size: int,
+) -> list[BacktestSummary]:
+    """Stream the history once and replay it for a group of candidates."""
+    samples = iter_samples(
+        source, (outdoor_entity, room_entity), start_ts, end_ts, chunk_size
+    )
+    return simulate(samples, candidates, end_ts)
+
+
+def run_backtest(
+    source: str,
+    outdoor_entity: str,
+    room_entity: str | None,
+    start_ts: float,
+    end_ts: float,
+    candidates: Sequence[CurveParameters],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int | None = None,
+) -> list[BacktestSummary]:
+    """Backtest all candidates, spread over a process pool.
+
+    source is the recorder database or a history cache directory. Every
+    worker streams the history itself, so no sample data has to be sent
+    between processes. Workers import the integration package, and with it
+    Home Assistant, so a pool only pays off for long histories or large
+    grids. This call blocks and must not run in the event
+    loop.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(candidates))
+    if workers <= 1:
+        return _backtest_group(
+            source,
+            outdoor_entity,
+            room_entity,
+            start_ts,
+            end_ts,
+            candidates,
+            chunk_size,
+        )
+
+    groups = [candidates[i::workers] for i in range(workers)]
+    # Spawn instead of fork, forking a threaded process is not safe
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        results = list(
+            pool.map(
+                _backtest_group,
+                [source] * workers,
+                [outdoor_entity] * workers,
+                [room_entity] * workers,
+                [start_ts] * workers,
+                [end_ts] * workers,
+                groups,
+                [chunk_size] * workers,
+            )
+        )
+
+    # Restore the original candidate order
+    summaries: list[BacktestSummary] = [None] * len(candidates)  # type: ignore[list-item]
+    for offset, group_result in enumerate(results):
+        summaries[offset::workers] = group_result
+    return summaries
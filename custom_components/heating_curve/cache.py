@@ -0,0 +1,293 @@
+"""Columnar history cache of Heating Curve Calculator.
+
+Copies the recorded outdoor, room and flow temperatures of an entry from
+the recorder database into a pair of flat files per entity: int64
+timestamps in microseconds and float32 values, NaN while unavailable.
+Analytics map the files into memory instead of querying the states
+table, which is slow and competes with the recorder's own writes.
+
+A sync only reads the states recorded after the last cached timestamp.
+Samples older than the retention are dropped by rewriting a series into
+a new generation of files once enough of it has expired. meta.json holds
+the generation and row count of every series and is replaced atomically,
+so a sync interrupted half way leaves the previous state readable. No
+Home Assistant imports.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator
+import json
+import math
+import os
+import shutil
+import struct
+
+from .curve import load_numpy
+from .history import DEFAULT_CHUNK_SIZE, connect, iter_entity_history
+
+CACHE_VERSION = 1
+# Cached timestamps are integer microseconds, the recorder's resolution
+TIMESTAMP_SCALE = 1_000_000
+# States the recorder has not committed yet must not be skipped by the
+# next sync, so a sync stops this many seconds before now
+SYNC_LAG = 300.0
+# float32 keeps about 7 significant digits, rounding restores the
+# recorded values
+VALUE_DECIMALS = 3
+
+_META = "meta.json"
+_FLOAT32 = struct.Struct("f")
+
+
+def _float32(value: float | None) -> float:
+    """Return a value as stored in a float32 column, NaN for None."""
+    if value is None:
+        return math.nan
+    return _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+
+
+def _same(value: float, other: float | None) -> bool:
+    """Return True if two stored values are equal, NaN included."""
+    if other is None:
+        return False
+    return value == other or (math.isnan(value) and math.isnan(other))
+
+
+def remove_history_cache(path: str) -> None:
+    """Delete a cache directory with all its files."""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class HistoryCache:
+    """Append-only column files of the recorded inputs of one entry.
+
+    retention is in seconds; compaction is the fraction of expired rows
+    that triggers the rewrite of a series, 0 rewrites on every expiry.
+    Not thread safe, syncs and reads of one cache must not overlap.
+    """
+
+    def __init__(
+        self, path: str, retention: float = math.inf, compaction: float = 0.0
+    ) -> None:
+        """Initialize the cache, nothing is read before the first access."""
+        self.path = path
+        self.retention = retention
+        self.compaction = compaction
+        # Generation and row count per entity, None until loaded
+        self._series: dict[str, dict[str, int]] | None = None
+
+    @property
+    def series(self) -> dict[str, dict[str, int]]:
+        """Return the cached series, loading meta.json on first use."""
+        if self._series is None:
+            self._series = {}
+            try:
+                with open(
+                    os.path.join(self.path, _META), encoding="utf-8"
+                ) as file:
+                    meta = json.load(file)
+            except (OSError, ValueError):
+                return self._series
+            if meta.get("version") == CACHE_VERSION:
+                self._series = meta["series"]
+        return self._series
+
+    def _save(self) -> None:
+        """Replace meta.json atomically."""
+        target = os.path.join(self.path, _META)
+        with open(f"{target}.tmp", "w", encoding="utf-8") as file:
+            json.dump({"version": CACHE_VERSION, "series": self.series}, file)
+        os.replace(f"{target}.tmp", target)
+
+    def _files(self, entity_id: str, generation: int) -> tuple[str, str]:
+        """Return the timestamp and value file of a series generation."""
+        base = os.path.join(self.path, f"{entity_id}.{generation}")
+        return f"{base}.ts", f"{base}.f32"
+
+    def rows(self, entity_id: str) -> int:
+        """Return the number of cached samples of an entity."""
+        return self.series.get(entity_id, {}).get("rows", 0)
+
+    def read(self, entity_id: str):
+        """Map the timestamps and values of an entity into memory.
+
+        Returns two read-only NumPy arrays, empty if nothing is cached.
+        """
+        numpy = load_numpy()
+        if not (rows := self.rows(entity_id)):
+            return numpy.empty(0, numpy.int64), numpy.empty(0, numpy.float32)
+        ts_file, value_file = self._files(
+            entity_id, self.series[entity_id]["generation"]
+        )
+        return (
+            numpy.memmap(ts_file, numpy.int64, "r", shape=(rows,)),
+            numpy.memmap(value_file, numpy.float32, "r", shape=(rows,)),
+        )
+
+    def _last_sample(self, entity_id: str) -> tuple[int, float] | None:
+        """Return the last cached timestamp and value of an entity."""
+        if not (rows := self.rows(entity_id)):
+            return None
+        ts_file, value_file = self._files(
+            entity_id, self.series[entity_id]["generation"]
+        )
+        timestamp, value = array("q"), array("f")
+        with open(ts_file, "rb") as file:
+            file.seek((rows - 1) * timestamp.itemsize)
+            timestamp.fromfile(file, 1)
+        with open(value_file, "rb") as file:
+            file.seek((rows - 1) * value.itemsize)
+            value.fromfile(file, 1)
+        return timestamp[0], value[0]
+
+    def _append(self, entity_id: str, timestamps: array, values: array) -> None:
+        """Write samples behind the cached rows of an entity.
+
+        Bytes behind the row count, left by an interrupted sync, are
+        overwritten. The new row count is saved with meta.json.
+        """
+        info = self.series.setdefault(entity_id, {"generation": 0, "rows": 0})
+        for path, column in zip(
+            self._files(entity_id, info["generation"]), (timestamps, values)
+        ):
+            with open(path, "r+b" if os.path.exists(path) else "wb") as file:
+                file.seek(info["rows"] * column.itemsize)
+                column.tofile(file)
+                file.truncate()
+        info["rows"] += len(timestamps)
+
+    def _ingest(self, conn, entity_id: str, now: float, chunk_size: int) -> int:
+        """Append the states recorded since the last sync, return the count.
+
+        Repeated values, e.g. attribute-only state changes, are not stored.
+        """
+        if (last := self._last_sample(entity_id)) is None:
+            # The first sync starts with the state current at the start of
+            # the retention window
+            last_ts, last_value = -1, None
+            start = max(now - self.retention, 0.0)
+        else:
+            last_ts, last_value = last
+            start = (last_ts - 1) / TIMESTAMP_SCALE
+
+        count = 0
+        timestamps, values = array("q"), array("f")
+        for ts, value in iter_entity_history(
+            conn, entity_id, start, now - SYNC_LAG, chunk_size
+        ):
+            timestamp = round(ts * TIMESTAMP_SCALE)
+            value = _float32(value)
+            if timestamp <= last_ts or _same(value, last_value):
+                continue
+            timestamps.append(timestamp)
+            values.append(value)
+            last_ts, last_value = timestamp, value
+            if len(timestamps) >= chunk_size:
+                self._append(entity_id, timestamps, values)
+                count += len(timestamps)
+                timestamps, values = array("q"), array("f")
+        if timestamps:
+            self._append(entity_id, timestamps, values)
+            count += len(timestamps)
+        return count
+
+    def sync(
+        self,
+        db_path: str,
+        entity_ids: Iterable[str],
+        now: float,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> dict[str, int]:
+        """Bring the cache up to date with the recorder database.
+
+        Series of entities no longer listed are deleted, expired samples
+        compacted. Returns the number of appended samples per entity. This
+        call blocks and must not run in the event loop.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        entity_ids = set(entity_ids)
+        obsolete = [
+            self._files(entity_id, info["generation"])
+            for entity_id, info in self.series.items()
+            if entity_id not in entity_ids
+        ]
+        for entity_id in set(self.series) - entity_ids:
+            del self.series[entity_id]
+
+        conn = connect(db_path)
+        try:
+            appended = {
+                entity_id: self._ingest(conn, entity_id, now, chunk_size)
+                for entity_id in sorted(entity_ids)
+            }
+        finally:
+            conn.close()
+        obsolete.extend(self._compact(now))
+        self._save()
+        # Old files go only after meta.json no longer references them
+        for files in obsolete:
+            for path in files:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return appended
+
+    def _compact(self, now: float) -> list[tuple[str, str]]:
+        """Rewrite series with enough expired samples, return the old files.
+
+        The last sample before the retention window is kept, it holds the
+        value at the start of the window.
+        """
+        if math.isinf(self.retention):
+            return []
+        numpy = load_numpy()
+        cutoff = round((now - self.retention) * TIMESTAMP_SCALE)
+        obsolete = []
+        for entity_id, info in self.series.items():
+            timestamps, values = self.read(entity_id)
+            first = int(numpy.searchsorted(timestamps, cutoff, "right")) - 1
+            if first <= 0 or first < self.compaction * len(timestamps):
+                continue
+            generation = info["generation"] + 1
+            for path, column in zip(
+                self._files(entity_id, generation), (timestamps, values)
+            ):
+                column[first:].tofile(path)
+            obsolete.append(self._files(entity_id, info["generation"]))
+            info["generation"] = generation
+            info["rows"] = len(timestamps) - first
+        return obsolete
+
+    def iter_entity_history(
+        self,
+        entity_id: str,
+        start_ts: float,
+        end_ts: float,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[tuple[float, float | None]]:
+        """Yield (timestamp, value) like history.iter_entity_history.
+
+        The first item is the value current at start_ts (stamped with
+        start_ts), if there is one. The mapped columns are converted to
+        Python floats chunk by chunk.
+        """
+        numpy = load_numpy()
+        timestamps, values = self.read(entity_id)
+        first, last = numpy.searchsorted(
+            timestamps,
+            [round(start_ts * TIMESTAMP_SCALE), round(end_ts * TIMESTAMP_SCALE)],
+        )
+        if first > 0:
+            value = float(values[first - 1])
+            yield start_ts, None if math.isnan(value) else round(value, VALUE_DECIMALS)
+
+        for offset in range(first, last, chunk_size):
+            end = min(offset + chunk_size, last)
+            chunk_ts = (timestamps[offset:end] / TIMESTAMP_SCALE).tolist()
+            chunk_values = values[offset:end].astype(numpy.float64).round(
+                VALUE_DECIMALS
+            )
+            for ts, value in zip(chunk_ts, chunk_values.tolist()):
+                yield ts, None if math.isnan(value) else value
@@ -0,0 +1,589 @@
+"""Offline command line interface of Heating Curve Calculator.
+
+Streams CSV or Parquet files of timestamped outdoor and room temperatures
+through the same outdoor filter, curve, hysteresis and output limits as
+the sensor and writes the results to a new file per input. Every stage is
+a generator over chunks of rows, so memory stays constant however long
+the archive is, and several files can be processed in parallel:
+
+    python custom_components/heating_curve/cli.py history.csv --curve-slope 1.2
+    python custom_components/heating_curve/cli.py --jobs 4 \\
+        --diagnostics config_entry-heating_curve.json archive/*.csv
+
+Only the modules without Home Assistant imports are loaded, the package
+__init__ is bypassed, so Home Assistant does not need to be installed.
+Parquet needs pyarrow. Setback profiles and the weather forecast are not
+applied.
+"""
+from __future__ import annotations
+
+if not __package__:
+    # Run as a script: load the sibling modules as a package without
+    # executing __init__.py, which imports Home Assistant
+    import importlib.util
+    import os
+    import sys
+
+    _PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+    # The script directory would shadow stdlib modules like select
+    if sys.path and os.path.abspath(sys.path[0]) == _PACKAGE_DIR:
+        del sys.path[0]
+    __package__ = "heating_curve_offline"
+    if __package__ not in sys.modules:
+        _package = importlib.util.module_from_spec(
+            importlib.util.spec_from_loader(__package__, None, is_package=True)
+        )
+        _package.__path__ = [_PACKAGE_DIR]
+        sys.modules[__package__] = _package
+
+import argparse
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from functools import cache
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any
+
+from .const import (
+    CALCULATION_MODES,
+    CONF_BUILDING_TIME_CONSTANT,
+    CONF_CALCULATION_MODE,
+    CONF_CURVE_LEVEL,
+    CONF_CURVE_POINTS,
+    CONF_CURVE_SLOPE,
+    CONF_CURVE_TYPE,
+    CONF_FILTER_WINDOW,
+    CONF_HYSTERESIS,
+    CONF_MAX_FLOW_TEMP,
+    CONF_MIN_FLOW_TEMP,
+    CONF_OUTDOOR_FILTER,
+    CONF_OUTPUT_DWELL_TIME,
+    CONF_OUTPUT_SLEW_RATE,
+    CONF_RADIATOR_EXPONENT,
+    CONF_ROOM_TEMP_TARGET,
+    CURVE_TYPES,
+    DEFAULT_BUILDING_TIME_CONSTANT,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_OUTDOOR_FILTER,
+    DEFAULT_OUTPUT_DWELL_TIME,
+    DEFAULT_OUTPUT_SLEW_RATE,
+    FILTER_NONE,
+    OUTDOOR_FILTERS,
+    PARAMETER_RANGES,
+)
+from .curve import (
+    CurveParameters,
+    apply_hysteresis,
+    calculate_flow_temperature,
+    parse_curve_points,
+)
+from .filters import create_filter
+from .history import DEFAULT_CHUNK_SIZE, parse_state
+from .output import OutputLimiter
+
+# Timestamp, original time value, outdoor and room temperature
+Sample = tuple[float, Any, float | None, float | None]
+# Sample plus filtered outdoor, calculated and published flow temperature
+Result = tuple[
+    float, Any, float | None, float | None, float | None, float | None, float | None
+]
+
+OUTPUT_COLUMNS = (
+    "time",
+    "outdoor_temperature",
+    "filtered_outdoor_temperature",
+    "room_temperature",
+    "calculated_flow_temperature",
+    "flow_temperature",
+)
+
+
+@cache
+def load_pyarrow():
+    """Import pyarrow on first use, None if it is not installed."""
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _require_pyarrow():
+    """Return pyarrow or fail with a hint how to install it."""
+    if (pyarrow := load_pyarrow()) is None:
+        raise RuntimeError("Parquet files need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+@dataclass(frozen=True, slots=True)
+class Columns:
+    """Names of the input columns."""
+
+    time: str = "time"
+    outdoor: str = "outdoor"
+    # Files without this column are processed without room temperature
+    room: str = "room"
+
+
+@dataclass(frozen=True, slots=True)
+class OfflineConfig:
+    """Everything a worker needs to process one file."""
+
+    parameters: CurveParameters = field(default_factory=CurveParameters)
+    outdoor_filter: str = DEFAULT_OUTDOOR_FILTER
+    filter_window: int = DEFAULT_FILTER_WINDOW
+    # Building time constant in s, dwell time in s, slew rate in °C/min
+    time_constant: float = DEFAULT_BUILDING_TIME_CONSTANT * 3600
+    dwell_time: float = DEFAULT_OUTPUT_DWELL_TIME * 60
+    slew_rate: float = DEFAULT_OUTPUT_SLEW_RATE
+    columns: Columns = field(default_factory=Columns)
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+
+def parse_time(value: Any) -> float:
+    """Convert epoch seconds, an ISO 8601 string or a datetime to epoch s.
+
+    Times without a time zone are taken as local time.
+    """
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _temperature(value: Any) -> float | None:
+    """Convert a cell into a temperature, None if missing or not numeric."""
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    return parse_state(value.strip())
+
+
+def read_csv(path: str, columns: Columns, chunk_size: int) -> Iterator[list[Sample]]:
+    """Yield the samples of a CSV file with a header row in chunks."""
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = next(reader, None) or []
+        for name in (columns.time, columns.outdoor):
+            if name not in header:
+                raise ValueError(f"{path}: {name!r} column missing")
+        time_index = header.index(columns.time)
+        outdoor_index = header.index(columns.outdoor)
+        room_index = header.index(columns.room) if columns.room in header else None
+
+        chunk: list[Sample] = []
+        for line, row in enumerate(reader, 2):
+            if not row:
+                continue
+            try:
+                chunk.append(
+                    (
+                        parse_time(row[time_index]),
+                        row[time_index],
+                        _temperature(row[outdoor_index]),
+                        None if room_index is None else _temperature(row[room_index]),
+                    )
+                )
+            except (IndexError, ValueError) as err:
+                raise ValueError(f"{path}:{line}: invalid row") from err
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_parquet(
+    path: str, columns: Columns, chunk_size: int
+) -> Iterator[list[Sample]]:
+    """Yield the samples of a Parquet file batch by batch."""
+    pyarrow = _require_pyarrow()
+    parquet = pyarrow.parquet.ParquetFile(path)
+    names = parquet.schema_arrow.names
+    for name in (columns.time, columns.outdoor):
+        if name not in names:
+            raise ValueError(f"{path}: {name!r} column missing")
+    wanted = [columns.time, columns.outdoor]
+    if columns.room in names:
+        wanted.append(columns.room)
+
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=wanted):
+        times = batch.column(0).to_pylist()
+        outdoor = batch.column(1).to_pylist()
+        room = batch.column(2).to_pylist() if len(wanted) > 2 else [None] * len(times)
+        yield [
+            (parse_time(value), value, _temperature(out), _temperature(inside))
+            for value, out, inside in zip(times, outdoor, room)
+        ]
+
+
+def compute(chunks: Iterable[list[Sample]], config: OfflineConfig) -> Iterator[list[Result]]:
+    """Replay samples like the coordinator and the sensor do, chunk by chunk.
+
+    Output limits step at the sample times only, there is no timer between
+    two samples.
+    """
+    params = config.parameters
+    table = params.build_table()
+    outdoor_filter = (
+        None
+        if config.outdoor_filter == FILTER_NONE
+        else create_filter(
+            config.outdoor_filter, config.filter_window, config.time_constant
+        )
+    )
+    limiter = OutputLimiter(config.dwell_time, config.slew_rate)
+    output: float | None = None
+
+    for chunk in chunks:
+        results: list[Result] = []
+        for timestamp, value, outdoor_temp, room_temp in chunk:
+            filtered = outdoor_temp
+            if outdoor_filter is not None and outdoor_temp is not None:
+                if outdoor_filter.last_ts is None or timestamp > outdoor_filter.last_ts:
+                    outdoor_filter.update(outdoor_temp, timestamp)
+                filtered = round(outdoor_filter.value, 1)
+
+            flow = None
+            if filtered is None:
+                output = None
+            else:
+                flow = calculate_flow_temperature(
+                    filtered,
+                    room_temp,
+                    params.curve_slope,
+                    params.curve_level,
+                    params.room_temp_target,
+                    params.min_flow_temp,
+                    params.max_flow_temp,
+                    params.calculation_mode,
+                    table,
+                )
+                output = apply_hysteresis(flow, output, params.hysteresis)
+            results.append(
+                (
+                    timestamp,
+                    value,
+                    outdoor_temp,
+                    filtered,
+                    room_temp,
+                    flow,
+                    limiter.update(output, timestamp),
+                )
+            )
+        yield results
+
+
+def _cell(value: Any) -> Any:
+    """Format a value for CSV output."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_csv(path: str, chunks: Iterable[list[Result]]) -> int:
+    """Write results as CSV, return the number of rows."""
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows([_cell(cell) for cell in result[1:]] for result in chunk)
+            rows += len(chunk)
+    return rows
+
+
+def write_parquet(path: str, chunks: Iterable[list[Result]]) -> int:
+    """Write results as Parquet, one row group per chunk."""
+    pyarrow = _require_pyarrow()
+    temperature = pyarrow.float64()
+    schema = pyarrow.schema(
+        [(OUTPUT_COLUMNS[0], pyarrow.timestamp("ms", tz="UTC"))]
+        + [(name, temperature) for name in OUTPUT_COLUMNS[1:]]
+    )
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            timestamps, _, *values = zip(*chunk)
+            arrays = [
+                pyarrow.array(
+                    [round(timestamp * 1000) for timestamp in timestamps],
+                    pyarrow.timestamp("ms", tz="UTC"),
+                ),
+                *(pyarrow.array(column, temperature) for column in values),
+            ]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def _is_parquet(path: str) -> bool:
+    """Return True if a path names a Parquet file."""
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def output_path(path: str, output_dir: str | None, output_format: str) -> str:
+    """Return the result file of an input, e.g. history.flow.csv."""
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(output_dir or directory, f"{stem}.flow.{output_format}")
+
+
+def process_file(source: str, target: str, config: OfflineConfig) -> tuple[int, float]:
+    """Process one file, return the number of rows and the seconds taken."""
+    start = time.perf_counter()
+    read = read_parquet if _is_parquet(source) else read_csv
+    write = write_parquet if _is_parquet(target) else write_csv
+    rows = write(target, compute(read(source, config.columns, config.chunk_size), config))
+    return rows, time.perf_counter() - start
+
+
+def process_files(
+    jobs: Sequence[tuple[str, str]], config: OfflineConfig, workers: int = 1
+) -> Iterator[tuple[str, str, int, float]]:
+    """Process files, in a process pool if more than one worker is used.
+
+    Yields (input, output, rows, seconds) per file in input order.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for source, target in jobs:
+            yield source, target, *process_file(source, target, config)
+        return
+
+    # Spawn instead of fork, same as the backtest pool
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        results = pool.map(
+            process_file,
+            [source for source, _ in jobs],
+            [target for _, target in jobs],
+            [config] * len(jobs),
+        )
+        for (source, target), (rows, seconds) in zip(jobs, results):
+            yield source, target, rows, seconds
+
+
+def load_diagnostics(path: str, circuit_id: str | None) -> dict[str, Any]:
+    """Read the options of one circuit from downloaded diagnostics.
+
+    Returns the entry options with the circuit's current parameters and
+    curve points on top.
+    """
+    with open(path, encoding="utf-8") as file:
+        document = json.load(file)
+    data = document.get("data", document)
+    circuits = data.get("circuits") or {}
+    if not circuits:
+        raise ValueError(f"{path}: no circuits in the diagnostics")
+    if circuit_id is None:
+        circuit_id = next(iter(circuits))
+    if circuit_id not in circuits:
+        raise ValueError(
+            f"{path}: unknown circuit {circuit_id!r}, "
+            f"available: {', '.join(circuits)}"
+        )
+    circuit = circuits[circuit_id]
+    options = dict(data.get("config") or {})
+    options.update(circuit.get("parameters") or {})
+    options[CONF_CURVE_POINTS] = tuple(
+        (float(x), float(y)) for x, y in circuit.get("curve_points") or ()
+    )
+    return options
+
+
+def validate_options(options: dict[str, Any]) -> None:
+    """Raise ValueError if a numeric option is outside its range."""
+    for key, (minimum, maximum) in PARAMETER_RANGES.items():
+        if (value := options.get(key)) is None:
+            continue
+        if not minimum <= float(value) <= maximum:
+            raise ValueError(f"{key} must be between {minimum} and {maximum}: {value}")
+
+
+def build_config(options: dict[str, Any], columns: Columns, chunk_size: int) -> OfflineConfig:
+    """Build the processing configuration from integration options.
+
+    Raises ValueError for options outside the ranges of the integration.
+    """
+    validate_options(options)
+    if chunk_size < 1:
+        raise ValueError(f"chunk size must be positive: {chunk_size}")
+    curve_points = options.get(CONF_CURVE_POINTS) or ()
+    if isinstance(curve_points, str):
+        curve_points = parse_curve_points(curve_points)
+    parameters = CurveParameters(
+        **{
+            item.name: options[item.name]
+            for item in fields(CurveParameters)
+            if item.name != CONF_CURVE_POINTS and options.get(item.name) is not None
+        },
+        curve_points=curve_points,
+    )
+    return OfflineConfig(
+        parameters=parameters,
+        outdoor_filter=options.get(CONF_OUTDOOR_FILTER) or DEFAULT_OUTDOOR_FILTER,
+        filter_window=int(options.get(CONF_FILTER_WINDOW) or DEFAULT_FILTER_WINDOW),
+        time_constant=float(
+            options.get(CONF_BUILDING_TIME_CONSTANT) or DEFAULT_BUILDING_TIME_CONSTANT
+        )
+        * 3600,
+        dwell_time=float(options.get(CONF_OUTPUT_DWELL_TIME) or 0) * 60,
+        slew_rate=float(options.get(CONF_OUTPUT_SLEW_RATE) or 0),
+        columns=columns,
+        chunk_size=chunk_size,
+    )
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Return the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="heating_curve",
+        description=(
+            "Calculate the flow temperature for CSV or Parquet files of "
+            "outdoor and room temperatures."
+        ),
+    )
+    parser.add_argument("inputs", nargs="+", metavar="FILE", help="CSV or Parquet files")
+    parser.add_argument("--output-dir", help="directory of the result files")
+    parser.add_argument(
+        "--output-format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="format of the result files (default: csv)",
+    )
+    parser.add_argument("--time-column", default="time")
+    parser.add_argument("--outdoor-column", default="outdoor")
+    parser.add_argument("--room-column", default="room")
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="files processed in parallel"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--diagnostics",
+        metavar="JSON",
+        help="take the parameters from downloaded diagnostics of an entry",
+    )
+    parser.add_argument(
+        "--circuit", help="circuit of the diagnostics (default: the first)"
+    )
+
+    curve = parser.add_argument_group("curve, overriding the diagnostics")
+    curve.add_argument("--curve-slope", dest=CONF_CURVE_SLOPE, type=float)
+    curve.add_argument("--curve-level", dest=CONF_CURVE_LEVEL, type=float)
+    curve.add_argument("--room-temp-target", dest=CONF_ROOM_TEMP_TARGET, type=float)
+    curve.add_argument("--min-flow-temp", dest=CONF_MIN_FLOW_TEMP, type=float)
+    curve.add_argument("--max-flow-temp", dest=CONF_MAX_FLOW_TEMP, type=float)
+    curve.add_argument(
+        "--calculation-mode", dest=CONF_CALCULATION_MODE, choices=CALCULATION_MODES
+    )
+    curve.add_argument("--curve-type", dest=CONF_CURVE_TYPE, choices=CURVE_TYPES)
+    curve.add_argument(
+        "--radiator-exponent", dest=CONF_RADIATOR_EXPONENT, type=float
+    )
+    curve.add_argument(
+        "--curve-points", dest=CONF_CURVE_POINTS, help='e.g. "-15:60, 0:45, 15:30"'
+    )
+    curve.add_argument("--hysteresis", dest=CONF_HYSTERESIS, type=float)
+    curve.add_argument(
+        "--outdoor-filter", dest=CONF_OUTDOOR_FILTER, choices=OUTDOOR_FILTERS
+    )
+    curve.add_argument("--filter-window", dest=CONF_FILTER_WINDOW, type=int)
+    curve.add_argument(
+        "--building-time-constant",
+        dest=CONF_BUILDING_TIME_CONSTANT,
+        type=float,
+        help="hours",
+    )
+    curve.add_argument(
+        "--output-dwell-time", dest=CONF_OUTPUT_DWELL_TIME, type=float, help="minutes"
+    )
+    curve.add_argument(
+        "--output-slew-rate", dest=CONF_OUTPUT_SLEW_RATE, type=float, help="°C/min"
+    )
+    return parser
+
+
+_OPTION_KEYS = (
+    CONF_CURVE_SLOPE,
+    CONF_CURVE_LEVEL,
+    CONF_ROOM_TEMP_TARGET,
+    CONF_MIN_FLOW_TEMP,
+    CONF_MAX_FLOW_TEMP,
+    CONF_CALCULATION_MODE,
+    CONF_CURVE_TYPE,
+    CONF_RADIATOR_EXPONENT,
+    CONF_CURVE_POINTS,
+    CONF_HYSTERESIS,
+    CONF_OUTDOOR_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_BUILDING_TIME_CONSTANT,
+    CONF_OUTPUT_DWELL_TIME,
+    CONF_OUTPUT_SLEW_RATE,
+)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the command line interface, return the exit code."""
+    parser = _parser()
+    args = parser.parse_args(argv)
+    try:
+        options = (
+            load_diagnostics(args.diagnostics, args.circuit)
+            if args.diagnostics
+            else {}
+        )
+        options.update(
+            (key, value)
+            for key in _OPTION_KEYS
+            if (value := getattr(args, key)) is not None
+        )
+        config = build_config(
+            options,
+            Columns(args.time_column, args.outdoor_column, args.room_column),
+            args.chunk_size,
+        )
+    except (OSError, ValueError, TypeError) as err:
+        parser.error(str(err))
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [
+        (path, output_path(path, args.output_dir, args.output_format))
+        for path in args.inputs
+    ]
+    total = 0
+    try:
+        for source, target, rows, seconds in process_files(jobs, config, args.jobs):
+            total += rows
+            print(
+                f"{source} -> {target}: {rows} rows in {seconds:.1f} s",
+                file=sys.stderr,
+            )
+    except (OSError, ValueError, RuntimeError) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    if len(jobs) > 1:
+        print(f"{total} rows in {len(jobs)} files", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,16 +6,67 @@ from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers import selector
 from homeassistant.const import CONF_NAME
+from homeassistant.util import slugify
 
 from .const import (
     DOMAIN,
     CONF_OUTDOOR_SENSOR,
     CONF_ROOM_SENSOR,
+    CONF_ROOM_SENSORS,
+    CONF_ROOM_AGGREGATION,
+    DEFAULT_ROOM_AGGREGATION,
+    ROOM_AGGREGATIONS,
+    CONF_CURVE_POINTS,
+    CONF_UPDATE_DEBOUNCE,
+    DEFAULT_UPDATE_DEBOUNCE,
+    CONF_FIRE_EVENTS,
+    DEFAULT_FIRE_EVENTS,
+    CONF_CIRCUITS,
+    CONF_CIRCUIT_ID,
+    PRIMARY_CIRCUIT,
+    CONF_OUTDOOR_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_BUILDING_TIME_CONSTANT,
+    DEFAULT_OUTDOOR_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_BUILDING_TIME_CONSTANT,
+    OUTDOOR_FILTERS,
+    CONF_WEATHER_ENTITY,
+    CONF_FORECAST_LEAD_TIME,
+    DEFAULT_FORECAST_LEAD_TIME,
+    CONF_SETBACK_PROFILE,
+    CONF_SETBACK_PARAMETER,
+    DEFAULT_SETBACK_PARAMETER,
+    SETBACK_PARAMETERS,
+    CONF_OUTPUT_ENTITY,
+    CONF_OUTPUT_DWELL_TIME,
+    CONF_OUTPUT_SLEW_RATE,
+    DEFAULT_OUTPUT_DWELL_TIME,
+    DEFAULT_OUTPUT_SLEW_RATE,
+    CONF_HISTORY_CACHE_RETENTION,
+    CONF_HISTORY_CACHE_COMPACTION,
+    DEFAULT_HISTORY_CACHE_RETENTION,
+    DEFAULT_HISTORY_CACHE_COMPACTION,
+    OUTPUT_DOMAINS,
+    PARAMETER_RANGES,
 )
+from .curve import parse_curve_points
+from .rooms import parse_room_sensors
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def validate_room_sensors(hass, text):
+    """Return the error key for a room sensor list, None if it is valid."""
+    try:
+        rooms = parse_room_sensors(text)
+    except ValueError:
+        return "invalid_room_sensors"
+    if any(hass.states.get(room.entity_id) is None for room in rooms):
+        return "sensor_not_found"
+    return None
+
+
 class HeatingCurveConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Heating Curve Calculator."""
 
@@ -83,6 +134,13 @@ class HeatingCurveOptionsFlow(config_entries.OptionsFlow):
     """Handle options flow for Heating Curve Calculator."""
 
     async def async_step_init(self, user_input=None):
+        """Choose between the entry settings and managing circuits."""
+        menu_options = ["settings", "add_circuit"]
+        if self.config_entry.data.get(CONF_CIRCUITS):
+            menu_options.append("remove_circuit")
+        return self.async_show_menu(step_id="init", menu_options=menu_options)
+
+    async def async_step_settings(self, user_input=None):
         """Manage the options - sensors can be changed here."""
         errors = {}
         
@@ -100,12 +158,57 @@ class HeatingCurveOptionsFlow(config_entries.OptionsFlow):
                 room_state = self.hass.states.get(room_sensor)
                 if room_state is None:
                     errors[CONF_ROOM_SENSOR] = "sensor_not_found"
+
+            # Validate weather entity if provided
+            weather_entity = user_input.get(CONF_WEATHER_ENTITY)
+            if weather_entity and self.hass.states.get(weather_entity) is None:
+                errors[CONF_WEATHER_ENTITY] = "weather_not_found"
+
+            # Validate curve support points if provided
+            curve_points = user_input.get(CONF_CURVE_POINTS)
+            if curve_points:
+                try:
+                    parse_curve_points(curve_points)
+                except ValueError:
+                    errors[CONF_CURVE_POINTS] = "invalid_curve_points"
+
+            # Validate further room sensors if provided
+            room_sensors = user_input.get(CONF_ROOM_SENSORS)
+            if room_sensors and (
+                error := validate_room_sensors(self.hass, room_sensors)
+            ):
+                errors[CONF_ROOM_SENSORS] = error
+
+            # Validate output entity if provided
+            output_entity = user_input.get(CONF_OUTPUT_ENTITY)
+            if output_entity and self.hass.states.get(output_entity) is None:
+                errors[CONF_OUTPUT_ENTITY] = "output_not_found"
+
+            # Validate setback profile if provided
+            setback_profile = user_input.get(CONF_SETBACK_PROFILE)
+            if setback_profile:
+                # pylint: disable-next=import-outside-toplevel
+                from .setback import parse_setback_profile
+
+                try:
+                    parse_setback_profile(setback_profile)
+                except ValueError:
+                    errors[CONF_SETBACK_PROFILE] = "invalid_setback_profile"
             
             if not errors:
                 # Update config entry with new sensors
+                data = {**self.config_entry.data, **user_input}
+                if not weather_entity:
+                    # Cleared, which turns the predictive mode off
+                    data.pop(CONF_WEATHER_ENTITY, None)
+                if not setback_profile:
+                    data.pop(CONF_SETBACK_PROFILE, None)
+                if not room_sensors:
+                    data.pop(CONF_ROOM_SENSORS, None)
+                if not output_entity:
+                    data.pop(CONF_OUTPUT_ENTITY, None)
                 self.hass.config_entries.async_update_entry(
-                    self.config_entry,
-                    data={**self.config_entry.data, **user_input},
+                    self.config_entry, data=data
                 )
                 return self.async_create_entry(title="", data={})
 
@@ -138,8 +241,322 @@ class HeatingCurveOptionsFlow(config_entries.OptionsFlow):
                 )
             )
 
+        schema_dict[
+            vol.Optional(
+                CONF_ROOM_SENSORS,
+                description={
+                    "suggested_value": current_data.get(CONF_ROOM_SENSORS)
+                },
+            )
+        ] = selector.TextSelector(selector.TextSelectorConfig(multiline=True))
+        schema_dict[
+            vol.Optional(
+                CONF_ROOM_AGGREGATION,
+                default=current_data.get(
+                    CONF_ROOM_AGGREGATION, DEFAULT_ROOM_AGGREGATION
+                ),
+            )
+        ] = selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=ROOM_AGGREGATIONS,
+                translation_key=CONF_ROOM_AGGREGATION,
+                mode=selector.SelectSelectorMode.DROPDOWN,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_CURVE_POINTS,
+                default=current_data.get(CONF_CURVE_POINTS, ""),
+            )
+        ] = selector.TextSelector()
+        schema_dict[
+            vol.Optional(
+                CONF_UPDATE_DEBOUNCE,
+                default=current_data.get(
+                    CONF_UPDATE_DEBOUNCE, DEFAULT_UPDATE_DEBOUNCE
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_UPDATE_DEBOUNCE][0],
+                max=PARAMETER_RANGES[CONF_UPDATE_DEBOUNCE][1],
+                step=0.1,
+                unit_of_measurement="s",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_OUTDOOR_FILTER,
+                default=current_data.get(
+                    CONF_OUTDOOR_FILTER, DEFAULT_OUTDOOR_FILTER
+                ),
+            )
+        ] = selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=OUTDOOR_FILTERS,
+                translation_key=CONF_OUTDOOR_FILTER,
+                mode=selector.SelectSelectorMode.DROPDOWN,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_FILTER_WINDOW,
+                default=current_data.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_FILTER_WINDOW][0],
+                max=PARAMETER_RANGES[CONF_FILTER_WINDOW][1],
+                step=1,
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_BUILDING_TIME_CONSTANT,
+                default=current_data.get(
+                    CONF_BUILDING_TIME_CONSTANT, DEFAULT_BUILDING_TIME_CONSTANT
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_BUILDING_TIME_CONSTANT][0],
+                max=PARAMETER_RANGES[CONF_BUILDING_TIME_CONSTANT][1],
+                step=0.5,
+                unit_of_measurement="h",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_WEATHER_ENTITY,
+                description={
+                    "suggested_value": current_data.get(CONF_WEATHER_ENTITY)
+                },
+            )
+        ] = selector.EntitySelector(selector.EntitySelectorConfig(domain="weather"))
+        schema_dict[
+            vol.Optional(
+                CONF_FORECAST_LEAD_TIME,
+                default=current_data.get(
+                    CONF_FORECAST_LEAD_TIME, DEFAULT_FORECAST_LEAD_TIME
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_FORECAST_LEAD_TIME][0],
+                max=PARAMETER_RANGES[CONF_FORECAST_LEAD_TIME][1],
+                step=0.5,
+                unit_of_measurement="h",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_SETBACK_PROFILE,
+                description={
+                    "suggested_value": current_data.get(CONF_SETBACK_PROFILE)
+                },
+            )
+        ] = selector.TextSelector(selector.TextSelectorConfig(multiline=True))
+        schema_dict[
+            vol.Optional(
+                CONF_SETBACK_PARAMETER,
+                default=current_data.get(
+                    CONF_SETBACK_PARAMETER, DEFAULT_SETBACK_PARAMETER
+                ),
+            )
+        ] = selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=SETBACK_PARAMETERS,
+                translation_key=CONF_SETBACK_PARAMETER,
+                mode=selector.SelectSelectorMode.DROPDOWN,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_OUTPUT_ENTITY,
+                description={
+                    "suggested_value": current_data.get(CONF_OUTPUT_ENTITY)
+                },
+            )
+        ] = selector.EntitySelector(
+            selector.EntitySelectorConfig(domain=OUTPUT_DOMAINS)
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_OUTPUT_DWELL_TIME,
+                default=current_data.get(
+                    CONF_OUTPUT_DWELL_TIME, DEFAULT_OUTPUT_DWELL_TIME
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_OUTPUT_DWELL_TIME][0],
+                max=PARAMETER_RANGES[CONF_OUTPUT_DWELL_TIME][1],
+                step=1,
+                unit_of_measurement="min",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_OUTPUT_SLEW_RATE,
+                default=current_data.get(
+                    CONF_OUTPUT_SLEW_RATE, DEFAULT_OUTPUT_SLEW_RATE
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_OUTPUT_SLEW_RATE][0],
+                max=PARAMETER_RANGES[CONF_OUTPUT_SLEW_RATE][1],
+                step=0.1,
+                unit_of_measurement="°C/min",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_HISTORY_CACHE_RETENTION,
+                default=current_data.get(
+                    CONF_HISTORY_CACHE_RETENTION, DEFAULT_HISTORY_CACHE_RETENTION
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_HISTORY_CACHE_RETENTION][0],
+                max=PARAMETER_RANGES[CONF_HISTORY_CACHE_RETENTION][1],
+                step=1,
+                unit_of_measurement="d",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_HISTORY_CACHE_COMPACTION,
+                default=current_data.get(
+                    CONF_HISTORY_CACHE_COMPACTION, DEFAULT_HISTORY_CACHE_COMPACTION
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=PARAMETER_RANGES[CONF_HISTORY_CACHE_COMPACTION][0],
+                max=PARAMETER_RANGES[CONF_HISTORY_CACHE_COMPACTION][1],
+                step=1,
+                unit_of_measurement="%",
+                mode=selector.NumberSelectorMode.SLIDER,
+            )
+        )
+        schema_dict[
+            vol.Optional(
+                CONF_FIRE_EVENTS,
+                default=current_data.get(CONF_FIRE_EVENTS, DEFAULT_FIRE_EVENTS),
+            )
+        ] = selector.BooleanSelector()
+
         data_schema = vol.Schema(schema_dict)
 
-        return self.async_show_form(step_id="init", data_schema=data_schema, errors=errors)
+        return self.async_show_form(
+            step_id="settings", data_schema=data_schema, errors=errors
+        )
+
+    async def async_step_add_circuit(self, user_input=None):
+        """Add a heating circuit sharing the entry's outdoor sensor."""
+        errors = {}
+        circuits = list(self.config_entry.data.get(CONF_CIRCUITS, []))
+
+        if user_input is not None:
+            room_sensor = user_input.get(CONF_ROOM_SENSOR)
+            if room_sensor and self.hass.states.get(room_sensor) is None:
+                errors[CONF_ROOM_SENSOR] = "sensor_not_found"
+
+            curve_points = user_input.get(CONF_CURVE_POINTS)
+            if curve_points:
+                try:
+                    parse_curve_points(curve_points)
+                except ValueError:
+                    errors[CONF_CURVE_POINTS] = "invalid_curve_points"
+
+            room_sensors = user_input.get(CONF_ROOM_SENSORS)
+            if room_sensors and (
+                error := validate_room_sensors(self.hass, room_sensors)
+            ):
+                errors[CONF_ROOM_SENSORS] = error
+
+            output_entity = user_input.get(CONF_OUTPUT_ENTITY)
+            if output_entity and self.hass.states.get(output_entity) is None:
+                errors[CONF_OUTPUT_ENTITY] = "output_not_found"
+
+            circuit_id = slugify(user_input[CONF_NAME])
+            taken = {PRIMARY_CIRCUIT, *(c[CONF_CIRCUIT_ID] for c in circuits)}
+            if not circuit_id or circuit_id in taken:
+                errors[CONF_NAME] = "circuit_exists"
+
+            if not errors:
+                circuits.append({CONF_CIRCUIT_ID: circuit_id, **user_input})
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry,
+                    data={**self.config_entry.data, CONF_CIRCUITS: circuits},
+                )
+                return self.async_create_entry(title="", data={})
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_NAME): selector.TextSelector(),
+                vol.Optional(CONF_ROOM_SENSOR): selector.EntitySelector(
+                    selector.EntitySelectorConfig(
+                        domain="sensor",
+                        device_class="temperature",
+                    )
+                ),
+                vol.Optional(CONF_ROOM_SENSORS): selector.TextSelector(
+                    selector.TextSelectorConfig(multiline=True)
+                ),
+                vol.Optional(CONF_CURVE_POINTS): selector.TextSelector(),
+                vol.Optional(CONF_OUTPUT_ENTITY): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain=OUTPUT_DOMAINS)
+                ),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="add_circuit", data_schema=data_schema, errors=errors
+        )
+
+    async def async_step_remove_circuit(self, user_input=None):
+        """Remove additional heating circuits."""
+        circuits = self.config_entry.data.get(CONF_CIRCUITS, [])
+
+        if user_input is not None:
+            removed = set(user_input[CONF_CIRCUITS])
+            self.hass.config_entries.async_update_entry(
+                self.config_entry,
+                data={
+                    **self.config_entry.data,
+                    CONF_CIRCUITS: [
+                        c for c in circuits if c[CONF_CIRCUIT_ID] not in removed
+                    ],
+                },
+            )
+            return self.async_create_entry(title="", data={})
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_CIRCUITS): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[
+                            selector.SelectOptionDict(
+                                value=c[CONF_CIRCUIT_ID], label=c[CONF_NAME]
+                            )
+                            for c in circuits
+                        ],
+                        multiple=True,
+                    )
+                ),
+            }
+        )
+
+        return self.async_show_form(step_id="remove_circuit", data_schema=data_schema)
 
 
@@ -5,6 +5,8 @@ DOMAIN = "heating_curve"
 # Configuration keys
 CONF_OUTDOOR_SENSOR = "outdoor_sensor"
 CONF_ROOM_SENSOR = "room_sensor"
+CONF_ROOM_SENSORS = "room_sensors"
+CONF_ROOM_AGGREGATION = "room_aggregation"
 CONF_CURVE_SLOPE = "curve_slope"
 CONF_CURVE_LEVEL = "curve_level"
 CONF_ROOM_TEMP_TARGET = "room_temp_target"
@@ -12,6 +14,45 @@ CONF_MIN_FLOW_TEMP = "min_flow_temp"
 CONF_MAX_FLOW_TEMP = "max_flow_temp"
 CONF_CALCULATION_MODE = "calculation_mode"
 CONF_HYSTERESIS = "hysteresis"
+CONF_CURVE_TYPE = "curve_type"
+CONF_RADIATOR_EXPONENT = "radiator_exponent"
+CONF_CURVE_POINTS = "curve_points"
+CONF_UPDATE_DEBOUNCE = "update_debounce"
+CONF_FIRE_EVENTS = "fire_events"
+CONF_OUTDOOR_FILTER = "outdoor_filter"
+CONF_FILTER_WINDOW = "filter_window"
+CONF_BUILDING_TIME_CONSTANT = "building_time_constant"
+CONF_WEATHER_ENTITY = "weather_entity"
+CONF_FORECAST_LEAD_TIME = "forecast_lead_time"
+CONF_SETBACK_PROFILE = "setback_profile"
+CONF_SETBACK_PARAMETER = "setback_parameter"
+CONF_OUTPUT_ENTITY = "output_entity"
+CONF_OUTPUT_DWELL_TIME = "output_dwell_time"
+CONF_OUTPUT_SLEW_RATE = "output_slew_rate"
+CONF_HISTORY_CACHE_RETENTION = "history_cache_retention"
+CONF_HISTORY_CACHE_COMPACTION = "history_cache_compaction"
+CONF_CIRCUITS = "circuits"
+CONF_CIRCUIT_ID = "circuit_id"
+
+# Circuit id of the circuit configured by the entry's own name, room sensor
+# and curve points. Its entities keep the unique ids of single circuit
+# entries.
+PRIMARY_CIRCUIT = "main"
+
+# Dispatcher signal (formatted with the config entry id) sent with the
+# circuit id and parameter key when a parameter of a circuit changes
+SIGNAL_PARAMETER_CHANGED = f"{DOMAIN}_parameter_changed_{{}}"
+
+# Optional bus event for automations
+EVENT_PARAMETER_CHANGED = f"{DOMAIN}_parameter_changed"
+
+# Outdoor temperature range and step of the curve table for charts
+CHART_MIN_OUTDOOR_TEMP = -25.0
+CHART_MAX_OUTDOOR_TEMP = 20.0
+CHART_STEP = 1.0
+
+# Parameters a setback profile can shift
+SETBACK_PARAMETERS = [CONF_ROOM_TEMP_TARGET, CONF_CURVE_LEVEL]
 
 # Calculation modes
 MODE_CLASSIC = "classic"
@@ -19,6 +60,32 @@ MODE_WITH_ROOM_TEMP = "with_room_temp"
 
 CALCULATION_MODES = [MODE_CLASSIC, MODE_WITH_ROOM_TEMP]
 
+# Aggregation of the demand of several room sensors
+AGGREGATION_WORST_CASE = "worst_case"
+AGGREGATION_WEIGHTED = "weighted"
+
+ROOM_AGGREGATIONS = [AGGREGATION_WORST_CASE, AGGREGATION_WEIGHTED]
+
+# Outdoor temperature filters
+FILTER_NONE = "none"
+FILTER_MOVING_AVERAGE = "moving_average"
+FILTER_EMA = "ema"
+FILTER_TIME_CONSTANT = "time_constant"
+
+OUTDOOR_FILTERS = [FILTER_NONE, FILTER_MOVING_AVERAGE, FILTER_EMA, FILTER_TIME_CONSTANT]
+
+# Curve types
+CURVE_TYPE_LINEAR = "linear"
+CURVE_TYPE_EXPONENT = "exponent"
+CURVE_TYPE_POINTS = "points"
+
+CURVE_TYPES = [CURVE_TYPE_LINEAR, CURVE_TYPE_EXPONENT, CURVE_TYPE_POINTS]
+
+# Difference between room and outdoor temperature at the design point
+# (20 °C room, -15 °C outdoor). The exponent curve meets the linear curve
+# of the same slope there.
+DESIGN_TEMP_DIFFERENCE = 35.0
+
 # Default values
 DEFAULT_CURVE_SLOPE = 1.4
 DEFAULT_CURVE_LEVEL = 0.0
@@ -27,5 +94,46 @@ DEFAULT_MIN_FLOW_TEMP = 20.0
 DEFAULT_MAX_FLOW_TEMP = 75.0
 DEFAULT_CALCULATION_MODE = MODE_CLASSIC
 DEFAULT_HYSTERESIS = 1.0
+DEFAULT_CURVE_TYPE = CURVE_TYPE_LINEAR
+DEFAULT_RADIATOR_EXPONENT = 1.3
+DEFAULT_UPDATE_DEBOUNCE = 0.0
+DEFAULT_FIRE_EVENTS = False
+DEFAULT_OUTDOOR_FILTER = FILTER_NONE
+DEFAULT_FILTER_WINDOW = 12
+DEFAULT_BUILDING_TIME_CONSTANT = 12.0  # hours
+DEFAULT_FORECAST_LEAD_TIME = 2.0  # hours
+DEFAULT_SETBACK_PARAMETER = CONF_ROOM_TEMP_TARGET
+DEFAULT_ROOM_AGGREGATION = AGGREGATION_WORST_CASE
+DEFAULT_OUTPUT_DWELL_TIME = 0.0  # minutes, 0 disables
+DEFAULT_OUTPUT_SLEW_RATE = 0.0  # °C per minute, 0 disables
+DEFAULT_HISTORY_CACHE_RETENTION = 0  # days, 0 disables the cache
+DEFAULT_HISTORY_CACHE_COMPACTION = 25  # percent of expired samples
+
+# Valid (min, max) of every numeric parameter and option, in the units of
+# the number entities and the options flow. The number entities, the
+# options flow selectors, the service schemas, auto-tune and the offline
+# CLI all take their limits from here.
+PARAMETER_RANGES: dict[str, tuple[float, float]] = {
+    CONF_CURVE_SLOPE: (0.1, 5.0),
+    CONF_CURVE_LEVEL: (-20.0, 20.0),
+    CONF_ROOM_TEMP_TARGET: (15.0, 25.0),
+    CONF_MIN_FLOW_TEMP: (15.0, 50.0),
+    CONF_MAX_FLOW_TEMP: (40.0, 90.0),
+    CONF_HYSTERESIS: (0.0, 5.0),
+    CONF_RADIATOR_EXPONENT: (1.0, 2.0),
+    CONF_UPDATE_DEBOUNCE: (0, 60),  # seconds
+    CONF_FILTER_WINDOW: (2, 1000),  # readings
+    CONF_BUILDING_TIME_CONSTANT: (0.5, 72),  # hours
+    CONF_FORECAST_LEAD_TIME: (0, 12),  # hours
+    CONF_OUTPUT_DWELL_TIME: (0, 240),  # minutes
+    CONF_OUTPUT_SLEW_RATE: (0, 10),  # °C per minute
+    CONF_HISTORY_CACHE_RETENTION: (0, 3650),  # days
+    CONF_HISTORY_CACHE_COMPACTION: (0, 100),  # percent
+}
 
+# Domains of entities the flow temperature can be written to
+OUTPUT_DOMAINS = ["number", "climate", "water_heater"]
 
+# Hours of the weather forecast used for the predictive schedule
+FORECAST_HORIZON = 48
+HOUR = 3600.0
@@ -0,0 +1,839 @@
+"""Input coordination for the heating circuits of a config entry."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Container, Iterable, Mapping
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import (
+    async_track_point_in_time,
+    async_track_point_in_utc_time,
+    async_track_state_change_event,
+    async_track_time_interval,
+)
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_OUTDOOR_SENSOR,
+    CONF_ROOM_AGGREGATION,
+    CONF_OUTPUT_DWELL_TIME,
+    CONF_OUTPUT_SLEW_RATE,
+    CONF_UPDATE_DEBOUNCE,
+    CONF_OUTDOOR_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_BUILDING_TIME_CONSTANT,
+    CONF_WEATHER_ENTITY,
+    CONF_FORECAST_LEAD_TIME,
+    CONF_SETBACK_PROFILE,
+    CONF_SETBACK_PARAMETER,
+    CONF_HISTORY_CACHE_RETENTION,
+    CONF_HISTORY_CACHE_COMPACTION,
+    DEFAULT_ROOM_AGGREGATION,
+    DEFAULT_OUTPUT_DWELL_TIME,
+    DEFAULT_OUTPUT_SLEW_RATE,
+    DEFAULT_UPDATE_DEBOUNCE,
+    DEFAULT_OUTDOOR_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_BUILDING_TIME_CONSTANT,
+    DEFAULT_FORECAST_LEAD_TIME,
+    DEFAULT_SETBACK_PARAMETER,
+    DEFAULT_HISTORY_CACHE_RETENTION,
+    DEFAULT_HISTORY_CACHE_COMPACTION,
+    FILTER_NONE,
+    FORECAST_HORIZON,
+    HOUR,
+    MODE_WITH_ROOM_TEMP,
+    SIGNAL_PARAMETER_CHANGED,
+)
+from .models import HeatingCurveCircuit, HeatingCurveStats
+
+if TYPE_CHECKING:
+    from .cache import HistoryCache
+    from .filters import OutdoorFilter
+    from .forecast import ForecastSchedule
+    from .setback import SetbackSchedule
+    from .writer import SetpointWriter
+
+_LOGGER = logging.getLogger(__name__)
+
+FILTER_STORAGE_VERSION = 1
+# Filter state is written at most this often, and on shutdown
+FILTER_SAVE_DELAY = 60
+# Forecasts are fetched at most this often when the weather entity updates
+FORECAST_FETCH_COOLDOWN = 60
+# The history cache is synced this often, and before every analysis
+HISTORY_CACHE_SYNC_INTERVAL = timedelta(hours=1)
+
+
+def filter_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the outdoor filter state of an entry."""
+    return Store(hass, FILTER_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.outdoor_filter")
+
+
+def history_cache_path(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the directory of the history cache of an entry."""
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.history")
+
+
+def parse_temperature(state: State | None) -> float | None:
+    """Return the numeric value of a temperature sensor state."""
+    if state is None or state.state in ("unknown", "unavailable"):
+        return None
+    try:
+        return float(state.state)
+    except (ValueError, TypeError):
+        return None
+
+
+class HeatingCurveCoordinator:
+    """Track the inputs of all circuits of an entry and batch recomputes.
+
+    The outdoor sensor is subscribed and parsed once per entry, room sensors
+    once per entity even if circuits share them. Changes mark the affected
+    circuits dirty, and a single debounced pass recomputes only those.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        circuits: dict[str, HeatingCurveCircuit],
+    ) -> None:
+        """Initialize the coordinator."""
+        self.hass = hass
+        self.entry = entry
+        self.circuits = circuits
+        self.outdoor_sensor: str = entry.data[CONF_OUTDOOR_SENSOR]
+        self.outdoor_temp: float | None = None
+        self._listeners: dict[str, Callable[[], bool]] = {}
+        self._dirty: set[str] = set()
+        # Time of the first event not yet recomputed, for the write latency
+        self._pending_since: float | None = None
+        self.stats = HeatingCurveStats()
+        # Writes the flow temperatures to the circuits' output entities,
+        # created for the first write
+        self.writer: SetpointWriter | None = None
+        self._room_circuits: dict[str, list[HeatingCurveCircuit]] = {}
+        self._room_aggregation: str = entry.data.get(
+            CONF_ROOM_AGGREGATION, DEFAULT_ROOM_AGGREGATION
+        )
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._input_unsubs: list[CALLBACK_TYPE] = []
+
+        # Optional smoothing of the outdoor temperature
+        self._filter: OutdoorFilter | None = None
+        self._filter_store: Store | None = None
+        # Removal of the previous filter's state, the new store waits for it
+        self._filter_store_task: asyncio.Task | None = None
+        self._filter_config: tuple | None = None
+        self._configure_filter(entry.data)
+
+        # Optional forecast of the weather entity, the setpoint is taken from
+        # the forecast hour one lead time ahead
+        self.weather_entity: str | None = entry.data.get(CONF_WEATHER_ENTITY)
+        self.forecast_lead_time: float = (
+            entry.data.get(CONF_FORECAST_LEAD_TIME, DEFAULT_FORECAST_LEAD_TIME) * 3600
+        )
+        self.forecast: ForecastSchedule | None = None
+        self.forecast_hour: float | None = None
+        self._configure_forecast()
+        self._forecast_timer: CALLBACK_TYPE | None = None
+        self._forecast_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=FORECAST_FETCH_COOLDOWN,
+            immediate=True,
+            function=self._async_fetch_forecast,
+        )
+
+        # Optional weekly setback profile shifting the room target or level
+        self.setback_schedule: SetbackSchedule | None = None
+        self.setback_parameter: str = DEFAULT_SETBACK_PARAMETER
+        self.setback_next_change: datetime | None = None
+        self._setback_timer: CALLBACK_TYPE | None = None
+        self._configure_setback(entry.data)
+
+        # Coalesces bursts of input and parameter events into one pass. A
+        # plain loop timer instead of a Debouncer: the Debouncer drops a
+        # call made while its previous run is being started, so a change
+        # arriving during a recompute was not recomputed until the next one
+        self._update_debounce: float = entry.data.get(
+            CONF_UPDATE_DEBOUNCE, DEFAULT_UPDATE_DEBOUNCE
+        )
+        self._refresh_handle: asyncio.TimerHandle | None = None
+        self._stopped = False
+
+        # Output limits of all circuits, one timer for the earliest step
+        self._output_timer: asyncio.TimerHandle | None = None
+        self._configure_output(entry.data)
+
+        # Optional columnar copy of the recorded inputs for the analytics,
+        # the lock keeps syncs away from running analyses
+        self.history_cache: HistoryCache | None = None
+        self.history_rows: dict[str, int] = {}
+        self.history_synced_at: datetime | None = None
+        self._history_lock = asyncio.Lock()
+        self._history_timer: CALLBACK_TYPE | None = None
+        self._configure_history_cache(entry.data)
+
+    def _configure_filter(self, data: Mapping[str, Any]) -> None:
+        """Create the outdoor filter, keep the current one if unchanged."""
+        kind = data.get(CONF_OUTDOOR_FILTER, DEFAULT_OUTDOOR_FILTER)
+        window = int(data.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW))
+        time_constant = (
+            data.get(CONF_BUILDING_TIME_CONSTANT, DEFAULT_BUILDING_TIME_CONSTANT)
+            * 3600
+        )
+        # A filter fed by another sensor starts over
+        config = (self.outdoor_sensor, kind, window, time_constant)
+        if config == self._filter_config:
+            return
+        if self._filter_store is not None:
+            # Stale state must not be restored into the new filter. The new
+            # store has the same key, so it is only opened once the old file
+            # is gone, a save before that could be deleted with it
+            self._filter_store_task = self.hass.async_create_task(
+                self._async_replace_filter_store(self._filter_store)
+            )
+            self._filter_store = None
+        self._filter_config = config
+
+        if kind == FILTER_NONE:
+            self._filter = None
+            return
+        # pylint: disable-next=import-outside-toplevel
+        from .filters import create_filter
+
+        self._filter = create_filter(kind, window, time_constant)
+        if self._filter_store_task is None:
+            self._filter_store = filter_store(self.hass, self.entry.entry_id)
+
+    async def _async_replace_filter_store(self, store: Store) -> None:
+        """Delete the previous filter's state, then open the current store."""
+        await store.async_remove()
+        self._filter_store_task = None
+        if self._filter is not None:
+            self._filter_store = filter_store(self.hass, self.entry.entry_id)
+
+    def _configure_output(self, data: Mapping[str, Any]) -> None:
+        """Apply the dwell time and slew rate to the circuits' outputs."""
+        dwell_time = (
+            data.get(CONF_OUTPUT_DWELL_TIME, DEFAULT_OUTPUT_DWELL_TIME) * 60
+        )
+        slew_rate = data.get(CONF_OUTPUT_SLEW_RATE, DEFAULT_OUTPUT_SLEW_RATE)
+        for circuit in self.circuits.values():
+            circuit.output.configure(dwell_time, slew_rate)
+
+    def _configure_forecast(self) -> None:
+        """Start an empty forecast schedule for the weather entity, if any."""
+        self.forecast = None
+        self.forecast_hour = None
+        if self.weather_entity:
+            # pylint: disable-next=import-outside-toplevel
+            from .forecast import ForecastSchedule
+
+            self.forecast = ForecastSchedule()
+
+    def _configure_history_cache(self, data: Mapping[str, Any]) -> None:
+        """Create, adjust or remove the history cache of the entry."""
+        retention = data.get(
+            CONF_HISTORY_CACHE_RETENTION, DEFAULT_HISTORY_CACHE_RETENTION
+        )
+        if not retention:
+            if self.history_cache is not None:
+                self.history_cache = None
+                self.history_rows = {}
+                # The files of a disabled cache would only go stale
+                self.hass.async_create_task(self._async_remove_history_cache())
+            return
+        if self.history_cache is None:
+            # pylint: disable-next=import-outside-toplevel
+            from .cache import HistoryCache
+
+            self.history_cache = HistoryCache(
+                history_cache_path(self.hass, self.entry.entry_id)
+            )
+        self.history_cache.retention = retention * 86400
+        self.history_cache.compaction = (
+            data.get(CONF_HISTORY_CACHE_COMPACTION, DEFAULT_HISTORY_CACHE_COMPACTION)
+            / 100
+        )
+
+    def _configure_setback(self, data: Mapping[str, Any]) -> None:
+        """Compile the setback profile of the entry."""
+        self.setback_parameter = data.get(
+            CONF_SETBACK_PARAMETER, DEFAULT_SETBACK_PARAMETER
+        )
+        self.setback_schedule = None
+        if profile := data.get(CONF_SETBACK_PROFILE):
+            # pylint: disable-next=import-outside-toplevel
+            from .setback import SetbackSchedule, parse_setback_profile
+
+            try:
+                self.setback_schedule = SetbackSchedule(
+                    parse_setback_profile(profile)
+                )
+            except ValueError:
+                _LOGGER.warning(
+                    "Ignoring invalid setback profile of %s: %s",
+                    self.entry.title,
+                    profile,
+                )
+
+    async def async_load(self) -> None:
+        """Restore the outdoor filter state saved before the last restart."""
+        if self._filter_store is None:
+            return
+        if data := await self._filter_store.async_load():
+            self._filter.restore(data)
+
+    async def async_save(self) -> None:
+        """Write the outdoor filter state now, e.g. before a reload."""
+        if self._filter_store_task is not None:
+            await self._filter_store_task
+        if self._filter_store is not None and self._filter.last_ts is not None:
+            await self._filter_store.async_save(self._filter.as_dict())
+
+    @callback
+    def async_start(self) -> None:
+        """Read the current inputs and subscribe to their changes."""
+        self._unsubs.append(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_PARAMETER_CHANGED.format(self.entry.entry_id),
+                self._async_parameter_changed,
+            )
+        )
+        self._async_track_inputs()
+        self._async_update_setback()
+        self._history_timer = async_track_time_interval(
+            self.hass, self._async_history_interval, HISTORY_CACHE_SYNC_INTERVAL
+        )
+
+    @callback
+    def async_reconfigure(self, data: Mapping[str, Any]) -> None:
+        """Apply changed options without reloading the entry.
+
+        The circuits must already carry their new room sensors. Inputs are
+        resubscribed and read again, while the sensors keep their last
+        output and hysteresis state.
+        """
+        self._async_untrack_inputs()
+        self.outdoor_sensor = data[CONF_OUTDOOR_SENSOR]
+        self._room_aggregation = data.get(
+            CONF_ROOM_AGGREGATION, DEFAULT_ROOM_AGGREGATION
+        )
+        self._configure_filter(data)
+        self._update_debounce = data.get(CONF_UPDATE_DEBOUNCE, DEFAULT_UPDATE_DEBOUNCE)
+        if data.get(CONF_WEATHER_ENTITY) != self.weather_entity:
+            self.weather_entity = data.get(CONF_WEATHER_ENTITY)
+            self._configure_forecast()
+        self.forecast_lead_time = (
+            data.get(CONF_FORECAST_LEAD_TIME, DEFAULT_FORECAST_LEAD_TIME) * 3600
+        )
+        self._configure_setback(data)
+        self._configure_output(data)
+        self._configure_history_cache(data)
+        self._async_track_inputs()
+        self._async_update_setback()
+        self.async_request_refresh()
+
+    @callback
+    def async_stop(self) -> None:
+        """Unsubscribe from all inputs."""
+        self._async_untrack_inputs()
+        while self._unsubs:
+            self._unsubs.pop()()
+        self._stopped = True
+        self._async_cancel_refresh()
+        if self._output_timer is not None:
+            self._output_timer.cancel()
+            self._output_timer = None
+        if self.writer is not None:
+            self.writer.async_stop()
+        self._forecast_debouncer.async_shutdown()
+        if self._setback_timer is not None:
+            self._setback_timer()
+            self._setback_timer = None
+        if self._history_timer is not None:
+            self._history_timer()
+            self._history_timer = None
+
+    @callback
+    def _async_track_inputs(self) -> None:
+        """Seed the inputs from their current states and track them."""
+        self.outdoor_temp = self._filtered_outdoor_temp(
+            self.hass.states.get(self.outdoor_sensor)
+        )
+        room_sensors: dict[str, list[HeatingCurveCircuit]] = {}
+        for circuit in self.circuits.values():
+            rooms = circuit.room_configs()
+            circuit.room_demand = None
+            if rooms:
+                # pylint: disable-next=import-outside-toplevel
+                from .rooms import RoomDemand
+
+                circuit.room_demand = RoomDemand(rooms, self._room_aggregation)
+            for room in rooms:
+                room_sensors.setdefault(room.entity_id, []).append(circuit)
+        self._room_circuits = room_sensors
+        for entity_id, circuits in room_sensors.items():
+            room_temp = self._parse_temperature(self.hass.states.get(entity_id))
+            for circuit in circuits:
+                circuit.room_demand.update(entity_id, room_temp)
+
+        self._input_unsubs.append(
+            async_track_state_change_event(
+                self.hass, [self.outdoor_sensor], self._async_outdoor_changed
+            )
+        )
+        if room_sensors:
+            self._input_unsubs.append(
+                async_track_state_change_event(
+                    self.hass, list(room_sensors), self._async_room_changed
+                )
+            )
+
+        if self.weather_entity:
+            # Weather entities update their state when a new forecast is in
+            self._input_unsubs.append(
+                async_track_state_change_event(
+                    self.hass, [self.weather_entity], self._async_weather_changed
+                )
+            )
+            self._async_update_forecast_hour()
+            self._forecast_debouncer.async_schedule_call()
+
+    @callback
+    def _async_untrack_inputs(self) -> None:
+        """Unsubscribe from the input sensors."""
+        while self._input_unsubs:
+            self._input_unsubs.pop()()
+        if self._forecast_timer is not None:
+            self._forecast_timer()
+            self._forecast_timer = None
+        self._forecast_debouncer.async_cancel()
+
+    @property
+    def forecast_outdoor_temp(self) -> float | None:
+        """Return the forecast temperature the setpoint is taken from."""
+        if self.forecast_hour is None:
+            return None
+        return self.forecast.temperatures.get(self.forecast_hour)
+
+    @callback
+    def predicted_flow_temperature(self, circuit: HeatingCurveCircuit) -> float | None:
+        """Return a circuit's flow temperature for the forecast hour ahead.
+
+        None without a weather entity or forecast for that hour.
+        """
+        if self.forecast_hour is None:
+            return None
+        room_temp = None
+        if circuit.state.calculation_mode == MODE_WITH_ROOM_TEMP:
+            room_temp = circuit.room_temp
+        return self.forecast.flow_at(circuit, room_temp, self.forecast_hour)
+
+    @callback
+    def _async_weather_changed(self, event: Event) -> None:
+        """Fetch the forecast again when the weather entity updated."""
+        self._forecast_debouncer.async_schedule_call()
+
+    async def _async_fetch_forecast(self) -> None:
+        """Fetch the hourly forecast and update the schedule."""
+        if (weather_entity := self.weather_entity) is None:
+            return
+        try:
+            response = await self.hass.services.async_call(
+                "weather",
+                "get_forecasts",
+                {"entity_id": weather_entity, "type": "hourly"},
+                blocking=True,
+                return_response=True,
+            )
+        except HomeAssistantError as err:
+            # E.g. the weather integration is not loaded yet, its first
+            # state change triggers another fetch
+            _LOGGER.debug("No forecast from %s: %s", weather_entity, err)
+            return
+        if weather_entity != self.weather_entity:
+            # Reconfigured while fetching
+            return
+
+        now = dt_util.utcnow().timestamp()
+        horizon = now + FORECAST_HORIZON * HOUR
+        points = []
+        for item in response.get(weather_entity, {}).get("forecast", []):
+            try:
+                timestamp = dt_util.parse_datetime(str(item["datetime"])).timestamp()
+                temperature = float(item["temperature"])
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+            if now - HOUR <= timestamp <= horizon:
+                points.append((timestamp, temperature))
+        changed = self.forecast.update_forecast(points)
+        self._async_update_forecast_hour(changed)
+
+    @callback
+    def _async_update_forecast_hour(self, changed: Container[float] = ()) -> None:
+        """Select the forecast hour one lead time ahead, time the next one.
+
+        Only one timer is scheduled, for the moment the hour ahead changes.
+        """
+        if self._forecast_timer is not None:
+            self._forecast_timer()
+            self._forecast_timer = None
+
+        ahead = dt_util.utcnow().timestamp() + self.forecast_lead_time
+        hour = self.forecast.hour_at(ahead)
+        if hour != self.forecast_hour or hour in changed:
+            self.forecast_hour = hour
+            self.async_request_refresh()
+
+        self._forecast_timer = async_track_point_in_utc_time(
+            self.hass,
+            self._async_forecast_hour_reached,
+            dt_util.utc_from_timestamp(
+                ahead - ahead % HOUR + HOUR - self.forecast_lead_time
+            ),
+        )
+
+    @callback
+    def _async_forecast_hour_reached(self, now: Any) -> None:
+        """Move to the next forecast hour and refresh the forecast."""
+        self._forecast_timer = None
+        self._async_update_forecast_hour()
+        self._forecast_debouncer.async_schedule_call()
+
+    @callback
+    def _async_update_setback(self) -> None:
+        """Apply the offset of the active setback slot, time the next one.
+
+        Only one timer is scheduled, for the start of the next slot that
+        changes the offset.
+        """
+        if self._setback_timer is not None:
+            self._setback_timer()
+            self._setback_timer = None
+
+        offset = 0.0
+        self.setback_next_change = None
+        if (schedule := self.setback_schedule) is not None:
+            now = dt_util.now()
+            # Local wall clock time, so slots keep their time across DST
+            week_start = dt_util.start_of_local_day(now) - timedelta(
+                days=now.weekday()
+            )
+            offset, next_start = schedule.lookup((now - week_start).total_seconds())
+            self.setback_next_change = week_start + timedelta(seconds=next_start)
+            self._setback_timer = async_track_point_in_time(
+                self.hass, self._async_setback_slot_reached, self.setback_next_change
+            )
+
+        for circuit in self.circuits.values():
+            if circuit.set_setback(self.setback_parameter, offset):
+                self._dirty.add(circuit.circuit_id)
+        if self._dirty:
+            self._async_schedule_refresh()
+
+    @callback
+    def _async_setback_slot_reached(self, now: Any) -> None:
+        """Switch to the next setback slot."""
+        self._setback_timer = None
+        self._async_update_setback()
+
+    @callback
+    def history_entities(self) -> list[str]:
+        """Return the inputs and flow sensors the history cache holds."""
+        entity_ids = {self.outdoor_sensor}
+        registry = er.async_get(self.hass)
+        for circuit in self.circuits.values():
+            entity_ids.update(room.entity_id for room in circuit.room_configs())
+            if flow_sensor := registry.async_get_entity_id(
+                "sensor",
+                DOMAIN,
+                circuit.unique_id(self.entry.entry_id, "flow_temperature"),
+            ):
+                entity_ids.add(flow_sensor)
+        return sorted(entity_ids)
+
+    @callback
+    def _async_history_interval(self, now: datetime) -> None:
+        """Start the periodic sync of the history cache."""
+        if self.history_cache is not None and not self._history_lock.locked():
+            self.hass.async_create_background_task(
+                self.async_sync_history(), "heating_curve history cache sync"
+            )
+
+    async def async_sync_history(self) -> bool:
+        """Append the newly recorded states to the history cache.
+
+        Returns True if the cache is enabled and up to date.
+        """
+        async with self._history_lock:
+            return await self._async_sync_history()
+
+    async def _async_sync_history(self) -> bool:
+        """Sync the history cache, the lock must be held."""
+        if (cache := self.history_cache) is None:
+            return False
+        # pylint: disable-next=import-outside-toplevel
+        from .services import async_get_recorder_db_path
+
+        try:
+            db_path = async_get_recorder_db_path(self.hass)
+        except HomeAssistantError as err:
+            _LOGGER.debug("History cache of %s not synced: %s", self.entry.title, err)
+            return False
+        entity_ids = self.history_entities()
+        try:
+            appended = await self.hass.async_add_executor_job(
+                cache.sync, db_path, entity_ids, time.time()
+            )
+        except (OSError, sqlite3.Error) as err:
+            _LOGGER.warning(
+                "Syncing the history cache of %s failed: %s", self.entry.title, err
+            )
+            return False
+        self.history_rows = {
+            entity_id: cache.rows(entity_id) for entity_id in entity_ids
+        }
+        self.history_synced_at = dt_util.utcnow()
+        _LOGGER.debug(
+            "Synced the history cache of %s, new samples: %s",
+            self.entry.title,
+            appended,
+        )
+        return True
+
+    async def _async_remove_history_cache(self) -> None:
+        """Delete the files of the disabled history cache."""
+        # pylint: disable-next=import-outside-toplevel
+        from .cache import remove_history_cache
+
+        async with self._history_lock:
+            if self.history_cache is None:
+                await self.hass.async_add_executor_job(
+                    remove_history_cache,
+                    history_cache_path(self.hass, self.entry.entry_id),
+                )
+
+    @asynccontextmanager
+    async def async_history_source(
+        self, db_path: str, entity_ids: Iterable[str | None], start_ts: float
+    ) -> AsyncIterator[str]:
+        """Yield the path analytics read the history of entities from.
+
+        That is the synced history cache if it holds all entities from
+        start_ts on, otherwise the recorder database. Syncs wait until the
+        caller is done reading, so they cannot compact the files meanwhile.
+        """
+        cache = self.history_cache
+        if (
+            cache is None
+            or start_ts < time.time() - cache.retention
+            or not {entity_id for entity_id in entity_ids if entity_id}.issubset(
+                self.history_entities()
+            )
+        ):
+            yield db_path
+            return
+        async with self._history_lock:
+            synced = await self._async_sync_history()
+            yield cache.path if synced else db_path
+
+    @callback
+    def async_add_listener(
+        self, circuit_id: str, update_callback: Callable[[], bool]
+    ) -> CALLBACK_TYPE:
+        """Register the recompute callback of a circuit's sensor.
+
+        The callback returns True if it wrote a new state.
+        """
+        self._listeners[circuit_id] = update_callback
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the recompute callback."""
+            if self._listeners.get(circuit_id) is update_callback:
+                del self._listeners[circuit_id]
+            self._dirty.discard(circuit_id)
+
+        return remove_listener
+
+    @callback
+    def async_request_refresh(self, circuit_id: str | None = None) -> None:
+        """Schedule a recompute of one circuit, or of all if None."""
+        if circuit_id is None:
+            self._dirty.update(self.circuits)
+        else:
+            self._dirty.add(circuit_id)
+        self._async_schedule_refresh()
+
+    @callback
+    def _async_schedule_refresh(self) -> None:
+        """Schedule the debounced recompute of the dirty circuits."""
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+        if self._refresh_handle is None and not self._stopped:
+            self._refresh_handle = self.hass.loop.call_later(
+                self._update_debounce, self._async_refresh
+            )
+
+    @callback
+    def _async_cancel_refresh(self) -> None:
+        """Cancel a scheduled recompute, the dirty circuits stay marked."""
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+    @callback
+    def _async_outdoor_changed(self, event: Event) -> None:
+        """Parse the outdoor temperature once and fan out to all circuits."""
+        self.stats.outdoor_events += 1
+        outdoor_temp = self._filtered_outdoor_temp(event.data.get("new_state"))
+        if outdoor_temp == self.outdoor_temp:
+            # Same value, e.g. an attribute-only update
+            return
+        self.outdoor_temp = outdoor_temp
+        self.async_request_refresh()
+
+    def _filtered_outdoor_temp(self, state: State | None) -> float | None:
+        """Return the outdoor temperature after the input filter."""
+        outdoor_temp = self._parse_temperature(state)
+        if self._filter is None or outdoor_temp is None:
+            return outdoor_temp
+
+        timestamp = state.last_updated.timestamp()
+        if self._filter.last_ts is not None and timestamp <= self._filter.last_ts:
+            # Reading already fed before a restart
+            return round(self._filter.value, 1)
+
+        filtered = self._filter.update(outdoor_temp, timestamp)
+        if self._filter_store is not None:
+            # None only while the previous filter's state is being removed
+            self._filter_store.async_delay_save(
+                self._filter.as_dict, FILTER_SAVE_DELAY
+            )
+        # The sensor resolution, smaller steps would only cause state writes
+        return round(filtered, 1)
+
+    def _parse_temperature(self, state: State | None) -> float | None:
+        """Parse a sensor state, counting values that are not numbers."""
+        value = parse_temperature(state)
+        if value is None and state is not None and state.state not in (
+            "unknown",
+            "unavailable",
+        ):
+            self.stats.parse_failures += 1
+        return value
+
+    @callback
+    def _async_room_changed(self, event: Event) -> None:
+        """Update the circuits that use the changed room sensor."""
+        self.stats.room_events += 1
+        entity_id = event.data["entity_id"]
+        room_temp = self._parse_temperature(event.data.get("new_state"))
+        for circuit in self._room_circuits.get(entity_id, ()):
+            # Only the aggregate matters, a room that is not the worst one
+            # or barely moves the blend may leave it unchanged
+            previous = circuit.room_temp
+            circuit.room_demand.update(entity_id, room_temp)
+            if circuit.room_temp != previous:
+                self._dirty.add(circuit.circuit_id)
+        if self._dirty:
+            self._async_schedule_refresh()
+
+    @callback
+    def _async_parameter_changed(self, circuit_id: str, parameter: str) -> None:
+        """Handle a parameter change of one circuit."""
+        self.stats.parameter_events += 1
+        self.async_request_refresh(circuit_id)
+
+    @callback
+    def _async_refresh(self) -> None:
+        """Recompute all dirty circuits in one pass."""
+        self._refresh_handle = None
+        dirty = self._dirty
+        self._dirty = set()
+        since = self._pending_since or time.perf_counter()
+        self._pending_since = None
+        stats = self.stats
+        for circuit_id in dirty:
+            if (update_callback := self._listeners.get(circuit_id)) is None:
+                continue
+            stats.recomputes += 1
+            if update_callback():
+                stats.record_write(time.perf_counter() - since)
+            else:
+                stats.unchanged_skips += 1
+            self._async_push_output(self.circuits[circuit_id])
+        self._async_schedule_output()
+
+    @callback
+    def async_push_outputs(self) -> None:
+        """Write the current flow temperatures to all output entities."""
+        for circuit in self.circuits.values():
+            self._async_push_output(circuit)
+
+    @callback
+    def _async_push_output(self, circuit: HeatingCurveCircuit) -> None:
+        """Hand a circuit's flow temperature to the writer.
+
+        The writer skips values the output entity already holds and
+        writes all circuits requested in one pass together.
+        """
+        if not circuit.output_entity:
+            return
+        if self.writer is None:
+            # pylint: disable-next=import-outside-toplevel
+            from .writer import SetpointWriter
+
+            self.writer = SetpointWriter(self.hass, self.stats)
+        self.writer.async_set(circuit.output_entity, circuit.output.value)
+
+    @callback
+    def _async_schedule_output(self) -> None:
+        """Time the earliest pending output step of all circuits.
+
+        A single timer for the entry, moved only when the earliest step
+        changed.
+        """
+        due = min(
+            (
+                circuit.output.due
+                for circuit in self.circuits.values()
+                if circuit.output.due is not None
+            ),
+            default=None,
+        )
+        if self._output_timer is not None:
+            if self._output_timer.when() == due:
+                return
+            self._output_timer.cancel()
+            self._output_timer = None
+        if due is not None and not self._stopped:
+            self._output_timer = self.hass.loop.call_at(due, self._async_output_due)
+
+    @callback
+    def _async_output_due(self) -> None:
+        """Let the circuits whose output step is due take it."""
+        self._output_timer = None
+        now = self.hass.loop.time()
+        for circuit in self.circuits.values():
+            if circuit.output.due is not None and circuit.output.due <= now:
+                self._dirty.add(circuit.circuit_id)
+        self._async_refresh()
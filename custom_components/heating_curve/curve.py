@@ -0,0 +1,404 @@
+"""Heating curve math for Heating Curve Calculator.
+
+This module has no Home Assistant dependencies, so the same formula that
+drives the sensor can be used for backtests and what-if sweeps.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+import math
+
+from .const import (
+    MODE_WITH_ROOM_TEMP,
+    CURVE_TYPE_EXPONENT,
+    CURVE_TYPE_POINTS,
+    DESIGN_TEMP_DIFFERENCE,
+    DEFAULT_CURVE_SLOPE,
+    DEFAULT_CURVE_LEVEL,
+    DEFAULT_ROOM_TEMP_TARGET,
+    DEFAULT_MIN_FLOW_TEMP,
+    DEFAULT_MAX_FLOW_TEMP,
+    DEFAULT_CALCULATION_MODE,
+    DEFAULT_HYSTERESIS,
+    DEFAULT_CURVE_TYPE,
+    DEFAULT_RADIATOR_EXPONENT,
+)
+
+
+@cache
+def load_numpy():
+    """Import NumPy on first use, None if it is not installed.
+
+    NumPy takes longer to import than the rest of the integration and is
+    only needed by the batch calculations, not by the sensor.
+    """
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover - numpy ships with Home Assistant
+        return None
+    return numpy
+
+
+# Range and resolution of the temperature difference (reference room
+# temperature minus outdoor temperature) covered by exponent curve tables
+TABLE_MIN_DIFFERENCE = -40.0
+TABLE_MAX_DIFFERENCE = 80.0
+TABLE_STEP = 0.1
+
+
+@dataclass(frozen=True, slots=True)
+class CurveParameters:
+    """One set of heating curve parameters."""
+
+    curve_slope: float = DEFAULT_CURVE_SLOPE
+    curve_level: float = DEFAULT_CURVE_LEVEL
+    room_temp_target: float = DEFAULT_ROOM_TEMP_TARGET
+    min_flow_temp: float = DEFAULT_MIN_FLOW_TEMP
+    max_flow_temp: float = DEFAULT_MAX_FLOW_TEMP
+    calculation_mode: str = DEFAULT_CALCULATION_MODE
+    curve_type: str = DEFAULT_CURVE_TYPE
+    radiator_exponent: float = DEFAULT_RADIATOR_EXPONENT
+    curve_points: tuple[tuple[float, float], ...] = ()
+    hysteresis: float = DEFAULT_HYSTERESIS
+
+    def build_table(self) -> CurveTable | None:
+        """Return the lookup table for this parameter set (None if linear)."""
+        return build_curve_table(
+            self.curve_type,
+            self.curve_slope,
+            self.radiator_exponent,
+            self.curve_points,
+        )
+
+
+class CurveTable:
+    """Piecewise linear lookup table for non-linear heating curves.
+
+    Maps the temperature difference (reference room temperature minus
+    outdoor temperature) to the flow temperature offset above the target
+    room temperature. Values outside the table are clamped to its ends.
+    """
+
+    __slots__ = ("xs", "ys")
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float]) -> None:
+        """Initialize the table from ascending x values."""
+        if len(xs) < 2 or len(xs) != len(ys):
+            raise ValueError("A curve table needs at least two points")
+        self.xs = list(xs)
+        self.ys = list(ys)
+
+    def __call__(self, x: float) -> float:
+        """Interpolate the table at x in O(log n)."""
+        xs = self.xs
+        i = bisect_right(xs, x)
+        if i == 0:
+            return self.ys[0]
+        if i == len(xs):
+            return self.ys[-1]
+        x0 = xs[i - 1]
+        y0 = self.ys[i - 1]
+        return y0 + (self.ys[i] - y0) * (x - x0) / (xs[i] - x0)
+
+
+def parse_curve_points(text: str) -> tuple[tuple[float, float], ...]:
+    """Parse support points like "-15:60, 0:45, 15:30".
+
+    Each point is "outdoor temperature:flow temperature". Raises ValueError
+    if the text is malformed, has fewer than two points or repeats an
+    outdoor temperature.
+    """
+    points = []
+    for item in text.replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        outdoor, _, flow = item.partition(":")
+        points.append((float(outdoor), float(flow)))
+
+    points.sort()
+    if len(points) < 2:
+        raise ValueError("At least two support points are required")
+    for (a, _), (b, _) in zip(points, points[1:]):
+        if a == b:
+            raise ValueError(f"Duplicate support point for {a} °C")
+
+    return tuple(points)
+
+
+def build_curve_table(
+    curve_type: str,
+    curve_slope: float,
+    radiator_exponent: float,
+    curve_points: Sequence[tuple[float, float]] = (),
+) -> CurveTable | None:
+    """Compile a non-linear curve into a lookup table.
+
+    Exponent curves follow the radiator characteristic of DIN EN 442: the
+    heat output scales with (excess temperature)^n, while the heat demand
+    of the building scales linearly with the temperature difference, so
+    the required excess temperature grows with difference^(1/n). The curve
+    matches the linear curve of the same slope at DESIGN_TEMP_DIFFERENCE.
+
+    Point curves interpolate the user supplied (outdoor, flow) pairs, which
+    are taken as defined for DEFAULT_ROOM_TEMP_TARGET. Like the other curve
+    types, a different target shifts the curve by target minus reference.
+
+    Returns None for linear curves (and point curves without points), which
+    are evaluated directly. Raises ValueError if the radiator exponent of
+    an exponent curve is not positive.
+    """
+    if curve_type == CURVE_TYPE_EXPONENT:
+        if radiator_exponent <= 0:
+            raise ValueError(
+                f"Radiator exponent must be positive: {radiator_exponent}"
+            )
+        steps = round((TABLE_MAX_DIFFERENCE - TABLE_MIN_DIFFERENCE) / TABLE_STEP)
+        xs = [TABLE_MIN_DIFFERENCE + i * TABLE_STEP for i in range(steps + 1)]
+        inverse_exponent = 1.0 / radiator_exponent
+        design_offset = curve_slope * DESIGN_TEMP_DIFFERENCE
+        ys = [
+            design_offset * (x / DESIGN_TEMP_DIFFERENCE) ** inverse_exponent
+            if x > 0
+            else curve_slope * x
+            for x in xs
+        ]
+        return CurveTable(xs, ys)
+
+    if curve_type == CURVE_TYPE_POINTS and len(curve_points) >= 2:
+        # Outdoor temperature t corresponds to difference reference - t.
+        # A fixed reference, the points would otherwise cancel the target
+        pairs = sorted(
+            (DEFAULT_ROOM_TEMP_TARGET - outdoor, flow - DEFAULT_ROOM_TEMP_TARGET)
+            for outdoor, flow in curve_points
+        )
+        return CurveTable([x for x, _ in pairs], [y for _, y in pairs])
+
+    return None
+
+
+def round_flow(value: float) -> float:
+    """Round a flow temperature to 0.1 °C.
+
+    Rounds value * 10 half to even, which is what NumPy's round does, so
+    the scalar and the batch calculation agree at rounding boundaries.
+    """
+    return round(value * 10) / 10
+
+
+def calculate_flow_temperature(
+    outdoor_temp: float,
+    room_temp: float | None,
+    curve_slope: float,
+    curve_level: float,
+    room_temp_target: float,
+    min_flow: float,
+    max_flow: float,
+    calculation_mode: str,
+    curve_table: CurveTable | None = None,
+) -> float:
+    """Calculate flow temperature based on heating curve.
+
+    Two modes:
+    1. Classic (without room temperature feedback):
+       T_flow = T_room_target + slope * (T_room_target - T_outdoor) + level
+
+    2. With room temperature feedback:
+       T_flow = T_room_target + slope * (T_room_actual - T_outdoor) + level
+
+    For non-linear curves the slope term is replaced by a lookup in the
+    precompiled curve table.
+
+    Args:
+        outdoor_temp: Current outdoor temperature in °C
+        room_temp: Current room temperature in °C (optional)
+        curve_slope: Heating curve slope
+        curve_level: Heating curve level (parallel shift)
+        room_temp_target: Target room temperature in °C
+        min_flow: Minimum flow temperature in °C
+        max_flow: Maximum flow temperature in °C
+        calculation_mode: "classic" or "with_room_temp"
+        curve_table: Table from build_curve_table() for non-linear curves
+
+    Returns:
+        Calculated flow temperature in °C (clamped to min/max)
+    """
+    # Determine which room temperature to use
+    if calculation_mode == MODE_WITH_ROOM_TEMP and room_temp is not None:
+        # Use actual room temperature
+        reference_temp = room_temp
+    else:
+        # Use target room temperature (classic mode)
+        reference_temp = room_temp_target
+
+    # Calculate base flow temperature using heating curve
+    temp_difference = reference_temp - outdoor_temp
+    if curve_table is None:
+        offset = curve_slope * temp_difference
+    else:
+        offset = curve_table(temp_difference)
+    flow_temp = room_temp_target + offset + curve_level
+
+    # Clamp to min/max limits
+    flow_temp = max(min_flow, min(max_flow, flow_temp))
+
+    return round_flow(flow_temp)
+
+
+def apply_hysteresis(
+    new_value: float, last_output: float | None, hysteresis: float
+) -> float:
+    """Return the output after applying the hysteresis band.
+
+    The output follows new_value only if it differs from the last output by
+    at least the hysteresis, otherwise the last output is kept.
+    """
+    if last_output is None:
+        # First run, set directly
+        return new_value
+    # Check if change is larger than hysteresis
+    if abs(new_value - last_output) >= hysteresis:
+        return new_value
+    # Keep old value (within hysteresis band)
+    return last_output
+
+
+def calculate_flow_temperatures(
+    outdoor_temps: Sequence[float],
+    room_temps: Sequence[float | None] | float | None = None,
+    parameters: CurveParameters | Sequence[CurveParameters] = CurveParameters(),
+    use_numpy: bool | None = None,
+):
+    """Calculate flow temperatures for many points in one call.
+
+    Args:
+        outdoor_temps: Outdoor temperatures in °C
+        room_temps: Room temperatures in °C, either one value for all points
+            or one per outdoor temperature. None/NaN entries fall back to the
+            target room temperature like the scalar calculation does.
+        parameters: A single parameter set, or a sequence of parameter sets
+            that are all evaluated against the same points
+        use_numpy: Force (True) or disable (False) the NumPy path. By default
+            NumPy is used when it is installed.
+
+    Returns:
+        For a single parameter set a 1-D result with one flow temperature per
+        point, for a sequence of parameter sets a 2-D result of shape
+        (len(parameters), len(outdoor_temps)). The NumPy path returns
+        ndarrays, the pure-Python path nested lists with results identical to
+        calculate_flow_temperature().
+    """
+    single = isinstance(parameters, CurveParameters)
+    param_sets = (parameters,) if single else tuple(parameters)
+    if not param_sets:
+        return []
+
+    np = load_numpy() if use_numpy is not False else None
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise RuntimeError("numpy is not installed")
+
+    if use_numpy:
+        result = _calculate_numpy(np, outdoor_temps, room_temps, param_sets)
+    else:
+        result = _calculate_python(outdoor_temps, room_temps, param_sets)
+
+    return result[0] if single else result
+
+
+def _calculate_python(
+    outdoor_temps: Sequence[float],
+    room_temps: Sequence[float | None] | float | None,
+    param_sets: tuple[CurveParameters, ...],
+) -> list[list[float]]:
+    """Evaluate the curve point by point with the scalar formula."""
+    outdoor = list(outdoor_temps)
+    if room_temps is None or isinstance(room_temps, (int, float)):
+        rooms = [room_temps] * len(outdoor)
+    else:
+        rooms = list(room_temps)
+        if len(rooms) != len(outdoor):
+            raise ValueError("room_temps must match outdoor_temps in length")
+    rooms = [None if r is None or math.isnan(r) else r for r in rooms]
+
+    results = []
+    for params in param_sets:
+        table = params.build_table()
+        results.append(
+            [
+                calculate_flow_temperature(
+                    outdoor_temp,
+                    room_temp,
+                    params.curve_slope,
+                    params.curve_level,
+                    params.room_temp_target,
+                    params.min_flow_temp,
+                    params.max_flow_temp,
+                    params.calculation_mode,
+                    table,
+                )
+                for outdoor_temp, room_temp in zip(outdoor, rooms)
+            ]
+        )
+    return results
+
+
+def _calculate_numpy(
+    np,
+    outdoor_temps: Sequence[float],
+    room_temps: Sequence[float | None] | float | None,
+    param_sets: tuple[CurveParameters, ...],
+):
+    """Evaluate the curve for all points and parameter sets at once."""
+    outdoor = np.asarray(outdoor_temps, dtype=float)
+    if room_temps is None:
+        rooms = np.full(outdoor.shape, np.nan)
+    else:
+        rooms = np.broadcast_to(
+            np.asarray(room_temps, dtype=float), outdoor.shape
+        )
+
+    # Parameter columns, shape (n_params, 1) so they broadcast over points
+    slope = np.array([p.curve_slope for p in param_sets], dtype=float)[:, None]
+    level = np.array([p.curve_level for p in param_sets], dtype=float)[:, None]
+    target = np.array(
+        [p.room_temp_target for p in param_sets], dtype=float
+    )[:, None]
+    min_flow = np.array([p.min_flow_temp for p in param_sets], dtype=float)[:, None]
+    max_flow = np.array([p.max_flow_temp for p in param_sets], dtype=float)[:, None]
+    use_room = np.array(
+        [p.calculation_mode == MODE_WITH_ROOM_TEMP for p in param_sets]
+    )[:, None]
+
+    reference = np.where(use_room & ~np.isnan(rooms), rooms, target)
+    difference = reference - outdoor
+    offset = slope * difference
+    for row, params in enumerate(param_sets):
+        table = params.build_table()
+        if table is not None:
+            offset[row] = _interpolate_numpy(np, table, difference[row])
+    flow = target + offset + level
+    # max(min, min(max, x)) like the scalar path, also for min > max
+    flow = np.maximum(min_flow, np.minimum(max_flow, flow))
+
+    # Same as round_flow()
+    return np.round(flow, 1)
+
+
+def _interpolate_numpy(np, table: CurveTable, x):
+    """Interpolate a curve table like CurveTable.__call__, vectorized.
+
+    Uses the same formula as the scalar lookup instead of np.interp, so
+    both paths produce bit-identical offsets.
+    """
+    xs = np.asarray(table.xs, dtype=float)
+    ys = np.asarray(table.ys, dtype=float)
+    i = np.clip(np.searchsorted(xs, x, side="right"), 1, len(xs) - 1)
+    x0 = xs[i - 1]
+    y0 = ys[i - 1]
+    inner = y0 + (ys[i] - y0) * (x - x0) / (xs[i] - x0)
+    return np.where(x < xs[0], ys[0], np.where(x >= xs[-1], ys[-1], inner))
@@ -0,0 +1,72 @@
+"""Diagnostics support for Heating Curve Calculator."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the configuration, runtime state and counters of an entry."""
+    data = entry.runtime_data
+    coordinator = data.coordinator
+    # Only created for a weather entity and for the first output write
+    forecast = coordinator.forecast
+    writer = coordinator.writer
+    return {
+        "config": dict(entry.data),
+        "outdoor_sensor": coordinator.outdoor_sensor,
+        "outdoor_temperature": coordinator.outdoor_temp,
+        "circuits": {
+            circuit_id: {
+                "name": circuit.name,
+                "room_sensor": circuit.room_sensor,
+                "rooms": [asdict(room) for room in circuit.room_configs()],
+                "room_temperature": circuit.room_temp,
+                "curve_points": [list(point) for point in circuit.curve_points],
+                "parameters": asdict(circuit.state),
+                "setback_offset": circuit.target_offset or circuit.level_offset,
+                "output_entity": circuit.output_entity,
+                "output": {
+                    "value": circuit.output.value,
+                    "dwell_time": circuit.output.dwell_time,
+                    "slew_rate": circuit.output.slew_rate,
+                    "next_step_in": (
+                        None
+                        if circuit.output.due is None
+                        else round(circuit.output.due - hass.loop.time(), 1)
+                    ),
+                },
+            }
+            for circuit_id, circuit in data.circuits.items()
+        },
+        "forecast": {
+            "weather_entity": coordinator.weather_entity,
+            "lead_time_hours": coordinator.forecast_lead_time / 3600,
+            "hours": len(forecast.hours) if forecast is not None else 0,
+            "active_hour": coordinator.forecast_hour,
+            "outdoor_temperature": coordinator.forecast_outdoor_temp,
+            "computed_points": forecast.computed_points if forecast is not None else 0,
+        },
+        "setback": {
+            "parameter": coordinator.setback_parameter,
+            "slots": len(coordinator.setback_schedule or ()),
+            "next_change": coordinator.setback_next_change,
+        },
+        "history_cache": (
+            None
+            if (cache := coordinator.history_cache) is None
+            else {
+                "retention_days": cache.retention / 86400,
+                "compaction": cache.compaction,
+                "synced_at": coordinator.history_synced_at,
+                "rows": coordinator.history_rows,
+            }
+        ),
+        "pending_output_writes": writer.pending if writer is not None else {},
+        "stats": coordinator.stats.as_dict(),
+    }
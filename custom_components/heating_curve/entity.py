@@ -0,0 +1,80 @@
+"""Base entity for Heating Curve Calculator."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity import Entity
+
+from .const import (
+    DOMAIN,
+    CONF_FIRE_EVENTS,
+    EVENT_PARAMETER_CHANGED,
+    PRIMARY_CIRCUIT,
+    SIGNAL_PARAMETER_CHANGED,
+)
+from .models import HeatingCurveCircuit
+
+
+class HeatingCurveEntity(Entity):
+    """An entity belonging to one heating circuit of a config entry."""
+
+    _attr_has_entity_name = True
+    # All state lives in the circuit and is pushed on change
+    _attr_should_poll = False
+
+    def __init__(
+        self, config_entry: ConfigEntry, circuit: HeatingCurveCircuit, key: str
+    ) -> None:
+        """Initialize the entity."""
+        self._config_entry = config_entry
+        self._circuit = circuit
+        self._key = key
+
+        # Generate unique_id
+        self._attr_unique_id = circuit.unique_id(config_entry.entry_id, key)
+
+        # Device info, one device per circuit
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, circuit.device_identifier(config_entry.entry_id))},
+            name=circuit.name,
+            manufacturer="Custom",
+            model="Heating Curve Calculator",
+            sw_version="2.1.0",
+        )
+        if circuit.circuit_id != PRIMARY_CIRCUIT:
+            self._attr_device_info["via_device"] = (DOMAIN, config_entry.entry_id)
+
+    @callback
+    def _async_parameter_updated(self, value: Any, fire_event: bool) -> bool:
+        """Store a parameter value and notify the circuit's sensor.
+
+        Returns False if the value did not change.
+        """
+        if not self._circuit.state.set_parameter(self._key, value):
+            return False
+
+        # Signal this circuit's sensor to update
+        async_dispatcher_send(
+            self.hass,
+            SIGNAL_PARAMETER_CHANGED.format(self._config_entry.entry_id),
+            self._circuit.circuit_id,
+            self._key,
+        )
+
+        # Public event for automations, only if enabled in the options
+        if fire_event and self._config_entry.data.get(CONF_FIRE_EVENTS):
+            self.hass.bus.async_fire(
+                EVENT_PARAMETER_CHANGED,
+                {
+                    "entry_id": self._config_entry.entry_id,
+                    "circuit_id": self._circuit.circuit_id,
+                    "parameter": self._key,
+                    "value": value,
+                },
+            )
+        return True
+
@@ -0,0 +1,197 @@
+"""Input filters for the outdoor temperature of Heating Curve Calculator.
+
+Filters smooth the raw outdoor readings before they reach the curve, so
+gusts or sun on the sensor do not make the flow temperature jitter. All
+updates are O(1). Filter state can be exported and restored, so it
+survives restarts. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+from array import array
+import math
+from typing import Any
+
+from .const import (
+    FILTER_NONE,
+    FILTER_MOVING_AVERAGE,
+    FILTER_EMA,
+    FILTER_TIME_CONSTANT,
+)
+
+
+class RingBuffer:
+    """Fixed size ring buffer of floats with a running sum."""
+
+    __slots__ = ("_values", "_index", "_count", "_sum", "_pushes")
+
+    def __init__(self, size: int) -> None:
+        """Initialize an empty buffer."""
+        self._values = array("d", bytes(8 * size))
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._pushes = 0
+
+    @property
+    def size(self) -> int:
+        """Return the capacity of the buffer."""
+        return len(self._values)
+
+    def __len__(self) -> int:
+        """Return the number of stored values."""
+        return self._count
+
+    def push(self, value: float) -> None:
+        """Add a value, replacing the oldest one if the buffer is full."""
+        values = self._values
+        index = self._index
+        if self._count == len(values):
+            self._sum -= values[index]
+        else:
+            self._count += 1
+        values[index] = value
+        self._sum += value
+        self._index = (index + 1) % len(values)
+
+        # Re-sum once per buffer length against floating point drift,
+        # which keeps push amortized O(1)
+        self._pushes += 1
+        if self._pushes >= len(values):
+            self._pushes = 0
+            self._sum = math.fsum(self.as_list())
+
+    def mean(self) -> float | None:
+        """Return the mean of the stored values."""
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def as_list(self) -> list[float]:
+        """Return the stored values from oldest to newest."""
+        if self._count < len(self._values):
+            return self._values[: self._count].tolist()
+        return (self._values[self._index :] + self._values[: self._index]).tolist()
+
+    def extend(self, values: list[float]) -> None:
+        """Push several values, oldest first."""
+        for value in values[-len(self._values) :]:
+            self.push(value)
+
+
+class OutdoorFilter:
+    """Base class of the outdoor temperature filters."""
+
+    kind = FILTER_NONE
+
+    def __init__(self) -> None:
+        """Initialize the filter."""
+        self.last_ts: float | None = None
+        self.value: float | None = None
+
+    def update(self, value: float, timestamp: float) -> float:
+        """Add a raw reading and return the filtered value."""
+        self.value = value
+        self.last_ts = timestamp
+        return value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the filter state for storage."""
+        return {"kind": self.kind, "last_ts": self.last_ts, "value": self.value}
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore the filter state exported by as_dict()."""
+        if data.get("kind") != self.kind:
+            return
+        self.last_ts = data.get("last_ts")
+        self.value = data.get("value")
+
+
+class MovingAverageFilter(OutdoorFilter):
+    """Mean of the last readings."""
+
+    kind = FILTER_MOVING_AVERAGE
+
+    def __init__(self, window: int) -> None:
+        """Initialize the filter."""
+        super().__init__()
+        self._buffer = RingBuffer(window)
+
+    def update(self, value: float, timestamp: float) -> float:
+        """Add a raw reading and return the filtered value."""
+        self._buffer.push(value)
+        self.last_ts = timestamp
+        self.value = self._buffer.mean()
+        return self.value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the filter state for storage."""
+        return {**super().as_dict(), "buffer": self._buffer.as_list()}
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore the filter state exported by as_dict()."""
+        if data.get("kind") != self.kind:
+            return
+        super().restore(data)
+        self._buffer.extend(data.get("buffer", []))
+        self.value = self._buffer.mean()
+
+
+class ExponentialFilter(OutdoorFilter):
+    """Exponential moving average with the smoothing of a window length."""
+
+    kind = FILTER_EMA
+
+    def __init__(self, window: int) -> None:
+        """Initialize the filter."""
+        super().__init__()
+        self._alpha = 2 / (window + 1)
+
+    def update(self, value: float, timestamp: float) -> float:
+        """Add a raw reading and return the filtered value."""
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self._alpha * (value - self.value)
+        self.last_ts = timestamp
+        return self.value
+
+
+class TimeConstantFilter(OutdoorFilter):
+    """First order lag modelling the thermal inertia of the building.
+
+    Unlike the EMA the smoothing depends on the time between readings, so
+    the result does not depend on how often the sensor reports.
+    """
+
+    kind = FILTER_TIME_CONSTANT
+
+    def __init__(self, time_constant: float) -> None:
+        """Initialize the filter with a time constant in seconds."""
+        super().__init__()
+        self._time_constant = time_constant
+
+    def update(self, value: float, timestamp: float) -> float:
+        """Add a raw reading and return the filtered value."""
+        if self.value is None or self.last_ts is None:
+            self.value = value
+        else:
+            elapsed = max(0.0, timestamp - self.last_ts)
+            alpha = 1 - math.exp(-elapsed / self._time_constant)
+            self.value += alpha * (value - self.value)
+        self.last_ts = timestamp
+        return self.value
+
+
+def create_filter(kind: str, window: int, time_constant: float) -> OutdoorFilter:
+    """Create an outdoor filter.
+
+    window is the number of readings for the moving average and EMA,
+    time_constant the building time constant in seconds.
+    """
+    if kind == FILTER_MOVING_AVERAGE:
+        return MovingAverageFilter(window)
+    if kind == FILTER_EMA:
+        return ExponentialFilter(window)
+    if kind == FILTER_TIME_CONSTANT:
+        return TimeConstantFilter(time_constant)
+    return OutdoorFilter()
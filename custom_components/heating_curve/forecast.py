@@ -0,0 +1,107 @@
+"""Forecast based flow temperature schedule of Heating Curve Calculator.
+
+Holds the hourly outdoor temperature forecast of an entry and, per
+circuit, the flow temperature for every forecast hour. A new forecast only
+marks the hours whose temperature changed, which are then computed in one
+batched pass on the next lookup. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from .const import HOUR
+from .curve import calculate_flow_temperatures
+from .models import HeatingCurveCircuit
+
+
+@dataclass(slots=True)
+class _CircuitSchedule:
+    """Flow temperatures of one circuit per forecast hour."""
+
+    # Parameter version and room temperature the flows were computed for
+    key: tuple | None = None
+    flows: dict[float, float] = field(default_factory=dict)
+    pending: set[float] = field(default_factory=set)
+
+
+class ForecastSchedule:
+    """Hourly forecast temperatures and the resulting flow temperatures."""
+
+    def __init__(self) -> None:
+        """Initialize an empty schedule."""
+        self.hours: list[float] = []
+        self.temperatures: dict[float, float] = {}
+        self._circuits: dict[str, _CircuitSchedule] = {}
+        # Number of hours computed, for diagnostics
+        self.computed_points = 0
+
+    def update_forecast(self, points: Iterable[tuple[float, float]]) -> set[float]:
+        """Replace the forecast, return the hours that are new or changed.
+
+        points are (timestamp, temperature) pairs, timestamps are rounded
+        down to the start of their hour.
+        """
+        temperatures = {
+            timestamp - timestamp % HOUR: temperature
+            for timestamp, temperature in points
+        }
+        changed = {
+            hour
+            for hour, temperature in temperatures.items()
+            if self.temperatures.get(hour) != temperature
+        }
+        removed = self.temperatures.keys() - temperatures.keys()
+        self.temperatures = temperatures
+        self.hours = sorted(temperatures)
+
+        for schedule in self._circuits.values():
+            for hour in removed:
+                schedule.flows.pop(hour, None)
+                schedule.pending.discard(hour)
+            schedule.pending |= changed
+        return changed
+
+    def hour_at(self, timestamp: float) -> float | None:
+        """Return the forecast hour containing a timestamp, if covered."""
+        index = bisect_right(self.hours, timestamp) - 1
+        if index < 0 or timestamp >= self.hours[index] + HOUR:
+            return None
+        return self.hours[index]
+
+    def flows(
+        self, circuit: HeatingCurveCircuit, room_temp: float | None
+    ) -> dict[float, float]:
+        """Return the flow temperature of a circuit for every forecast hour.
+
+        Hours changed by the last forecast are computed in one pass. A
+        parameter or room temperature change recomputes all hours.
+        """
+        schedule = self._circuits.get(circuit.circuit_id)
+        if schedule is None:
+            schedule = self._circuits[circuit.circuit_id] = _CircuitSchedule()
+        key = (circuit.state.version, room_temp)
+        if schedule.key != key:
+            schedule.key = key
+            schedule.flows.clear()
+            schedule.pending = set(self.hours)
+
+        if schedule.pending:
+            hours = sorted(schedule.pending)
+            flows = calculate_flow_temperatures(
+                [self.temperatures[hour] for hour in hours],
+                room_temp,
+                circuit.curve_parameters(),
+                use_numpy=False,
+            )
+            schedule.flows.update(zip(hours, flows))
+            schedule.pending.clear()
+            self.computed_points += len(hours)
+        return schedule.flows
+
+    def flow_at(
+        self, circuit: HeatingCurveCircuit, room_temp: float | None, hour: float
+    ) -> float | None:
+        """Return the flow temperature of a circuit for one forecast hour."""
+        return self.flows(circuit, room_temp).get(hour)
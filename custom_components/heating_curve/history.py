@@ -0,0 +1,133 @@
+"""Streaming access to recorder history for Heating Curve Calculator.
+
+Reads the states table of the recorder's SQLite database directly, page by
+page along the (metadata_id, last_updated_ts) index, so analytics can walk
+a whole season of data in constant memory.
+
+The module imports nothing from Home Assistant, so the offline CLI runs it
+without Home Assistant installed. Imported through the integration
+package, as by the backtest workers, it loads Home Assistant with the
+package __init__.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from functools import partial
+import heapq
+import os
+import sqlite3
+
+DEFAULT_CHUNK_SIZE = 5000
+
+_UNAVAILABLE = ("unknown", "unavailable", "")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open the recorder database read-only."""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def parse_state(state: str | None) -> float | None:
+    """Convert a recorded state into a float, None if not numeric."""
+    if state is None or state in _UNAVAILABLE:
+        return None
+    try:
+        return float(state)
+    except ValueError:
+        return None
+
+
+def _metadata_id(conn: sqlite3.Connection, entity_id: str) -> int | None:
+    """Return the states_meta id of an entity."""
+    row = conn.execute(
+        "SELECT metadata_id FROM states_meta WHERE entity_id = ?", (entity_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def iter_entity_history(
+    conn: sqlite3.Connection,
+    entity_id: str,
+    start_ts: float,
+    end_ts: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[tuple[float, float | None]]:
+    """Yield (timestamp, value) for one entity between start and end.
+
+    The first item is the state that was current at start_ts (stamped with
+    start_ts), if there is one. Rows are fetched in pages of chunk_size.
+    """
+    metadata_id = _metadata_id(conn, entity_id)
+    if metadata_id is None:
+        return
+
+    row = conn.execute(
+        "SELECT state FROM states WHERE metadata_id = ? AND last_updated_ts < ?"
+        " ORDER BY last_updated_ts DESC LIMIT 1",
+        (metadata_id, start_ts),
+    ).fetchone()
+    if row is not None:
+        yield start_ts, parse_state(row[0])
+
+    last_ts = start_ts
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            "SELECT last_updated_ts, state_id, state FROM states"
+            " WHERE metadata_id = ? AND (last_updated_ts, state_id) > (?, ?)"
+            " AND last_updated_ts < ?"
+            " ORDER BY last_updated_ts, state_id LIMIT ?",
+            (metadata_id, last_ts, last_id, end_ts, chunk_size),
+        ).fetchall()
+        for ts, _, state in rows:
+            yield ts, parse_state(state)
+        if len(rows) < chunk_size:
+            return
+        last_ts, last_id = rows[-1][0], rows[-1][1]
+
+
+def _tagged(
+    index: int, stream: Iterator[tuple[float, float | None]]
+) -> Iterator[tuple[float, int, float | None]]:
+    """Tag the items of one entity stream with the entity's index."""
+    for ts, value in stream:
+        yield ts, index, value
+
+
+def iter_samples(
+    source: str,
+    entity_ids: Sequence[str | None],
+    start_ts: float,
+    end_ts: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[tuple[float, tuple[float | None, ...]]]:
+    """Yield merged samples of several entities in time order.
+
+    source is the path of the recorder database or of a history cache
+    directory (see cache.py). Each sample is (timestamp, values) where
+    values holds the latest known value of every entity in entity_ids (None
+    if unknown or not configured). A sample is emitted for every recorded
+    state change of any entity.
+    """
+    if os.path.isdir(source):
+        # pylint: disable-next=import-outside-toplevel
+        from .cache import HistoryCache
+
+        conn = None
+        open_stream = HistoryCache(source).iter_entity_history
+    else:
+        conn = connect(source)
+        open_stream = partial(iter_entity_history, conn)
+    try:
+        streams = [
+            _tagged(index, open_stream(entity_id, start_ts, end_ts, chunk_size))
+            for index, entity_id in enumerate(entity_ids)
+            if entity_id
+        ]
+        values: list[float | None] = [None] * len(entity_ids)
+        for ts, index, value in heapq.merge(*streams):
+            values[index] = value
+            yield ts, tuple(values)
+    finally:
+        if conn is not None:
+            conn.close()
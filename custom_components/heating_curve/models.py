@@ -0,0 +1,308 @@
+"""Runtime data models for Heating Curve Calculator."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from .const import (
+    PRIMARY_CIRCUIT,
+    CONF_CURVE_LEVEL,
+    CONF_ROOM_TEMP_TARGET,
+    CHART_MIN_OUTDOOR_TEMP,
+    CHART_MAX_OUTDOOR_TEMP,
+    CHART_STEP,
+    DEFAULT_CURVE_SLOPE,
+    DEFAULT_CURVE_LEVEL,
+    DEFAULT_ROOM_TEMP_TARGET,
+    DEFAULT_MIN_FLOW_TEMP,
+    DEFAULT_MAX_FLOW_TEMP,
+    DEFAULT_CALCULATION_MODE,
+    DEFAULT_HYSTERESIS,
+    DEFAULT_CURVE_TYPE,
+    DEFAULT_RADIATOR_EXPONENT,
+)
+from .curve import CurveParameters, calculate_flow_temperatures
+from .output import OutputLimiter
+from .rooms import RoomConfig, RoomDemand
+
+if TYPE_CHECKING:
+    from .coordinator import HeatingCurveCoordinator
+
+
+@dataclass(slots=True)
+class HeatingCurveState:
+    """Current heating curve parameters of a config entry.
+
+    The field names match the keys of the number and select entities.
+    version is increased on every parameter change, so derived values can
+    be cached per version.
+    """
+
+    curve_slope: float = DEFAULT_CURVE_SLOPE
+    curve_level: float = DEFAULT_CURVE_LEVEL
+    room_temp_target: float = DEFAULT_ROOM_TEMP_TARGET
+    min_flow_temp: float = DEFAULT_MIN_FLOW_TEMP
+    max_flow_temp: float = DEFAULT_MAX_FLOW_TEMP
+    calculation_mode: str = DEFAULT_CALCULATION_MODE
+    hysteresis: float = DEFAULT_HYSTERESIS
+    curve_type: str = DEFAULT_CURVE_TYPE
+    radiator_exponent: float = DEFAULT_RADIATOR_EXPONENT
+    version: int = 0
+
+    def set_parameter(self, key: str, value: Any) -> bool:
+        """Set a parameter, return True if the value changed."""
+        if getattr(self, key) == value:
+            return False
+        setattr(self, key, value)
+        self.version += 1
+        return True
+
+
+@dataclass(slots=True)
+class HeatingCurveCircuit:
+    """One heating circuit of a config entry with its own parameter set."""
+
+    circuit_id: str
+    name: str
+    room_sensor: str | None = None
+    curve_points: tuple[tuple[float, float], ...] = ()
+    # Further room sensors besides room_sensor
+    rooms: tuple[RoomConfig, ...] = ()
+    # Entity the flow temperature is written to
+    output_entity: str | None = None
+    state: HeatingCurveState = field(default_factory=HeatingCurveState)
+    # Aggregated demand of all room sensors, None without room sensors
+    room_demand: RoomDemand | None = field(default=None, repr=False, compare=False)
+    # Dwell time and slew rate limits of the published flow temperature
+    output: OutputLimiter = field(
+        default_factory=OutputLimiter, repr=False, compare=False
+    )
+    # Offsets of the active setback profile slot
+    target_offset: float = 0.0
+    level_offset: float = 0.0
+    # Curve table for charts and the parameter version it was built for
+    _chart: dict[str, Any] | None = field(default=None, repr=False, compare=False)
+
+    def unique_id(self, entry_id: str, key: str) -> str:
+        """Return the unique id of one of the circuit's entities."""
+        if self.circuit_id == PRIMARY_CIRCUIT:
+            return f"{entry_id}_{key}"
+        return f"{entry_id}_{self.circuit_id}_{key}"
+
+    def device_identifier(self, entry_id: str) -> str:
+        """Return the identifier of the circuit's device."""
+        if self.circuit_id == PRIMARY_CIRCUIT:
+            return entry_id
+        return f"{entry_id}_{self.circuit_id}"
+
+    def reconfigure(
+        self,
+        room_sensor: str | None,
+        curve_points: tuple[tuple[float, float], ...],
+        rooms: tuple[RoomConfig, ...] = (),
+    ) -> bool:
+        """Apply changed options, return True if anything changed.
+
+        The parameter version is increased, so cached curve tables and
+        attributes are rebuilt.
+        """
+        if (room_sensor, curve_points, rooms) == (
+            self.room_sensor,
+            self.curve_points,
+            self.rooms,
+        ):
+            return False
+        self.room_sensor = room_sensor
+        self.curve_points = curve_points
+        self.rooms = rooms
+        self.state.version += 1
+        return True
+
+    def room_configs(self) -> list[RoomConfig]:
+        """Return all room sensors, room_sensor first.
+
+        room_sensor follows the circuit target with weight 1, unless it is
+        also listed in rooms.
+        """
+        configs = list(self.rooms)
+        if self.room_sensor and all(
+            room.entity_id != self.room_sensor for room in configs
+        ):
+            configs.insert(0, RoomConfig(self.room_sensor))
+        return configs
+
+    @property
+    def room_temp(self) -> float | None:
+        """Return the room temperature fed to the curve.
+
+        With several room sensors, the temperature equivalent to their
+        aggregated demand.
+        """
+        if self.room_demand is None:
+            return None
+        return self.room_demand.room_temperature(self.room_temp_target)
+
+    def set_setback(self, parameter: str | None, offset: float) -> bool:
+        """Apply the offset of a setback slot, return True if it changed.
+
+        parameter is the shifted key, room_temp_target or curve_level, or
+        None to clear the setback. The parameter version is increased, so
+        cached curve tables and forecast flows are rebuilt.
+        """
+        target_offset = offset if parameter == CONF_ROOM_TEMP_TARGET else 0.0
+        level_offset = offset if parameter == CONF_CURVE_LEVEL else 0.0
+        if (target_offset, level_offset) == (self.target_offset, self.level_offset):
+            return False
+        self.target_offset = target_offset
+        self.level_offset = level_offset
+        self.state.version += 1
+        return True
+
+    @property
+    def room_temp_target(self) -> float:
+        """Return the room target including the setback."""
+        return self.state.room_temp_target + self.target_offset
+
+    @property
+    def curve_level(self) -> float:
+        """Return the curve level including the setback."""
+        return self.state.curve_level + self.level_offset
+
+    def curve_parameters(self, setback: bool = True) -> CurveParameters:
+        """Return the current parameters for the curve engine.
+
+        With setback False the parameters of the number entities are
+        returned, without the offset of the active setback slot.
+        """
+        state = self.state
+        return CurveParameters(
+            curve_slope=state.curve_slope,
+            curve_level=self.curve_level if setback else state.curve_level,
+            room_temp_target=(
+                self.room_temp_target if setback else state.room_temp_target
+            ),
+            min_flow_temp=state.min_flow_temp,
+            max_flow_temp=state.max_flow_temp,
+            calculation_mode=state.calculation_mode,
+            curve_type=state.curve_type,
+            radiator_exponent=state.radiator_exponent,
+            curve_points=self.curve_points,
+            hysteresis=state.hysteresis,
+        )
+
+    def curve_chart(self) -> dict[str, Any]:
+        """Return the flow temperature over the chart's outdoor range.
+
+        Built on first request and cached until a parameter changes, so
+        outdoor updates never rebuild it. Room temperature corrections are
+        left out, the chart shows the curve at the target room temperature.
+        """
+        version = self.state.version
+        if self._chart is not None and self._chart["version"] == version:
+            return self._chart
+
+        count = round((CHART_MAX_OUTDOOR_TEMP - CHART_MIN_OUTDOOR_TEMP) / CHART_STEP)
+        outdoor_temps = [
+            CHART_MIN_OUTDOOR_TEMP + index * CHART_STEP for index in range(count + 1)
+        ]
+        self._chart = {
+            "version": version,
+            "outdoor_temperatures": outdoor_temps,
+            # 46 points, not worth importing NumPy for
+            "flow_temperatures": calculate_flow_temperatures(
+                outdoor_temps, None, self.curve_parameters(), use_numpy=False
+            ),
+        }
+        return self._chart
+
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last
+# bucket counts everything slower
+LATENCY_BUCKETS_MS: tuple[float, ...] = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000,
+)
+
+
+@dataclass(slots=True)
+class HeatingCurveStats:
+    """Counters of the input and recompute hot path of a config entry.
+
+    All fields exist from the start, updating them allocates nothing but
+    integers, so the counters can stay enabled permanently.
+    """
+
+    outdoor_events: int = 0
+    room_events: int = 0
+    parameter_events: int = 0
+    parse_failures: int = 0
+    recomputes: int = 0
+    hysteresis_holds: int = 0
+    writes: int = 0
+    unchanged_skips: int = 0
+    output_writes: int = 0
+    output_skips: int = 0
+    output_failures: int = 0
+    latency_histogram: array = field(
+        default_factory=lambda: array("Q", bytes(8 * (len(LATENCY_BUCKETS_MS) + 1)))
+    )
+
+    def record_write(self, latency: float) -> None:
+        """Count a state write, latency in seconds since the first event."""
+        self.writes += 1
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS_MS, latency * 1000)] += 1
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        """Return the bucket bound below which a share of the latencies fall.
+
+        None if nothing was written yet or the percentile falls into the
+        open last bucket.
+        """
+        total = sum(self.latency_histogram)
+        if not total:
+            return None
+        rank = total * percentile / 100
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_histogram):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters for diagnostics."""
+        return {
+            "outdoor_events": self.outdoor_events,
+            "room_events": self.room_events,
+            "parameter_events": self.parameter_events,
+            "parse_failures": self.parse_failures,
+            "recomputes": self.recomputes,
+            "hysteresis_holds": self.hysteresis_holds,
+            "writes": self.writes,
+            "unchanged_skips": self.unchanged_skips,
+            "output_writes": self.output_writes,
+            "output_skips": self.output_skips,
+            "output_failures": self.output_failures,
+            "latency_ms": {
+                **{
+                    f"<={bound:g}": count
+                    for bound, count in zip(
+                        LATENCY_BUCKETS_MS, self.latency_histogram
+                    )
+                },
+                f">{LATENCY_BUCKETS_MS[-1]:g}": self.latency_histogram[-1],
+            },
+            "latency_p50_ms": self.latency_percentile(50),
+            "latency_p95_ms": self.latency_percentile(95),
+        }
+
+
+@dataclass(slots=True)
+class HeatingCurveData:
+    """Runtime data stored in the config entry's runtime_data."""
+
+    config: Mapping[str, Any]
+    circuits: dict[str, HeatingCurveCircuit] = field(default_factory=dict)
+    coordinator: HeatingCurveCoordinator | None = None
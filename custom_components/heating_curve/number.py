@@ -1,41 +1,105 @@
 """Number platform for Heating Curve Calculator."""
 import logging
-from typing import Any
 
-from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.components.number import (
+    NumberEntity,
+    NumberEntityDescription,
+    NumberMode,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature, CONF_NAME
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import UnitOfTemperature
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import (
-    DOMAIN,
     CONF_CURVE_SLOPE,
     CONF_CURVE_LEVEL,
     CONF_ROOM_TEMP_TARGET,
     CONF_MIN_FLOW_TEMP,
     CONF_MAX_FLOW_TEMP,
     CONF_HYSTERESIS,
-    DEFAULT_CURVE_SLOPE,
-    DEFAULT_CURVE_LEVEL,
-    DEFAULT_ROOM_TEMP_TARGET,
-    DEFAULT_MIN_FLOW_TEMP,
-    DEFAULT_MAX_FLOW_TEMP,
-    DEFAULT_HYSTERESIS,
+    CONF_RADIATOR_EXPONENT,
+    PARAMETER_RANGES,
 )
+from .entity import HeatingCurveEntity
+from .models import HeatingCurveCircuit
 
 _LOGGER = logging.getLogger(__name__)
 
-# Mapping from key to default value
-_DEFAULTS = {
-    "curve_slope": DEFAULT_CURVE_SLOPE,
-    "curve_level": DEFAULT_CURVE_LEVEL,
-    "room_temp_target": DEFAULT_ROOM_TEMP_TARGET,
-    "min_flow_temp": DEFAULT_MIN_FLOW_TEMP,
-    "max_flow_temp": DEFAULT_MAX_FLOW_TEMP,
-    "hysteresis": DEFAULT_HYSTERESIS,
-}
+NUMBER_DESCRIPTIONS: tuple[NumberEntityDescription, ...] = (
+    NumberEntityDescription(
+        key=CONF_CURVE_SLOPE,
+        name="Heizkurven-Steilheit",
+        icon="mdi:chart-line",
+        native_min_value=PARAMETER_RANGES[CONF_CURVE_SLOPE][0],
+        native_max_value=PARAMETER_RANGES[CONF_CURVE_SLOPE][1],
+        native_step=0.1,
+    ),
+    NumberEntityDescription(
+        key=CONF_CURVE_LEVEL,
+        name="Heizkurven-Niveau",
+        icon="mdi:arrow-up-down",
+        native_min_value=PARAMETER_RANGES[CONF_CURVE_LEVEL][0],
+        native_max_value=PARAMETER_RANGES[CONF_CURVE_LEVEL][1],
+        native_step=0.5,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NumberEntityDescription(
+        key=CONF_ROOM_TEMP_TARGET,
+        name="Raum-Solltemperatur",
+        icon="mdi:home-thermometer",
+        native_min_value=PARAMETER_RANGES[CONF_ROOM_TEMP_TARGET][0],
+        native_max_value=PARAMETER_RANGES[CONF_ROOM_TEMP_TARGET][1],
+        native_step=0.5,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NumberEntityDescription(
+        key=CONF_MIN_FLOW_TEMP,
+        name="Min. Vorlauftemperatur",
+        icon="mdi:thermometer-chevron-down",
+        native_min_value=PARAMETER_RANGES[CONF_MIN_FLOW_TEMP][0],
+        native_max_value=PARAMETER_RANGES[CONF_MIN_FLOW_TEMP][1],
+        native_step=1.0,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NumberEntityDescription(
+        key=CONF_MAX_FLOW_TEMP,
+        name="Max. Vorlauftemperatur",
+        icon="mdi:thermometer-chevron-up",
+        native_min_value=PARAMETER_RANGES[CONF_MAX_FLOW_TEMP][0],
+        native_max_value=PARAMETER_RANGES[CONF_MAX_FLOW_TEMP][1],
+        native_step=1.0,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NumberEntityDescription(
+        key=CONF_HYSTERESIS,
+        name="Hysterese",
+        icon="mdi:swap-horizontal",
+        native_min_value=PARAMETER_RANGES[CONF_HYSTERESIS][0],
+        native_max_value=PARAMETER_RANGES[CONF_HYSTERESIS][1],
+        native_step=0.1,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NumberEntityDescription(
+        key=CONF_RADIATOR_EXPONENT,
+        name="Heizkörperexponent",
+        icon="mdi:radiator",
+        native_min_value=PARAMETER_RANGES[CONF_RADIATOR_EXPONENT][0],
+        native_max_value=PARAMETER_RANGES[CONF_RADIATOR_EXPONENT][1],
+        native_step=0.05,
+    ),
+)
+
+
+def restore_number(description: NumberEntityDescription, state: str) -> float | None:
+    """Return the value of a stored number state, None if not usable."""
+    try:
+        value = float(state)
+    except (ValueError, TypeError):
+        return None
+    # Clamp to valid range
+    return max(description.native_min_value, min(description.native_max_value, value))
 
 
 async def async_setup_entry(
@@ -44,181 +108,40 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the Heating Curve number entities from a config entry."""
-    
-    numbers = [
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "curve_slope",
-            "Heizkurven-Steilheit",
-            "mdi:chart-line",
-            0.1,
-            5.0,
-            0.1,
-            None,
-        ),
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "curve_level",
-            "Heizkurven-Niveau",
-            "mdi:arrow-up-down",
-            -20.0,
-            20.0,
-            0.5,
-            UnitOfTemperature.CELSIUS,
-        ),
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "room_temp_target",
-            "Raum-Solltemperatur",
-            "mdi:home-thermometer",
-            15.0,
-            25.0,
-            0.5,
-            UnitOfTemperature.CELSIUS,
-        ),
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "min_flow_temp",
-            "Min. Vorlauftemperatur",
-            "mdi:thermometer-chevron-down",
-            15.0,
-            50.0,
-            1.0,
-            UnitOfTemperature.CELSIUS,
-        ),
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "max_flow_temp",
-            "Max. Vorlauftemperatur",
-            "mdi:thermometer-chevron-up",
-            40.0,
-            90.0,
-            1.0,
-            UnitOfTemperature.CELSIUS,
-        ),
-        HeatingCurveNumber(
-            hass,
-            config_entry,
-            "hysteresis",
-            "Hysterese",
-            "mdi:swap-horizontal",
-            0.0,
-            5.0,
-            0.1,
-            UnitOfTemperature.CELSIUS,
-        ),
-    ]
-    
-    async_add_entities(numbers, True)
+    # Values were restored for all circuits in async_setup_entry of the
+    # integration, the entities only publish them
+    async_add_entities(
+        HeatingCurveNumber(config_entry, circuit, description)
+        for circuit in config_entry.runtime_data.circuits.values()
+        for description in NUMBER_DESCRIPTIONS
+    )
+
 
+class HeatingCurveNumber(HeatingCurveEntity, NumberEntity, RestoreEntity):
+    """Representation of a Heating Curve number entity.
 
-class HeatingCurveNumber(NumberEntity, RestoreEntity):
-    """Representation of a Heating Curve number entity."""
+    RestoreEntity only makes Home Assistant store the state on shutdown,
+    restoring is done in bulk at setup.
+    """
 
-    _attr_has_entity_name = True
     _attr_mode = NumberMode.SLIDER
 
     def __init__(
         self,
-        hass: HomeAssistant,
         config_entry: ConfigEntry,
-        key: str,
-        name: str,
-        icon: str,
-        min_value: float,
-        max_value: float,
-        step: float,
-        unit: str | None,
+        circuit: HeatingCurveCircuit,
+        description: NumberEntityDescription,
     ) -> None:
         """Initialize the number entity."""
-        self.hass = hass
-        self._config_entry = config_entry
-        self._key = key
-        self._attr_name = name
-        self._attr_icon = icon
-        self._attr_native_min_value = min_value
-        self._attr_native_max_value = max_value
-        self._attr_native_step = step
-        self._attr_native_unit_of_measurement = unit
-        
-        # Get device name
-        device_name = config_entry.data.get(CONF_NAME, "Heating Curve")
-        
-        # Generate unique_id
-        self._attr_unique_id = f"{config_entry.entry_id}_{key}"
-        
-        # Device info
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, config_entry.entry_id)},
-            "name": device_name,
-            "manufacturer": "Custom",
-            "model": "Heating Curve Calculator",
-            "sw_version": "2.1.0",
-        }
-        
-        # Set default value (will be overridden in async_added_to_hass)
-        self._attr_native_value = _DEFAULTS.get(key, min_value)
-
-    async def async_added_to_hass(self) -> None:
-        """Restore last known value when entity is added to hass."""
-        await super().async_added_to_hass()
-
-        # Try to restore the previous state
-        last_state = await self.async_get_last_state()
-        if (
-            last_state is not None
-            and last_state.state not in (None, "unknown", "unavailable")
-        ):
-            try:
-                restored_value = float(last_state.state)
-                # Clamp to valid range
-                restored_value = max(
-                    self._attr_native_min_value,
-                    min(self._attr_native_max_value, restored_value),
-                )
-                self._attr_native_value = restored_value
-                _LOGGER.debug(
-                    "Restored %s to %s", self._key, restored_value
-                )
-            except (ValueError, TypeError):
-                _LOGGER.warning(
-                    "Could not restore %s, using default", self._key
-                )
-
-        # Sync the restored (or default) value into hass.data so the
-        # sensor and other entities see it immediately
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        entry_data["state"][self._key] = self._attr_native_value
+        super().__init__(config_entry, circuit, description.key)
+        self.entity_description = description
+        self._attr_native_value = getattr(circuit.state, description.key)
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        # Update in hass.data
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        entry_data["state"][self._key] = value
+        # Update the runtime state and notify the sensor
+        if not self._async_parameter_updated(value, fire_event=True):
+            # Nothing changed, don't trigger a recompute
+            return
         self._attr_native_value = value
-        
-        # Notify sensor to update
         self.async_write_ha_state()
-        
-        # Signal other entities to update
-        self.hass.bus.async_fire(
-            f"{DOMAIN}_parameter_changed",
-            {
-                "entry_id": self._config_entry.entry_id,
-                "parameter": self._key,
-                "value": value,
-            },
-        )
-
-    async def async_update(self) -> None:
-        """Update the entity."""
-        # Get current value from state
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        self._attr_native_value = entry_data["state"].get(
-            self._key, self._attr_native_value
-        )
@@ -0,0 +1,89 @@
+"""Output stage of Heating Curve Calculator.
+
+Limits how often and how fast the published flow temperature follows the
+calculated one: a minimum dwell time between changes and a maximum slew
+rate in °C per minute. The limiter does not keep time itself, it reports
+when its next step is due and the coordinator schedules one timer for the
+earliest step of all circuits. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+# Published values are rounded to the resolution of the flow temperature
+OUTPUT_RESOLUTION = 0.1
+# Shortest interval between slew limited steps, so a high rate does not
+# turn one change into a stream of tiny writes
+MIN_STEP_INTERVAL = 60.0
+
+
+class OutputLimiter:
+    """Dwell time and slew rate limiter for one circuit's flow temperature."""
+
+    __slots__ = ("dwell_time", "slew_rate", "value", "last_change", "due")
+
+    def __init__(self, dwell_time: float = 0.0, slew_rate: float = 0.0) -> None:
+        """Initialize the limiter, dwell time in s and slew rate in °C/min."""
+        self.dwell_time = dwell_time
+        self.slew_rate = slew_rate
+        # Published value and the time it last changed
+        self.value: float | None = None
+        self.last_change: float | None = None
+        # Time of the next step towards the target, None when settled
+        self.due: float | None = None
+
+    @property
+    def active(self) -> bool:
+        """Return True if the limiter holds back any change."""
+        return self.dwell_time > 0 or self.slew_rate > 0
+
+    @property
+    def step_interval(self) -> float:
+        """Return the time that must pass between two changes."""
+        if not self.slew_rate:
+            return self.dwell_time
+        # Long enough for a step of at least the output resolution
+        return max(
+            self.dwell_time,
+            MIN_STEP_INTERVAL,
+            OUTPUT_RESOLUTION * 60 / self.slew_rate,
+        )
+
+    def configure(self, dwell_time: float, slew_rate: float) -> None:
+        """Change the limits, the published value is kept."""
+        self.dwell_time = dwell_time
+        self.slew_rate = slew_rate
+        if not self.active:
+            self.due = None
+
+    def update(self, target: float | None, now: float) -> float | None:
+        """Move the published value towards target, return it.
+
+        now is a monotonic time in seconds. The first value, a value after
+        an unavailable input and every value without limits pass straight
+        through.
+        """
+        if target is None or self.value is None or not self.active:
+            if target != self.value:
+                self.value = target
+                self.last_change = now
+            self.due = None
+            return self.value
+
+        if target == self.value:
+            self.due = None
+            return self.value
+
+        interval = self.step_interval
+        if now < (allowed := self.last_change + interval):
+            self.due = allowed
+            return self.value
+
+        step = target - self.value
+        if self.slew_rate:
+            # A step covers at most one interval, however long the value
+            # was settled before
+            max_step = self.slew_rate * min(now - self.last_change, interval) / 60
+            step = max(-max_step, min(max_step, step))
+        self.value = round(self.value + step, 1)
+        self.last_change = now
+        self.due = None if self.value == target else now + interval
+        return self.value
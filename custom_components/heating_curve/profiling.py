@@ -0,0 +1,44 @@
+"""On-demand profiling of the Heating Curve Calculator callbacks.
+
+The profiler runs on the event loop thread for a bounded time only and is
+removed afterwards, so nothing is measured or slowed down otherwise. The
+results are filtered to this package: the coordinator and sensor
+listeners, async_update, extra_state_attributes and the number and select
+setters. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+from typing import Any
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def summarize_profile(
+    profile: cProfile.Profile, dump_path: str | None = None
+) -> list[dict[str, Any]]:
+    """Return call counts and times of this package's functions.
+
+    Sorted by cumulative time. If dump_path is given, the full profile is
+    written there as well, for pstats or snakeviz.
+    """
+    if dump_path is not None:
+        profile.dump_stats(dump_path)
+
+    functions = []
+    stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+    for (filename, lineno, name), (_, calls, own, cumulative, _) in stats.items():
+        if not filename.startswith(PACKAGE_DIR):
+            continue
+        functions.append(
+            {
+                "function": f"{os.path.basename(filename)}:{lineno}({name})",
+                "calls": calls,
+                "own_time_ms": round(own * 1000, 3),
+                "cumulative_time_ms": round(cumulative * 1000, 3),
+            }
+        )
+    functions.sort(key=lambda function: function["cumulative_time_ms"], reverse=True)
+    return functions
@@ -0,0 +1,178 @@
+"""Room demand aggregation of Heating Curve Calculator.
+
+A circuit can read several room sensors, each with its own target and
+weight. Every room's demand is its deficit (target minus actual
+temperature); the circuit follows either the largest deficit or the
+weighted mean. Both are maintained incrementally, so a room update costs
+O(log n) instead of a scan over all rooms. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from heapq import heapify, heappop, heappush
+import re
+
+from .const import AGGREGATION_WORST_CASE
+
+_ENTITY_ID = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$")
+
+
+@dataclass(frozen=True, slots=True)
+class RoomConfig:
+    """One room sensor of a circuit."""
+
+    entity_id: str
+    # None follows the room target of the circuit
+    target: float | None = None
+    weight: float = 1.0
+
+
+def parse_room_sensors(text: str) -> tuple[RoomConfig, ...]:
+    """Parse rooms like "sensor.wohnzimmer:21:2, sensor.bad:22, sensor.flur".
+
+    Each room is "entity id[:target[:weight]]". Without a target the room
+    follows the circuit's target room temperature, the weight defaults to
+    1. Raises ValueError if the text is malformed, a weight is not positive
+    or a sensor is listed twice.
+    """
+    rooms: dict[str, RoomConfig] = {}
+    for item in re.split(r"[,;\n]", text):
+        item = item.strip()
+        if not item:
+            continue
+        entity_id, *values = (value.strip() for value in item.split(":"))
+        if not _ENTITY_ID.match(entity_id) or len(values) > 2:
+            raise ValueError(f"Invalid room sensor: {item}")
+        target = float(values[0]) if values and values[0] else None
+        weight = float(values[1]) if len(values) > 1 else 1.0
+        if weight <= 0:
+            raise ValueError(f"Room weight must be positive: {item}")
+        if entity_id in rooms:
+            raise ValueError(f"Room sensor listed twice: {entity_id}")
+        rooms[entity_id] = RoomConfig(entity_id, target, weight)
+
+    return tuple(rooms.values())
+
+
+class RoomDemand:
+    """Incrementally aggregated demand of the rooms of a circuit.
+
+    Worst case keeps a max-heap of the deficits with lazy deletion: an
+    update pushes a new entry and outdated entries are dropped when they
+    reach the top. The weighted blend keeps running sums of the weighted
+    deficits and the weights.
+    """
+
+    def __init__(self, rooms: Sequence[RoomConfig], aggregation: str) -> None:
+        """Initialize the aggregation without temperatures."""
+        self.rooms = {room.entity_id: room for room in rooms}
+        self.worst_case = aggregation == AGGREGATION_WORST_CASE
+        self._temperatures: dict[str, float] = {}
+        self._deficits: dict[str, float] = {}
+        # Target of the rooms without their own, set on the first lookup
+        self._target: float | None = None
+        # Max-heap as (negated deficit, sequence, entity id), an entry is
+        # current if its sequence is the room's latest
+        self._heap: list[tuple[float, int, str]] = []
+        self._sequences: dict[str, int] = {}
+        self._sequence = 0
+        self._weighted_sum = 0.0
+        self._weight_total = 0.0
+
+    def update(self, entity_id: str, temperature: float | None) -> None:
+        """Set the temperature of a room, None if it is unavailable."""
+        if temperature is None:
+            self._temperatures.pop(entity_id, None)
+        else:
+            self._temperatures[entity_id] = temperature
+        if self._target is not None:
+            self._apply(entity_id)
+
+    def _apply(self, entity_id: str) -> None:
+        """Replace a room's deficit in the aggregate."""
+        room = self.rooms[entity_id]
+        previous = self._deficits.pop(entity_id, None)
+        if previous is not None and not self.worst_case:
+            self._weighted_sum -= room.weight * previous
+            self._weight_total -= room.weight
+        self._sequences.pop(entity_id, None)
+
+        if (temperature := self._temperatures.get(entity_id)) is None:
+            return
+        target = self._target if room.target is None else room.target
+        deficit = target - temperature
+        self._deficits[entity_id] = deficit
+        if self.worst_case:
+            self._sequence += 1
+            self._sequences[entity_id] = self._sequence
+            heappush(self._heap, (-deficit, self._sequence, entity_id))
+            if len(self._heap) > 2 * len(self.rooms) + 8:
+                # Bound the outdated entries of rooms that rarely top
+                self._rebuild()
+        else:
+            self._weighted_sum += room.weight * deficit
+            self._weight_total += room.weight
+
+    def _rebuild(self) -> None:
+        """Aggregate all rooms from scratch in O(n)."""
+        deficits = self._deficits
+        if self.worst_case:
+            self._sequences = {}
+            self._heap = []
+            for entity_id, deficit in deficits.items():
+                self._sequence += 1
+                self._sequences[entity_id] = self._sequence
+                self._heap.append((-deficit, self._sequence, entity_id))
+            heapify(self._heap)
+        else:
+            self._weighted_sum = sum(
+                self.rooms[entity_id].weight * deficit
+                for entity_id, deficit in deficits.items()
+            )
+            self._weight_total = sum(
+                self.rooms[entity_id].weight for entity_id in deficits
+            )
+
+    def _set_target(self, target: float) -> None:
+        """Recompute all deficits for a new circuit target."""
+        self._target = target
+        self._deficits = {}
+        for entity_id, temperature in self._temperatures.items():
+            room = self.rooms[entity_id]
+            self._deficits[entity_id] = (
+                target if room.target is None else room.target
+            ) - temperature
+        self._rebuild()
+
+    def _top(self) -> tuple[float, int, str] | None:
+        """Return the current entry with the largest deficit."""
+        heap = self._heap
+        while heap and heap[0][1] != self._sequences.get(heap[0][2]):
+            heappop(heap)
+        return heap[0] if heap else None
+
+    @property
+    def worst_room(self) -> str | None:
+        """Return the room with the largest deficit in worst case mode."""
+        if not self.worst_case or (top := self._top()) is None:
+            return None
+        return top[2]
+
+    def room_temperature(self, target: float) -> float | None:
+        """Return the room temperature equivalent to the aggregated demand.
+
+        That is the circuit target minus the aggregated deficit, so a
+        single room following the circuit target yields its own
+        temperature. None while no room has a temperature.
+        """
+        if target != self._target:
+            self._set_target(target)
+        if not self._deficits:
+            return None
+        if self.worst_case:
+            demand = -self._top()[0]
+        else:
+            demand = self._weighted_sum / self._weight_total
+        # Drop the float noise of the running sums
+        return round(target - demand, 2)
@@ -1,294 +1,387 @@
 """Sensor platform for Heating Curve Calculator."""
+from collections.abc import Callable
+from dataclasses import dataclass
 import logging
 from typing import Any
 
 from homeassistant.components.sensor import (
     SensorEntity,
+    SensorEntityDescription,
     SensorDeviceClass,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature, CONF_NAME
-from homeassistant.core import HomeAssistant, callback, Event
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
-
-from .const import (
-    DOMAIN,
-    CONF_OUTDOOR_SENSOR,
-    CONF_ROOM_SENSOR,
-    MODE_CLASSIC,
-    MODE_WITH_ROOM_TEMP,
+
+from .const import MODE_CLASSIC, PRIMARY_CIRCUIT
+from .coordinator import HeatingCurveCoordinator
+from .curve import (
+    CurveTable,
+    apply_hysteresis,
+    build_curve_table,
+    calculate_flow_temperature,
 )
+from .entity import HeatingCurveEntity
+from .models import HeatingCurveCircuit, HeatingCurveState, HeatingCurveStats
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, kw_only=True)
+class HeatingCurveStatsSensorDescription(SensorEntityDescription):
+    """Description of a sensor exposing one of the performance counters."""
+
+    value_fn: Callable[[HeatingCurveStats], float | None]
+
+
+# Disabled by default, enabling them only adds a poll of the counters
+STATS_SENSOR_DESCRIPTIONS: tuple[HeatingCurveStatsSensorDescription, ...] = (
+    HeatingCurveStatsSensorDescription(
+        key="outdoor_events",
+        name="Ereignisse Außensensor",
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.outdoor_events,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="room_events",
+        name="Ereignisse Raumsensor",
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.room_events,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="parameter_events",
+        name="Parameteränderungen",
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.parameter_events,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="recomputes",
+        name="Neuberechnungen",
+        icon="mdi:calculator",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.recomputes,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="hysteresis_holds",
+        name="Durch Hysterese gehalten",
+        icon="mdi:swap-horizontal",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.hysteresis_holds,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="writes",
+        name="Zustandsänderungen",
+        icon="mdi:content-save",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.writes,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="parse_failures",
+        name="Ungültige Messwerte",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.parse_failures,
+    ),
+    HeatingCurveStatsSensorDescription(
+        key="latency_p95",
+        name="Latenz 95. Perzentil",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda stats: stats.latency_percentile(95),
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up the Heating Curve sensor from a config entry."""
-    config = config_entry.data
-    
-    sensor = HeatingCurveSensor(
-        hass=hass,
-        config_entry=config_entry,
-        name=config.get(CONF_NAME, "Heating Curve"),
-        outdoor_sensor=config[CONF_OUTDOOR_SENSOR],
-        room_sensor=config.get(CONF_ROOM_SENSOR),
+    """Set up the Heating Curve sensors from a config entry."""
+    circuits = config_entry.runtime_data.circuits
+    async_add_entities(
+        [
+            *(
+                HeatingCurveSensor(config_entry, circuit)
+                for circuit in circuits.values()
+            ),
+            # The counters are per entry, on the device of the main circuit
+            *(
+                HeatingCurveStatsSensor(
+                    config_entry, circuits[PRIMARY_CIRCUIT], description
+                )
+                for description in STATS_SENSOR_DESCRIPTIONS
+            ),
+        ]
     )
-    
-    async_add_entities([sensor], True)
 
 
-class HeatingCurveSensor(SensorEntity):
+class HeatingCurveSensor(HeatingCurveEntity, SensorEntity):
     """Representation of a Heating Curve sensor."""
 
     _attr_device_class = SensorDeviceClass.TEMPERATURE
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-    _attr_has_entity_name = True
+    _attr_should_poll = False
+    # Static and parameter attributes only change with the configuration or
+    # a number/select entity, which records them itself
+    _unrecorded_attributes = frozenset(
+        {
+            "curve_slope",
+            "curve_level",
+            "room_temperature_target",
+            "min_flow_temperature",
+            "max_flow_temperature",
+            "calculation_mode",
+            "hysteresis",
+            "curve_type",
+            "radiator_exponent",
+            "outdoor_sensor",
+            "room_sensor",
+            "room_sensors",
+        }
+    )
 
     def __init__(
-        self,
-        hass: HomeAssistant,
-        config_entry: ConfigEntry,
-        name: str,
-        outdoor_sensor: str,
-        room_sensor: str | None,
+        self, config_entry: ConfigEntry, circuit: HeatingCurveCircuit
     ) -> None:
         """Initialize the sensor."""
-        self.hass = hass
-        self._config_entry = config_entry
+        super().__init__(config_entry, circuit, "flow_temperature")
         self._attr_name = "Vorlauftemperatur"
-        self._outdoor_sensor = outdoor_sensor
-        self._room_sensor = room_sensor
+        self._coordinator: HeatingCurveCoordinator = (
+            config_entry.runtime_data.coordinator
+        )
         self._attr_native_value = None
-        self._outdoor_temp = None
-        self._room_temp = None
         self._last_output = None  # For hysteresis
-        
-        # Generate unique_id
-        self._attr_unique_id = f"{config_entry.entry_id}_flow_temperature"
-        
-        # Device info
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, config_entry.entry_id)},
-            "name": name,
-            "manufacturer": "Custom",
-            "model": "Heating Curve Calculator",
-            "sw_version": "2.0.0",
-        }
+        self._curve_table: CurveTable | None = None
+        self._curve_table_version: int | None = None
+        self._last_written: tuple | None = None
+        self._attributes: dict[str, Any] = {}
+        self._attributes_key: tuple | None = None
 
-    async def async_added_to_hass(self) -> None:
-        """Register callbacks when entity is added."""
-        # Track outdoor sensor state changes
-        @callback
-        def outdoor_sensor_listener(event: Event) -> None:
-            """Handle outdoor sensor state changes."""
-            new_state = event.data.get("new_state")
-            if new_state is None or new_state.state in ("unknown", "unavailable"):
-                self._outdoor_temp = None
-            else:
-                try:
-                    self._outdoor_temp = float(new_state.state)
-                except (ValueError, TypeError):
-                    self._outdoor_temp = None
-            
-            self.async_schedule_update_ha_state(True)
+    @property
+    def _outdoor_sensor(self) -> str:
+        """Return the outdoor sensor, which can change in the options."""
+        return self._coordinator.outdoor_sensor
 
-        self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, [self._outdoor_sensor], outdoor_sensor_listener
-            )
-        )
+    @property
+    def _room_sensor(self) -> str | None:
+        """Return the room sensor of this circuit."""
+        return self._circuit.room_sensor
 
-        # Track room sensor if configured
-        if self._room_sensor:
-            @callback
-            def room_sensor_listener(event: Event) -> None:
-                """Handle room sensor state changes."""
-                new_state = event.data.get("new_state")
-                if new_state is None or new_state.state in ("unknown", "unavailable"):
-                    self._room_temp = None
-                else:
-                    try:
-                        self._room_temp = float(new_state.state)
-                    except (ValueError, TypeError):
-                        self._room_temp = None
-                
-                self.async_schedule_update_ha_state(True)
-
-            self.async_on_remove(
-                async_track_state_change_event(
-                    self.hass, [self._room_sensor], room_sensor_listener
-                )
-            )
+    @property
+    def _outdoor_temp(self) -> float | None:
+        """Return the outdoor temperature shared by all circuits."""
+        return self._coordinator.outdoor_temp
 
-        # Listen for parameter changes from number/select entities
-        @callback
-        def parameter_changed_listener(event: Event) -> None:
-            """Handle parameter changes."""
-            if event.data.get("entry_id") == self._config_entry.entry_id:
-                self.async_schedule_update_ha_state(True)
+    @property
+    def _worst_room(self) -> str | None:
+        """Return the room with the largest demand in worst case mode."""
+        if (room_demand := self._circuit.room_demand) is None:
+            return None
+        return room_demand.worst_room
 
+    @property
+    def _room_temp(self) -> float | None:
+        """Return the room temperature of this circuit."""
+        return self._circuit.room_temp
+
+    async def async_added_to_hass(self) -> None:
+        """Register with the coordinator when entity is added."""
+        # Input and parameter changes are tracked once per entry by the
+        # coordinator, which calls back for the circuits that changed
         self.async_on_remove(
-            self.hass.bus.async_listen(
-                f"{DOMAIN}_parameter_changed", parameter_changed_listener
+            self._coordinator.async_add_listener(
+                self._circuit.circuit_id, self._async_recompute
             )
         )
 
-        # Initial state
-        state = self.hass.states.get(self._outdoor_sensor)
-        if state and state.state not in ("unknown", "unavailable"):
-            try:
-                self._outdoor_temp = float(state.state)
-            except (ValueError, TypeError):
-                pass
-        
-        if self._room_sensor:
-            room_state = self.hass.states.get(self._room_sensor)
-            if room_state and room_state.state not in ("unknown", "unavailable"):
-                try:
-                    self._room_temp = float(room_state.state)
-                except (ValueError, TypeError):
-                    pass
-
-    def calculate_flow_temperature(
-        self,
-        outdoor_temp: float,
-        room_temp: float | None,
-        curve_slope: float,
-        curve_level: float,
-        room_temp_target: float,
-        min_flow: float,
-        max_flow: float,
-        calculation_mode: str,
-    ) -> float:
-        """Calculate flow temperature based on heating curve.
-        
-        Two modes:
-        1. Classic (without room temperature feedback):
-           T_flow = T_room_target + slope * (T_room_target - T_outdoor) + level
-           
-        2. With room temperature feedback:
-           T_flow = T_room_target + slope * (T_room_actual - T_outdoor) + level
-        
-        Args:
-            outdoor_temp: Current outdoor temperature in °C
-            room_temp: Current room temperature in °C (optional)
-            curve_slope: Heating curve slope
-            curve_level: Heating curve level (parallel shift)
-            room_temp_target: Target room temperature in °C
-            min_flow: Minimum flow temperature in °C
-            max_flow: Maximum flow temperature in °C
-            calculation_mode: "classic" or "with_room_temp"
-            
-        Returns:
-            Calculated flow temperature in °C (clamped to min/max)
+        # Inputs and restored parameters are known before the entity is
+        # added, so the first state written on add is already the result
+        self._update_value()
+        self._last_written = (self._attr_native_value, self.extra_state_attributes)
+
+    @callback
+    def _async_recompute(self) -> bool:
+        """Recompute the flow temperature and write state if it changed.
+
+        Returns True if the state was written.
         """
-        # Determine which room temperature to use
-        if calculation_mode == MODE_WITH_ROOM_TEMP and room_temp is not None:
-            # Use actual room temperature
-            reference_temp = room_temp
-        else:
-            # Use target room temperature (classic mode)
-            reference_temp = room_temp_target
-        
-        # Calculate base flow temperature using heating curve
-        temp_difference = reference_temp - outdoor_temp
-        flow_temp = (
-            room_temp_target 
-            + curve_slope * temp_difference 
-            + curve_level
-        )
-        
-        # Clamp to min/max limits
-        flow_temp = max(min_flow, min(max_flow, flow_temp))
-        
-        return round(flow_temp, 1)
+        self._update_value()
+        written = (self._attr_native_value, self.extra_state_attributes)
+        if written == self._last_written:
+            return False
+        self._last_written = written
+        self.async_write_ha_state()
+        return True
 
     async def async_update(self) -> None:
         """Update the sensor value."""
-        # Get current parameters from state
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        state = entry_data["state"]
-        
-        curve_slope = state.get("curve_slope", 1.4)
-        curve_level = state.get("curve_level", 0.0)
-        room_temp_target = state.get("room_temp_target", 20.0)
-        min_flow = state.get("min_flow_temp", 20.0)
-        max_flow = state.get("max_flow_temp", 75.0)
-        calculation_mode = state.get("calculation_mode", MODE_CLASSIC)
-        hysteresis = state.get("hysteresis", 1.0)
-
-        if self._outdoor_temp is not None:
-            new_value = self.calculate_flow_temperature(
+        self._update_value()
+
+    def _update_value(self) -> None:
+        """Calculate the flow temperature from the current inputs."""
+        state = self._circuit.state
+
+        # In predictive mode the forecast one lead time ahead is used
+        new_value = self._coordinator.predicted_flow_temperature(self._circuit)
+        if new_value is None and self._outdoor_temp is not None:
+            new_value = calculate_flow_temperature(
                 outdoor_temp=self._outdoor_temp,
                 room_temp=self._room_temp,
-                curve_slope=curve_slope,
-                curve_level=curve_level,
-                room_temp_target=room_temp_target,
-                min_flow=min_flow,
-                max_flow=max_flow,
-                calculation_mode=calculation_mode,
+                curve_slope=state.curve_slope,
+                curve_level=self._circuit.curve_level,
+                room_temp_target=self._circuit.room_temp_target,
+                min_flow=state.min_flow_temp,
+                max_flow=state.max_flow_temp,
+                calculation_mode=state.calculation_mode,
+                curve_table=self._get_curve_table(state),
+            )
+
+        if new_value is not None:
+            self._last_output = apply_hysteresis(
+                new_value, self._last_output, state.hysteresis
             )
-            
-            # Apply hysteresis
-            if self._last_output is None:
-                # First run, set directly
-                self._attr_native_value = new_value
-                self._last_output = new_value
-            else:
-                # Check if change is larger than hysteresis
-                change = abs(new_value - self._last_output)
-                if change >= hysteresis:
-                    self._attr_native_value = new_value
-                    self._last_output = new_value
-                # else: keep old value (within hysteresis band)
+            if self._last_output != new_value:
+                self._coordinator.stats.hysteresis_holds += 1
         else:
-            self._attr_native_value = None
             self._last_output = None
 
+        # The output stage limits how often and how fast the state follows,
+        # the coordinator times its next step
+        self._attr_native_value = self._circuit.output.update(
+            self._last_output, self.hass.loop.time()
+        )
+
+    def _get_curve_table(self, state: HeatingCurveState) -> CurveTable | None:
+        """Return the lookup table for the current curve parameters.
+
+        The table is only rebuilt when the parameter version changed.
+        """
+        if state.version != self._curve_table_version:
+            self._curve_table = build_curve_table(
+                state.curve_type,
+                state.curve_slope,
+                state.radiator_exponent,
+                self._circuit.curve_points,
+            )
+            self._curve_table_version = state.version
+        return self._curve_table
+
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        """Return additional state attributes."""
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        state = entry_data["state"]
+        """Return additional state attributes.
+
+        The dict is cached until an input or a parameter changes.
+        """
+        state = self._circuit.state
+        key = (
+            state.version,
+            self._outdoor_sensor,
+            self._outdoor_temp,
+            self._room_temp,
+            self._coordinator.forecast_outdoor_temp,
+            self._worst_room,
+            self._last_output,
+            # Select the optional attributes below
+            self._circuit.output.active,
+            self._coordinator.setback_schedule is not None,
+            self._coordinator.weather_entity,
+        )
+        if key == self._attributes_key:
+            return self._attributes
         
         attrs = {
             "outdoor_temperature": self._outdoor_temp,
-            "curve_slope": state.get("curve_slope", 1.4),
-            "curve_level": state.get("curve_level", 0.0),
-            "room_temperature_target": state.get("room_temp_target", 20.0),
-            "min_flow_temperature": state.get("min_flow_temp", 20.0),
-            "max_flow_temperature": state.get("max_flow_temp", 75.0),
-            "calculation_mode": state.get("calculation_mode", MODE_CLASSIC),
-            "hysteresis": state.get("hysteresis", 1.0),
+            "curve_slope": state.curve_slope,
+            "curve_level": state.curve_level,
+            "room_temperature_target": state.room_temp_target,
+            "min_flow_temperature": state.min_flow_temp,
+            "max_flow_temperature": state.max_flow_temp,
+            "calculation_mode": state.calculation_mode,
+            "hysteresis": state.hysteresis,
+            "curve_type": state.curve_type,
+            "radiator_exponent": state.radiator_exponent,
             "outdoor_sensor": self._outdoor_sensor,
         }
         
+        # Add the unlimited value while the output stage holds back
+        if self._circuit.output.active:
+            attrs["target_flow_temperature"] = self._last_output
+
+        # Add the offset of the active setback slot
+        if self._coordinator.setback_schedule is not None:
+            attrs["setback_offset"] = (
+                self._circuit.target_offset or self._circuit.level_offset
+            )
+
+        # Add forecast info in predictive mode
+        if self._coordinator.weather_entity:
+            attrs["forecast_outdoor_temperature"] = (
+                self._coordinator.forecast_outdoor_temp
+            )
+
         # Add room temperature info if configured
-        if self._room_sensor:
-            attrs["room_sensor"] = self._room_sensor
+        if (room_demand := self._circuit.room_demand) is not None:
+            if self._room_sensor:
+                attrs["room_sensor"] = self._room_sensor
             attrs["room_temperature_actual"] = self._room_temp
+            if len(room_demand.rooms) > 1:
+                attrs["room_sensors"] = list(room_demand.rooms)
+                if room_demand.worst_case:
+                    attrs["worst_room"] = self._worst_room
         
+        self._attributes = attrs
+        self._attributes_key = key
         return attrs
 
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        entry_data = self.hass.data[DOMAIN][self._config_entry.entry_id]
-        state = entry_data["state"]
-        calculation_mode = state.get("calculation_mode", MODE_CLASSIC)
+        calculation_mode = self._circuit.state.calculation_mode
+        # The forecast stands in for the outdoor sensor in predictive mode
+        outdoor_known = (
+            self._outdoor_temp is not None
+            or self._coordinator.forecast_outdoor_temp is not None
+        )
         
         # Classic mode: only outdoor temp required
         if calculation_mode == MODE_CLASSIC:
-            return self._outdoor_temp is not None
+            return outdoor_known
         
         # With room temp mode: both temps required
-        return self._outdoor_temp is not None and self._room_temp is not None
+        return outdoor_known and self._room_temp is not None
+
+
+class HeatingCurveStatsSensor(HeatingCurveEntity, SensorEntity):
+    """Diagnostic sensor exposing a performance counter of the entry."""
 
+    entity_description: HeatingCurveStatsSensorDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    # Polled, so the counters never add work to the hot path
+    _attr_should_poll = True
 
+    def __init__(
+        self,
+        config_entry: ConfigEntry,
+        circuit: HeatingCurveCircuit,
+        description: HeatingCurveStatsSensorDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(config_entry, circuit, description.key)
+        self.entity_description = description
+        self._stats: HeatingCurveStats = (
+            config_entry.runtime_data.coordinator.stats
+        )
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the current counter value."""
+        return self.entity_description.value_fn(self._stats)
@@ -0,0 +1,515 @@
+"""Services for Heating Curve Calculator."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from datetime import datetime
+from functools import partial
+import itertools
+import logging
+import math
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_OUTDOOR_SENSOR,
+    PRIMARY_CIRCUIT,
+    CONF_CURVE_SLOPE,
+    CONF_CURVE_LEVEL,
+    CONF_ROOM_TEMP_TARGET,
+    CONF_MIN_FLOW_TEMP,
+    CONF_MAX_FLOW_TEMP,
+    CONF_CALCULATION_MODE,
+    CONF_HYSTERESIS,
+    CONF_CURVE_TYPE,
+    CONF_RADIATOR_EXPONENT,
+    CONF_CURVE_POINTS,
+    CALCULATION_MODES,
+    CURVE_TYPES,
+    PARAMETER_RANGES,
+)
+from .curve import (
+    CurveParameters,
+    calculate_flow_temperatures,
+    load_numpy,
+    parse_curve_points,
+)
+from .models import HeatingCurveCircuit
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BACKTEST = "backtest"
+SERVICE_AUTO_TUNE = "auto_tune"
+SERVICE_PROFILE = "profile"
+SERVICE_CALCULATE = "calculate"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_CIRCUIT = "circuit"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_MAX_WORKERS = "max_workers"
+ATTR_FLOW_SENSOR = "flow_sensor"
+ATTR_APPLY = "apply"
+ATTR_DURATION = "duration"
+ATTR_WRITE_FILE = "write_file"
+ATTR_OUTDOOR_TEMPERATURE = "outdoor_temperature"
+ATTR_ROOM_TEMPERATURE = "room_temperature"
+ATTR_RANGE_START = "start"
+ATTR_RANGE_END = "end"
+ATTR_RANGE_STEP = "step"
+
+# Upper bound for the size of a backtest parameter grid
+MAX_BACKTEST_CANDIDATES = 1000
+# Upper bound for the number of points of one calculation
+MAX_CALCULATE_POINTS = 10000
+
+_FLOAT_LIST = vol.All(cv.ensure_list, [vol.Coerce(float)])
+
+
+def _parameter(key: str) -> vol.All:
+    """Return the validator of a parameter, limited to its range."""
+    minimum, maximum = PARAMETER_RANGES[key]
+    return vol.All(vol.Coerce(float), vol.Range(min=minimum, max=maximum))
+
+
+def _parameter_list(key: str) -> vol.All:
+    """Return the validator of a list of values of a parameter."""
+    return vol.All(cv.ensure_list, [_parameter(key)])
+
+
+BACKTEST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CIRCUIT, default=PRIMARY_CIRCUIT): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(CONF_CURVE_SLOPE): _parameter_list(CONF_CURVE_SLOPE),
+        vol.Optional(CONF_CURVE_LEVEL): _parameter_list(CONF_CURVE_LEVEL),
+        vol.Optional(CONF_HYSTERESIS): _parameter_list(CONF_HYSTERESIS),
+        vol.Optional(ATTR_MAX_WORKERS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=32)
+        ),
+    }
+)
+
+AUTO_TUNE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CIRCUIT, default=PRIMARY_CIRCUIT): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_FLOW_SENSOR): cv.entity_id,
+        vol.Optional(ATTR_APPLY, default=False): cv.boolean,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=600)
+        ),
+        vol.Optional(ATTR_WRITE_FILE, default=False): cv.boolean,
+    }
+)
+
+# Either a list of temperatures or an inclusive range
+_TEMPERATURE_RANGE = vol.Schema(
+    {
+        vol.Required(ATTR_RANGE_START): vol.Coerce(float),
+        vol.Required(ATTR_RANGE_END): vol.Coerce(float),
+        vol.Optional(ATTR_RANGE_STEP, default=1.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0.01)
+        ),
+    }
+)
+
+CALCULATE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CIRCUIT, default=PRIMARY_CIRCUIT): cv.string,
+        vol.Required(ATTR_OUTDOOR_TEMPERATURE): vol.Any(
+            _TEMPERATURE_RANGE, _FLOAT_LIST
+        ),
+        vol.Optional(ATTR_ROOM_TEMPERATURE): _FLOAT_LIST,
+        vol.Optional(CONF_CURVE_SLOPE): _parameter(CONF_CURVE_SLOPE),
+        vol.Optional(CONF_CURVE_LEVEL): _parameter(CONF_CURVE_LEVEL),
+        vol.Optional(CONF_ROOM_TEMP_TARGET): _parameter(CONF_ROOM_TEMP_TARGET),
+        vol.Optional(CONF_MIN_FLOW_TEMP): _parameter(CONF_MIN_FLOW_TEMP),
+        vol.Optional(CONF_MAX_FLOW_TEMP): _parameter(CONF_MAX_FLOW_TEMP),
+        vol.Optional(CONF_CALCULATION_MODE): vol.In(CALCULATION_MODES),
+        vol.Optional(CONF_CURVE_TYPE): vol.In(CURVE_TYPES),
+        vol.Optional(CONF_RADIATOR_EXPONENT): _parameter(CONF_RADIATOR_EXPONENT),
+        vol.Optional(CONF_CURVE_POINTS): cv.string,
+    }
+)
+
+# Parameters a calculation can override, all of them CurveParameters fields
+CALCULATE_OVERRIDES = (
+    CONF_CURVE_SLOPE,
+    CONF_CURVE_LEVEL,
+    CONF_ROOM_TEMP_TARGET,
+    CONF_MIN_FLOW_TEMP,
+    CONF_MAX_FLOW_TEMP,
+    CONF_CALCULATION_MODE,
+    CONF_CURVE_TYPE,
+    CONF_RADIATOR_EXPONENT,
+)
+
+
+def temperature_points(value: list[float] | dict[str, float]) -> list[float]:
+    """Return the temperatures of a list or range field of a service call."""
+    if isinstance(value, list):
+        points = value
+    else:
+        start = value[ATTR_RANGE_START]
+        end = value[ATTR_RANGE_END]
+        step = value[ATTR_RANGE_STEP]
+        if start > end:
+            raise ServiceValidationError("start must not be above end")
+        # Inclusive end, tolerant to floating point steps
+        count = math.floor((end - start) / step + 1e-9) + 1
+        if count > MAX_CALCULATE_POINTS:
+            raise ServiceValidationError(
+                f"The range has {count} points, "
+                f"at most {MAX_CALCULATE_POINTS} are allowed"
+            )
+        points = [round(start + index * step, 6) for index in range(count)]
+
+    if not points:
+        raise ServiceValidationError("No outdoor temperatures given")
+    if len(points) > MAX_CALCULATE_POINTS:
+        raise ServiceValidationError(
+            f"{len(points)} outdoor temperatures given, "
+            f"at most {MAX_CALCULATE_POINTS} are allowed"
+        )
+    return points
+
+
+@callback
+def async_get_loaded_entry(hass: HomeAssistant, entry_id: str) -> ConfigEntry:
+    """Return a loaded config entry of this integration."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Unknown heating curve entry: {entry_id}")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Heating curve entry {entry.title} is not loaded")
+    return entry
+
+
+@callback
+def async_get_recorder_db_path(hass: HomeAssistant) -> str:
+    """Return the path of the recorder's SQLite database."""
+    if "recorder" not in hass.config.components:
+        raise ServiceValidationError("The recorder integration is not set up")
+
+    # pylint: disable-next=import-outside-toplevel
+    from homeassistant.components.recorder import get_instance
+    # pylint: disable-next=import-outside-toplevel
+    from homeassistant.components.recorder.util import dburl_to_path
+
+    db_url = get_instance(hass).db_url
+    if not db_url.startswith("sqlite://") or ":memory:" in db_url:
+        raise ServiceValidationError(
+            "History analysis requires the default SQLite recorder database"
+        )
+    return dburl_to_path(db_url)
+
+
+@callback
+def async_get_circuit(entry: ConfigEntry, call: ServiceCall) -> HeatingCurveCircuit:
+    """Return the heating circuit addressed by a service call."""
+    circuit_id = call.data[ATTR_CIRCUIT]
+    if (circuit := entry.runtime_data.circuits.get(circuit_id)) is None:
+        raise ServiceValidationError(
+            f"Heating curve entry {entry.title} has no circuit {circuit_id}"
+        )
+    return circuit
+
+
+@callback
+def async_get_period(call: ServiceCall) -> tuple[datetime, datetime]:
+    """Return the start and end of a history service call as UTC datetimes."""
+    start = dt_util.as_utc(call.data[ATTR_START])
+    end = dt_util.as_utc(call.data.get(ATTR_END) or dt_util.utcnow())
+    if start >= end:
+        raise ServiceValidationError("start must be before end")
+    return start, end
+
+
+@callback
+def async_get_entity_id(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    circuit: HeatingCurveCircuit,
+    domain: str,
+    key: str,
+) -> str:
+    """Return the entity id of one of a circuit's entities."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        domain, DOMAIN, circuit.unique_id(entry.entry_id, key)
+    )
+    if entity_id is None:
+        raise ServiceValidationError(
+            f"Heating circuit {circuit.name} has no {domain} entity {key}"
+        )
+    return entity_id
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Heating Curve Calculator services."""
+
+    async def async_backtest(call: ServiceCall) -> ServiceResponse:
+        """Replay recorded history for a grid of parameter sets."""
+        entry = async_get_loaded_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        circuit = async_get_circuit(entry, call)
+        start, end = async_get_period(call)
+
+        # History spans many setback slots, replay the number entity values
+        base = circuit.curve_parameters(setback=False)
+        grid = itertools.product(
+            call.data.get(CONF_CURVE_SLOPE, [base.curve_slope]),
+            call.data.get(CONF_CURVE_LEVEL, [base.curve_level]),
+            call.data.get(CONF_HYSTERESIS, [base.hysteresis]),
+        )
+        candidates = [
+            replace(base, curve_slope=slope, curve_level=level, hysteresis=hyst)
+            for slope, level, hyst in grid
+        ]
+        if len(candidates) > MAX_BACKTEST_CANDIDATES:
+            raise ServiceValidationError(
+                f"Parameter grid has {len(candidates)} candidates, "
+                f"at most {MAX_BACKTEST_CANDIDATES} are allowed"
+            )
+
+        db_path = async_get_recorder_db_path(hass)
+        outdoor_sensor = entry.data[CONF_OUTDOOR_SENSOR]
+
+        # pylint: disable-next=import-outside-toplevel
+        from .backtest import run_backtest
+
+        async with entry.runtime_data.coordinator.async_history_source(
+            db_path, (outdoor_sensor, circuit.room_sensor), start.timestamp()
+        ) as source:
+            summaries = await hass.async_add_executor_job(
+                partial(
+                    run_backtest,
+                    source,
+                    outdoor_sensor,
+                    circuit.room_sensor,
+                    start.timestamp(),
+                    end.timestamp(),
+                    candidates,
+                    max_workers=call.data.get(ATTR_MAX_WORKERS),
+                )
+            )
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "candidates": [summary.as_dict() for summary in summaries],
+        }
+
+    async def async_auto_tune(call: ServiceCall) -> ServiceResponse:
+        """Fit slope and level from recorded history, optionally apply them."""
+        entry = async_get_loaded_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        circuit = async_get_circuit(entry, call)
+        start, end = async_get_period(call)
+        if not (room_sensor := circuit.room_sensor):
+            raise ServiceValidationError(
+                "Auto-tuning requires a room temperature sensor"
+            )
+        flow_sensor = call.data.get(ATTR_FLOW_SENSOR) or async_get_entity_id(
+            hass, entry, circuit, "sensor", "flow_temperature"
+        )
+
+        db_path = async_get_recorder_db_path(hass)
+        entity_ids = (entry.data[CONF_OUTDOOR_SENSOR], room_sensor, flow_sensor)
+
+        # pylint: disable-next=import-outside-toplevel
+        from .autotune import AutoTuneError, run_auto_tune
+
+        try:
+            async with entry.runtime_data.coordinator.async_history_source(
+                db_path, entity_ids, start.timestamp()
+            ) as source:
+                result = await hass.async_add_executor_job(
+                    run_auto_tune,
+                    source,
+                    *entity_ids,
+                    start.timestamp(),
+                    end.timestamp(),
+                )
+        except AutoTuneError as err:
+            raise HomeAssistantError(f"Auto-tuning failed: {err}") from err
+
+        state = circuit.state
+        response: dict[str, Any] = {
+            **result.as_dict(),
+            "previous_curve_slope": state.curve_slope,
+            "previous_curve_level": state.curve_level,
+            "applied": False,
+        }
+
+        if call.data[ATTR_APPLY]:
+            for key, value in (
+                (CONF_CURVE_SLOPE, result.curve_slope),
+                (CONF_CURVE_LEVEL, result.curve_level),
+            ):
+                await hass.services.async_call(
+                    "number",
+                    "set_value",
+                    {
+                        "entity_id": async_get_entity_id(
+                            hass, entry, circuit, "number", key
+                        ),
+                        "value": value,
+                    },
+                    blocking=True,
+                    context=call.context,
+                )
+            response["applied"] = True
+            _LOGGER.info(
+                "Applied auto-tuned curve slope %s and level %s to %s",
+                result.curve_slope,
+                result.curve_level,
+                circuit.name,
+            )
+
+        return response
+
+    async def async_calculate(call: ServiceCall) -> ServiceResponse:
+        """Calculate flow temperatures for many outdoor temperatures."""
+        # Current parameters of a circuit, or the defaults
+        if entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID):
+            entry = async_get_loaded_entry(hass, entry_id)
+            parameters = async_get_circuit(entry, call).curve_parameters()
+        else:
+            parameters = CurveParameters()
+
+        overrides = {
+            key: call.data[key] for key in CALCULATE_OVERRIDES if key in call.data
+        }
+        if CONF_CURVE_POINTS in call.data:
+            try:
+                overrides[CONF_CURVE_POINTS] = parse_curve_points(
+                    call.data[CONF_CURVE_POINTS]
+                )
+            except ValueError as err:
+                raise ServiceValidationError(
+                    f"Invalid curve support points: {err}"
+                ) from err
+        parameters = replace(parameters, **overrides)
+
+        outdoor_temps = temperature_points(call.data[ATTR_OUTDOOR_TEMPERATURE])
+        room_temps: list[float] | float | None = call.data.get(ATTR_ROOM_TEMPERATURE)
+        if room_temps is not None:
+            if len(room_temps) == 1:
+                room_temps = room_temps[0]
+            elif len(room_temps) != len(outdoor_temps):
+                raise ServiceValidationError(
+                    "Give one room temperature, or one per outdoor temperature"
+                )
+
+        # NumPy is imported on first use, outside the event loop
+        numpy = await hass.async_add_import_executor_job(load_numpy)
+        flow_temps = calculate_flow_temperatures(
+            outdoor_temps,
+            room_temps,
+            parameters,
+            use_numpy=numpy is not None,
+        )
+        if numpy is not None:
+            flow_temps = flow_temps.tolist()
+
+        return {
+            "outdoor_temperatures": outdoor_temps,
+            "flow_temperatures": flow_temps,
+            "parameters": {
+                key: getattr(parameters, key) for key in CALCULATE_OVERRIDES
+            },
+        }
+
+    profiling = False
+
+    async def async_profile(call: ServiceCall) -> ServiceResponse:
+        """Profile the integration's callbacks for a while."""
+        nonlocal profiling
+        if profiling:
+            raise ServiceValidationError("A profiling run is already active")
+
+        # pylint: disable-next=import-outside-toplevel
+        import cProfile
+
+        # pylint: disable-next=import-outside-toplevel
+        from .profiling import summarize_profile
+
+        duration = call.data[ATTR_DURATION]
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as err:
+            # Only one profiler can be active, e.g. the profiler integration
+            raise HomeAssistantError(f"Cannot start profiling: {err}") from err
+        profiling = True
+        try:
+            # Everything running on the event loop meanwhile is recorded
+            await asyncio.sleep(duration)
+        finally:
+            profile.disable()
+            profiling = False
+
+        dump_path = None
+        if call.data[ATTR_WRITE_FILE]:
+            dump_path = hass.config.path(f"{DOMAIN}_profile_{int(time.time())}.prof")
+        functions = await hass.async_add_executor_job(
+            summarize_profile, profile, dump_path
+        )
+        if dump_path is not None:
+            _LOGGER.info("Wrote heating curve profile to %s", dump_path)
+
+        return {"duration": duration, "file": dump_path, "functions": functions}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKTEST,
+        async_backtest,
+        schema=BACKTEST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_AUTO_TUNE,
+        async_auto_tune,
+        schema=AUTO_TUNE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CALCULATE,
+        async_calculate,
+        schema=CALCULATE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
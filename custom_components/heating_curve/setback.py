@@ -0,0 +1,112 @@
+"""Weekly setback profiles of Heating Curve Calculator.
+
+A profile shifts the room target or the curve level by an offset per time
+slot, e.g. a night setback. It is compiled into a sorted index of the slot
+starts within the week, so the active slot and the next change are found
+by one bisect. No Home Assistant imports.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+import re
+
+DAY = 86400
+WEEK = 7 * DAY
+
+# English and German day abbreviations, Monday first
+_DAYS = {
+    "mo": 0,
+    "tu": 1,
+    "di": 1,
+    "we": 2,
+    "mi": 2,
+    "th": 3,
+    "do": 3,
+    "fr": 4,
+    "sa": 5,
+    "su": 6,
+    "so": 6,
+}
+
+_SLOT = re.compile(
+    r"^(?:(?P<first>[a-z]{2})(?:-(?P<last>[a-z]{2}))?\s+)?"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{2})\s*=\s*(?P<offset>[-+]?\d+(?:\.\d+)?)$"
+)
+
+
+def _parse_days(first: str | None, last: str | None) -> list[int]:
+    """Return the weekdays of a day or day range, every day if None."""
+    if first is None:
+        return list(range(7))
+    if first not in _DAYS or (last is not None and last not in _DAYS):
+        raise ValueError(f"Unknown day {first if first not in _DAYS else last}")
+    start = _DAYS[first]
+    end = start if last is None else _DAYS[last]
+    # Ranges may wrap around the week, e.g. "fr-mo"
+    return [(start + index) % 7 for index in range((end - start) % 7 + 1)]
+
+
+def parse_setback_profile(text: str) -> tuple[tuple[int, float], ...]:
+    """Parse slots like "mo-fr 22:00=-3, mo-fr 6:00=0, sa-so 23:00=-3".
+
+    Each slot is "[day or day range] HH:MM=offset" and applies from that
+    time until the next slot, across midnight and the end of the week.
+    Slots without days apply to every day. Returns the slot starts in
+    seconds since Monday 00:00 with their offsets, sorted, with slots that
+    do not change the offset dropped. Raises ValueError if the text is
+    malformed, empty or sets two offsets for the same time.
+    """
+    slots: dict[int, float] = {}
+    for item in re.split(r"[,;\n]", text.lower()):
+        item = item.strip()
+        if not item:
+            continue
+        if (match := _SLOT.match(item)) is None:
+            raise ValueError(f"Invalid setback slot: {item}")
+        hour, minute = int(match["hour"]), int(match["minute"])
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time in setback slot: {item}")
+        offset = float(match["offset"])
+        for day in _parse_days(match["first"], match["last"]):
+            start = day * DAY + hour * 3600 + minute * 60
+            if slots.setdefault(start, offset) != offset:
+                raise ValueError(f"Conflicting setback slots at {item}")
+
+    if not slots:
+        raise ValueError("At least one setback slot is required")
+
+    starts = sorted(slots)
+    # The week wraps, so the first slot follows the last one
+    changes = tuple(
+        (start, slots[start])
+        for previous, start in zip([starts[-1], *starts], starts)
+        if slots[previous] != slots[start]
+    )
+    # A single offset for the whole week still needs one slot
+    return changes or ((starts[0], slots[starts[0]]),)
+
+
+class SetbackSchedule:
+    """Compiled weekly setback profile."""
+
+    def __init__(self, slots: tuple[tuple[int, float], ...]) -> None:
+        """Build the time index from parsed slots."""
+        self.starts = [start for start, _ in slots]
+        self.offsets = [offset for _, offset in slots]
+
+    def __len__(self) -> int:
+        """Return the number of slots."""
+        return len(self.starts)
+
+    def lookup(self, week_seconds: float) -> tuple[float, float]:
+        """Return the active offset and the time of the next change.
+
+        Both times are seconds since Monday 00:00; the next change can lie
+        in the following week, i.e. at or beyond WEEK.
+        """
+        index = bisect_right(self.starts, week_seconds) - 1
+        # Before the first slot of the week the last slot is still active
+        offset = self.offsets[index]
+        if index + 1 < len(self.starts):
+            return offset, self.starts[index + 1]
+        return offset, self.starts[0] + WEEK
@@ -0,0 +1,54 @@
+"""Websocket API of Heating Curve Calculator."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, PRIMARY_CIRCUIT
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_curve)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/curve",
+        vol.Required("entry_id"): str,
+        vol.Optional("circuit", default=PRIMARY_CIRCUIT): str,
+    }
+)
+@callback
+def websocket_curve(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return the curve table of a heating circuit for charting.
+
+    The table is cached per parameter version, so cards can request it on
+    every parameter change without recomputing anything else.
+    """
+    entry = hass.config_entries.async_get_entry(msg["entry_id"])
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Heating curve entry not found"
+        )
+        return
+    if (circuit := entry.runtime_data.circuits.get(msg["circuit"])) is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Heating circuit not found"
+        )
+        return
+    connection.send_result(msg["id"], circuit.curve_chart())
@@ -0,0 +1,203 @@
+"""Setpoint writer of Heating Curve Calculator.
+
+Pushes the flow temperature of the circuits to their output entities, a
+number, climate or water_heater entity of the boiler or heat pump. Writes
+are deduplicated against the value the target already holds, collected
+into one cycle for all circuits of an entry and retried with exponential
+backoff, so slow field buses see as few service calls as possible.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .models import HeatingCurveStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Service, value field and range attributes per output domain
+OUTPUT_SERVICES: dict[str, tuple[str, str, str, str]] = {
+    "number": ("set_value", "value", "min", "max"),
+    "climate": ("set_temperature", "temperature", "min_temp", "max_temp"),
+    "water_heater": ("set_temperature", "temperature", "min_temp", "max_temp"),
+}
+
+# Delay of the first retry after a failed write, doubled per failure
+RETRY_BASE_DELAY = 10.0
+RETRY_MAX_DELAY = 600.0
+
+
+def current_setpoint(state: State | None) -> float | None:
+    """Return the setpoint an output entity holds, None if unknown."""
+    if state is None:
+        return None
+    if state.domain == "number":
+        value = state.state
+    else:
+        value = state.attributes.get("temperature")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SetpointWriter:
+    """Deduplicated, batched and retried writes to output entities."""
+
+    def __init__(self, hass: HomeAssistant, stats: HeatingCurveStats) -> None:
+        """Initialize the writer."""
+        self.hass = hass
+        self._stats = stats
+        # Latest value to write per output entity
+        self._pending: dict[str, float] = {}
+        # Failed writes in a row and the time of the next attempt
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self._cycle: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = False
+
+    @callback
+    def async_set(self, entity_id: str, value: float | None) -> None:
+        """Request a setpoint, written with the next cycle if it differs."""
+        if value is None or self._stopped:
+            return
+        state = self.hass.states.get(entity_id)
+        if value == current_setpoint(state) and entity_id not in self._pending:
+            self._stats.output_skips += 1
+            return
+        if self._pending.get(entity_id) == value:
+            return
+        self._pending[entity_id] = value
+        # A target that keeps failing is only tried again after its backoff
+        self._async_schedule_retry()
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel pending writes and retries."""
+        self._stopped = True
+        if self._cycle is not None:
+            self._cycle.cancel()
+            self._cycle = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pending.clear()
+
+    @property
+    def pending(self) -> dict[str, float]:
+        """Return the values not written yet."""
+        return dict(self._pending)
+
+    @callback
+    def _async_schedule_cycle(self, delay: float) -> None:
+        """Schedule the next write cycle, keeping an earlier one."""
+        if self._stopped or self._task is not None:
+            # A running cycle schedules the next one when it is done
+            return
+        when = self.hass.loop.time() + delay
+        if self._cycle is not None:
+            if self._cycle.when() <= when:
+                return
+            self._cycle.cancel()
+        self._cycle = self.hass.loop.call_at(when, self._async_start_cycle)
+
+    @callback
+    def _async_start_cycle(self) -> None:
+        """Start writing all due setpoints."""
+        self._cycle = None
+        now = self.hass.loop.time()
+        due = {
+            entity_id: value
+            for entity_id, value in self._pending.items()
+            if self._retry_at.get(entity_id, now) <= now
+        }
+        if due:
+            self._task = self.hass.async_create_background_task(
+                self._async_write_all(due), "heating_curve setpoint writes"
+            )
+        else:
+            self._async_schedule_retry()
+
+    async def _async_write_all(self, due: dict[str, float]) -> None:
+        """Write the setpoints of one cycle concurrently."""
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._async_write(entity_id, value)
+                    for entity_id, value in due.items()
+                )
+            )
+        finally:
+            # Also after an unexpected error, a set task blocks all later
+            # cycles
+            self._task = None
+        now = self.hass.loop.time()
+        for (entity_id, value), written in zip(due.items(), results):
+            if self._pending.get(entity_id) != value:
+                # A newer value arrived meanwhile, it is written next
+                continue
+            if written:
+                del self._pending[entity_id]
+                self._failures.pop(entity_id, None)
+                self._retry_at.pop(entity_id, None)
+                continue
+            failures = self._failures[entity_id] = (
+                self._failures.get(entity_id, 0) + 1
+            )
+            self._retry_at[entity_id] = now + min(
+                RETRY_BASE_DELAY * 2 ** (failures - 1), RETRY_MAX_DELAY
+            )
+        self._async_schedule_retry()
+
+    @callback
+    def _async_schedule_retry(self) -> None:
+        """Schedule the cycle for the earliest pending write."""
+        if not self._pending:
+            return
+        now = self.hass.loop.time()
+        earliest = min(
+            self._retry_at.get(entity_id, now) for entity_id in self._pending
+        )
+        self._async_schedule_cycle(max(earliest - now, 0))
+
+    async def _async_write(self, entity_id: str, value: float) -> bool:
+        """Write one setpoint, return True on success or if already set."""
+        state = self.hass.states.get(entity_id)
+        if state is None or state.state == "unavailable":
+            _LOGGER.debug("Output %s is not available, retrying later", entity_id)
+            self._stats.output_failures += 1
+            return False
+        if (output_service := OUTPUT_SERVICES.get(state.domain)) is None:
+            _LOGGER.warning(
+                "Output %s is not a %s entity", entity_id, ", ".join(OUTPUT_SERVICES)
+            )
+            self._stats.output_failures += 1
+            return False
+        service, field, min_attr, max_attr = output_service
+        # Stay within the range the target accepts
+        if (minimum := state.attributes.get(min_attr)) is not None:
+            value = max(value, float(minimum))
+        if (maximum := state.attributes.get(max_attr)) is not None:
+            value = min(value, float(maximum))
+        if value == current_setpoint(state):
+            self._stats.output_skips += 1
+            return True
+        try:
+            await self.hass.services.async_call(
+                state.domain,
+                service,
+                {"entity_id": entity_id, field: value},
+                blocking=True,
+            )
+        except (HomeAssistantError, vol.Invalid) as err:
+            _LOGGER.warning("Writing %s to %s failed: %s", value, entity_id, err)
+            self._stats.output_failures += 1
+            return False
+        self._stats.output_writes += 1
+        return True